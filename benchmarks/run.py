@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the pdf2markdown conversion pipeline.
+
+The batch benchmark runs the CLI on synthetic PDFs built with the test
+generators, against the fake marker_single from tests/fake_marker.py, so it
+measures the orchestration around marker rather than marker itself. The
+alignment benchmarks time align_markdown_tables on tables of growing size.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --compare before.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pdf2markdown.align_tables import align_markdown_tables, iter_aligned_lines
+from tests.complex_pdf import create_complex_pdf, create_image
+from tests.fake_marker import install
+from tests.simple_pdf import create_simple_pdf
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Markdown the fake marker emits for every document, shaped like marker's
+# output for tests/complex_pdf.py
+CANNED_MARKDOWN = """## **Complex PDF Document Example**
+
+This document demonstrates more advanced features of PDF generation using ReportLab.
+
+**Image Example:**
+
+![](_page_0_Picture_1.jpeg)
+
+A placeholder image demonstrating embedding.
+
+## **Table Example:**
+
+|Header 1|Header 2|Header 3|Header 4|
+|---|---|---|---|
+|Row 1 Col 1|Row 1 Col 2|Row 1 Col 3|Row 1 Col 4|
+|Row 2 Col 1|Row 2 Col 2|Row 2 Col 3|Row 2 Col 4|
+|Row 3 Col 1|Row 3 Col 2|Row 3 Col 3|Row 3 Col 4 with more text|
+
+This is content on the **second page**, demonstrating page breaks.
+"""
+
+Result = Dict[str, Any]
+
+
+def best_of(repeat: int, function: Callable[[], Any]) -> float:
+    """Return the fastest of several timed runs, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def build_pdfs(pdf_dir: Path, count: int) -> List[Path]:
+    """Create count synthetic PDFs, alternating simple and complex ones."""
+    simple = pdf_dir / "simple.pdf"
+    complex_ = pdf_dir / "complex.pdf"
+    create_simple_pdf(simple)
+    image = create_image(filename=pdf_dir / "image.png")
+    if image is None:
+        raise RuntimeError("Could not create the benchmark image")
+    create_complex_pdf(filename=complex_, _image=image)
+
+    pdfs = []
+    for index in range(count):
+        pdf = pdf_dir / f"doc{index:05d}.pdf"
+        os.link(simple if index % 2 == 0 else complex_, pdf)
+        pdfs.append(pdf)
+    return pdfs
+
+
+def bench_batch(work_dir: Path, pdfs: List[Path], jobs: int, repeat: int) -> Result:
+    """Time the CLI batch path with the fake marker_single."""
+    out_dir = work_dir / f"out-j{jobs}"
+    out_dir.mkdir()
+    csv_file = work_dir / f"batch-j{jobs}.csv"
+    csv_file.write_text(
+        "".join(f"{pdf}, {out_dir / (pdf.stem + '.md')}\n" for pdf in pdfs)
+    )
+
+    bin_dir = work_dir / "bin"
+    canned = work_dir / "canned.md"
+    env = dict(
+        os.environ,
+        PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+        PYTHONPATH=str(REPO_ROOT),
+        FAKE_MARKER_OUTPUT=str(canned),
+    )
+    cmd = [sys.executable, "-m", "pdf2markdown.cli", "-f", str(csv_file), "-F"]
+    cmd += ["--backend", "subprocess", "--jobs", str(jobs)]
+
+    def run() -> None:
+        subprocess.run(
+            cmd,
+            cwd=work_dir,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    seconds = best_of(repeat, run)
+    return {
+        "name": "cli_batch",
+        "params": {"files": len(pdfs), "jobs": jobs},
+        "seconds": seconds,
+        "files_per_second": len(pdfs) / seconds,
+    }
+
+
+def make_table(rows: int, cols: int) -> str:
+    """Build an unaligned markdown table with ragged cell widths."""
+    lines = ["|" + "|".join(f"Column {col}" for col in range(cols)) + "|"]
+    lines.append("|" + "|".join("---" for _ in range(cols)) + "|")
+    for row in range(rows):
+        cells = (f"r{row}c{col}" + "x" * ((row * 7 + col) % 13) for col in range(cols))
+        lines.append("|" + "|".join(cells) + "|")
+    return "Text before the table.\n\n" + "\n".join(lines) + "\n\nText after.\n"
+
+
+def bench_align(rows: int, cols: int, repeat: int) -> List[Result]:
+    """Time the string and streaming alignment APIs on one table."""
+    content = make_table(rows, cols)
+    megabytes = len(content.encode("utf-8")) / 1e6
+    lines = content.splitlines(keepends=True)
+
+    results = []
+    for name, function in [
+        ("align_markdown_tables", lambda: align_markdown_tables(content)),
+        ("iter_aligned_lines", lambda: sum(1 for _ in iter_aligned_lines(lines))),
+    ]:
+        seconds = best_of(repeat, function)
+        results.append(
+            {
+                "name": name,
+                "params": {"rows": rows, "cols": cols},
+                "seconds": seconds,
+                "mb_per_second": megabytes / seconds,
+            }
+        )
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """Return the checked out commit, if this is a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print the timing ratio of each benchmark against a baseline run."""
+    base = {
+        (result["name"], json.dumps(result["params"], sort_keys=True)): result
+        for result in baseline["benchmarks"]
+    }
+    print(f"{'benchmark':<50} {'base (s)':>10} {'now (s)':>10} {'ratio':>7}")
+    for result in current["benchmarks"]:
+        params = json.dumps(result["params"], sort_keys=True)
+        label = f"{result['name']} {params}"
+        old = base.get((result["name"], params))
+        if old is None:
+            print(f"{label:<50} {'-':>10} {result['seconds']:>10.4f} {'-':>7}")
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        print(
+            f"{label:<50} {old['seconds']:>10.4f} "
+            f"{result['seconds']:>10.4f} {ratio:>6.2f}x"
+        )
+
+
+def main() -> None:
+    """Run the benchmarks and write the results as JSON."""
+    parser = argparse.ArgumentParser(description="Benchmark pdf2markdown")
+    parser.add_argument("-o", "--output", type=Path, help="Write results here")
+    parser.add_argument("--compare", type=Path, help="Baseline results to compare")
+    parser.add_argument("--files", type=int, default=40, help="PDFs per batch")
+    parser.add_argument(
+        "--jobs", type=int, nargs="+", default=[1, 4], help="Batch --jobs values"
+    )
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000, 20000],
+        help="Table rows for the alignment benchmarks",
+    )
+    parser.add_argument(
+        "--cols",
+        type=int,
+        nargs="+",
+        default=[10, 40],
+        help="Table columns for the alignment benchmarks",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark")
+    args = parser.parse_args()
+
+    benchmarks: List[Result] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        (work_dir / "bin").mkdir()
+        install(work_dir / "bin")
+        (work_dir / "canned.md").write_text(CANNED_MARKDOWN, encoding="utf-8")
+        (work_dir / "pdfs").mkdir()
+        # The PDF generators report progress on stdout, which carries the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            pdfs = build_pdfs(work_dir / "pdfs", args.files)
+        for jobs in args.jobs:
+            benchmarks.append(bench_batch(work_dir, pdfs, jobs, args.repeat))
+
+    for cols in args.cols:
+        for rows in args.rows:
+            benchmarks.extend(bench_align(rows, cols, args.repeat))
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "benchmarks": benchmarks,
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), results)
+
+
+if __name__ == "__main__":
+    main()
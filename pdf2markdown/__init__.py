@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+"""Convert PDF files to Markdown with marker-pdf."""
+
+from .cli import ConversionResult, convert, iter_convert
+
+__all__ = ["ConversionResult", "convert", "iter_convert"]
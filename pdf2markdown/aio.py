@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""Asyncio API for converting PDFs without blocking the event loop."""
+
+import asyncio
+import io
+import os
+import signal
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from .align_tables import iter_aligned_lines
+from .cache import ConversionCache
+from .converter import (
+    PageRange,
+    _find_marker_output,
+    _log_conversion,
+    _marker_command,
+    marker_options,
+)
+from .errors import ConversionError
+from .output import write_markdown
+
+
+async def convert_pdf_to_markdown_async(
+    pdf_path: Path,
+    cache: Optional[ConversionCache] = None,
+    page_range: Optional[PageRange] = None,
+) -> str:
+    """Convert PDF to markdown with marker_single without blocking the loop.
+
+    If the task is cancelled, the marker process and everything it started
+    are killed and the temporary output directory is removed.
+
+    Args:
+        pdf_path: Path to the PDF file
+        cache: Conversion cache to consult before running marker
+        page_range: Pages to convert, None for the whole document
+
+    Returns:
+        Markdown text
+
+    Raises:
+        RuntimeError: If marker-pdf is not installed or conversion fails
+        FileNotFoundError: If the output file is not found
+    """
+    options = marker_options(page_range)
+    if cache is None:
+        return await _run_marker_single_async(pdf_path, options)
+
+    key = await asyncio.to_thread(cache.key, pdf_path, options)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.info(f"Cache hit for '{pdf_path}' ({cache.stats()})")
+        return cached
+
+    logger.info(f"Cache miss for '{pdf_path}' ({cache.stats()})")
+    md_text = await _run_marker_single_async(pdf_path, options)
+    await asyncio.to_thread(cache.put, key, md_text)
+    return md_text
+
+
+async def _run_marker_single_async(pdf_path: Path, options: Dict[str, Any]) -> str:
+    """Run marker_single as an asyncio subprocess and read its output.
+
+    Args:
+        pdf_path: Path to the PDF file
+        options: Marker settings from marker_options()
+
+    Returns:
+        Markdown text
+    """
+    _log_conversion(options)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        cmd = _marker_command(pdf_path, temp_path, options)
+        try:
+            # A new session makes marker the leader of its own process
+            # group, so cancellation can kill everything it started.
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError as e:
+            logger.error("marker_single command not found. Is marker-pdf installed?")
+            raise RuntimeError(
+                "marker-pdf is not installed. Install with: pip install marker-pdf"
+            ) from e
+
+        try:
+            _, stderr_bytes = await process.communicate()
+        except asyncio.CancelledError:
+            logger.warning(f"Conversion of '{pdf_path}' cancelled, killing marker")
+            await _kill_process_group(process)
+            raise
+
+        if process.returncode != 0:
+            stderr = stderr_bytes.decode(errors="replace")
+            logger.error(f"Marker command failed: {stderr}")
+            raise ConversionError(f"Marker conversion failed: {stderr}")
+
+        md_file = _find_marker_output(pdf_path, temp_path)
+        return await asyncio.to_thread(md_file.read_text, encoding="utf-8")
+
+
+async def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """Kill a subprocess's process group and reap the subprocess."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await asyncio.shield(process.wait())
+
+
+async def convert_batch_async(
+    pairs: Iterable[Tuple[Path, Path]],
+    *,
+    max_concurrency: int = 4,
+    force: bool = False,
+    cache: Optional[ConversionCache] = None,
+) -> Dict[Path, Optional[Exception]]:
+    """Convert PDF/Markdown pairs with a bounded number of conversions in flight.
+
+    Pairs are only pulled from the iterable when a slot is free, so it may be
+    a lazy stream. A failed file does not stop the batch; cancelling the
+    batch cancels every conversion in flight.
+
+    Args:
+        pairs: PDF and output Markdown paths
+        max_concurrency: Maximum number of marker processes at a time
+        force: Whether to overwrite existing files
+        cache: Conversion cache to consult before running marker
+
+    Returns:
+        The error of each output Markdown path, None for successes and
+        skipped files
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    errors: Dict[Path, Optional[Exception]] = {}
+
+    async def convert_one(pdf_path: Path, markdown_path: Path) -> None:
+        try:
+            md_text = await convert_pdf_to_markdown_async(pdf_path, cache)
+            # Align tables for better readability
+            await asyncio.to_thread(
+                write_markdown, iter_aligned_lines(io.StringIO(md_text)), markdown_path
+            )
+            logger.info(f"Converted '{pdf_path}' to '{markdown_path}'")
+            errors[markdown_path] = None
+        except Exception as e:
+            logger.error(f"Error converting '{pdf_path}': {e}")
+            errors[markdown_path] = e
+        finally:
+            semaphore.release()
+
+    async with asyncio.TaskGroup() as group:
+        for pdf_path, markdown_path in pairs:
+            if markdown_path.exists() and not force:
+                logger.info(
+                    f"Output file '{markdown_path}' already exists. Use force to "
+                    "overwrite."
+                )
+                errors[markdown_path] = None
+                continue
+            await semaphore.acquire()
+            group.create_task(convert_one(pdf_path, markdown_path))
+
+    return errors
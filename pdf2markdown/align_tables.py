@@ -3,7 +3,14 @@
 """Functions for aligning tables in markdown content."""
 
 import re
-from typing import List
+from itertools import chain
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Candidate line that turns the line before it into a table header
+_SEPARATOR_LINE = re.compile(r"[\s\-:|]+")
+
+# Backslash escape or cell boundary in a table row
+_PIPE_OR_ESCAPE = re.compile(r"\\.|\|")
 
 
 def align_markdown_tables(content: str) -> str:
@@ -15,92 +22,140 @@ def align_markdown_tables(content: str) -> str:
     Returns:
         The markdown content with aligned tables
     """
-    lines = content.split("\n")
-    result: List[str] = []
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
-
-        # Check if this is the start of a table
-        if (
-            "|" in line
-            and i + 1 < len(lines)
-            and "|" in lines[i + 1]
-            and re.match(r"^[\s\-:|]+$", lines[i + 1])
-        ):
-            # Found a table
-            table_lines: List[str] = []
-            j = i
-
-            while j < len(lines) and "|" in lines[j]:
-                table_lines.append(lines[j])
-                j += 1
-
-            if len(table_lines) >= 2:  # At least header and separator
-                table_data: List[List[str]] = []
-                for table_line in table_lines:
-                    cells = [cell.strip() for cell in table_line.split("|")]
-                    # Remove empty cells at start and end
-                    if cells and cells[0] == "":
-                        cells = cells[1:]
-                    if cells and cells[-1] == "":
-                        cells = cells[:-1]
-                    table_data.append(cells)
-
-                # Find maximum width for each column
-                num_cols = max(len(row) for row in table_data)
-                col_widths = [0] * num_cols
-
-                for row in table_data:
-                    for idx, cell in enumerate(row):
-                        if idx < num_cols:
-                            # For separator row, count dashes
-                            if re.match(r"^[\-:]+$", cell):
-                                col_widths[idx] = max(
-                                    col_widths[idx], 3
-                                )  # Minimum 3 for separator
-                            else:
-                                col_widths[idx] = max(col_widths[idx], len(cell))
-
-                # Generate aligned table
-                aligned_table: List[str] = []
-                for row_idx, row in enumerate(table_data):
-                    aligned_cells = []
-                    for col_idx in range(num_cols):
-                        if col_idx < len(row):
-                            cell = row[col_idx]
-                            if row_idx == 1 and re.match(
-                                r"^[\-:]+$", cell
-                            ):  # Separator row
-                                # Preserve alignment indicators
-                                match (cell.startswith(":"), cell.endswith(":")):
-                                    case (True, True):  # Center aligned
-                                        aligned_cells.append(
-                                            ":" + "-" * (col_widths[col_idx] - 2) + ":"
-                                        )
-                                    case (True, False):  # Left aligned
-                                        aligned_cells.append(
-                                            ":" + "-" * (col_widths[col_idx] - 1)
-                                        )
-                                    case (False, True):  # Right aligned
-                                        aligned_cells.append(
-                                            "-" * (col_widths[col_idx] - 1) + ":"
-                                        )
-                                    case (False, False):  # No alignment
-                                        aligned_cells.append("-" * col_widths[col_idx])
-                            else:
-                                aligned_cells.append(cell.ljust(col_widths[col_idx]))
-                        else:
-                            aligned_cells.append(" " * col_widths[col_idx])
-
-                    aligned_table.append("| " + " | ".join(aligned_cells) + " |")
-
-                result.extend(aligned_table)
-                i = j
+    return "".join(iter_aligned_lines(_split_lines(content)))
+
+
+def _split_lines(content: str) -> Iterator[str]:
+    """Yield the lines of a string, each with its trailing newline if any."""
+    start = 0
+    while True:
+        end = content.find("\n", start)
+        if end == -1:
+            if start < len(content):
+                yield content[start:]
+            return
+        yield content[start : end + 1]
+        start = end + 1
+
+
+def iter_aligned_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Aligns tables in a stream of markdown lines.
+
+    Only the table currently being aligned is buffered, so a file object can
+    be aligned into another file without holding either in memory. Each line
+    keeps its trailing newline, or lack of one.
+
+    Args:
+        lines: Markdown lines, e.g. a text file object
+
+    Yields:
+        The markdown lines with aligned tables
+    """
+    table: List[str] = []
+    endings: List[str] = []
+    # A line with a pipe that starts a table if a separator row follows it
+    candidate: Optional[Tuple[str, str]] = None
+
+    for line in lines:
+        if line.endswith("\n"):
+            body, ending = line[:-1], "\n"
+        else:
+            body, ending = line, ""
+
+        if table:
+            if "|" in body:
+                table.append(body)
+                endings.append(ending)
+                continue
+            yield from _align_table(table, endings)
+            table, endings = [], []
+
+        if candidate is not None:
+            if "|" in body and _SEPARATOR_LINE.fullmatch(body):
+                # Found a table
+                table = [candidate[0], body]
+                endings = [candidate[1], ending]
+                candidate = None
                 continue
+            yield candidate[0] + candidate[1]
+            candidate = None
+
+        if "|" in body:
+            candidate = (body, ending)
+        else:
+            yield line
+
+    if candidate is not None:
+        yield candidate[0] + candidate[1]
+    if table:
+        yield from _align_table(table, endings)
+
 
-        result.append(line)
-        i += 1
+def _split_cells(row: str) -> List[str]:
+    """Split a table row into its stripped cells.
 
-    return "\n".join(result)
+    Pipes escaped with a backslash stay in the cell. The empty cells before
+    a leading and after a trailing pipe are dropped.
+    """
+    if "\\" in row:
+        cells = []
+        start = 0
+        for match in _PIPE_OR_ESCAPE.finditer(row):
+            if match[0] == "|":
+                cells.append(row[start : match.start()].strip())
+                start = match.end()
+        cells.append(row[start:].strip())
+    else:
+        cells = [cell.strip() for cell in row.split("|")]
+    if cells and cells[0] == "":
+        del cells[0]
+    if cells and cells[-1] == "":
+        del cells[-1]
+    return cells
+
+
+def _separator_cell(cell: str, width: int) -> str:
+    """Render a separator cell, keeping its alignment indicators."""
+    match (cell.startswith(":"), cell.endswith(":")):
+        case (True, True):  # Center aligned
+            return ":" + "-" * (width - 2) + ":"
+        case (True, False):  # Left aligned
+            return ":" + "-" * (width - 1)
+        case (False, True):  # Right aligned
+            return "-" * (width - 1) + ":"
+        case _:  # No alignment
+            return "-" * width
+
+
+def _align_table(table_lines: List[str], endings: List[str]) -> Iterator[str]:
+    """Align the rows of one table.
+
+    The rows are split once, the column widths are taken in one pass over
+    the cell lengths, and each row is rendered with a single join. Rows with
+    fewer cells than the widest row are padded with empty cells, and the
+    separator row with dashes, so that ragged tables stay valid.
+
+    Args:
+        table_lines: Table rows without line endings, header and separator
+            first
+        endings: Line ending of each row
+
+    Yields:
+        The aligned rows with their line endings
+    """
+    rows = [_split_cells(table_line) for table_line in table_lines]
+    separator = rows[1]
+    num_cols = max(map(len, rows))
+    for row in rows:
+        if len(row) < num_cols:
+            row.extend([""] * (num_cols - len(row)))
+
+    # Every row is num_cols cells long, so the lengths of column i are every
+    # num_cols-th length from i on. The separator is drawn to fit the
+    # column, at least three dashes wide.
+    lengths = list(map(len, chain.from_iterable(rows[:1] + rows[2:])))
+    widths = [max(max(lengths[col::num_cols]), 3) for col in range(num_cols)]
+
+    rows[1] = [_separator_cell(cell, width) for cell, width in zip(separator, widths)]
+    for row, ending in zip(rows, endings):
+        yield "| " + " | ".join(map(str.ljust, row, widths)) + " |" + ending
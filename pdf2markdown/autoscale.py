@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""Adapt the number of concurrent conversions to the machine.
+
+marker's memory use varies a lot between documents: a fixed number of jobs
+either leaves cores idle on text-only PDFs or runs the machine out of memory
+on scanned ones. With autoscaling, a batch starts at the lower bound of jobs
+and the target is checked whenever a job finishes and every few seconds in
+between:
+
+- It is lowered below the number of running jobs when the available memory
+  falls under a reserve or the load average is well above the number of
+  CPUs. Running jobs are never stopped; fewer are started instead.
+- It is raised by one, at most once per interval, when the load average
+  leaves a CPU idle and the available memory, less the reserve and the
+  memory still to be taken by jobs that have only just started, fits the
+  peak memory of one more job.
+
+The peak memory of a job is the largest peak resident memory of the recent
+marker_single processes, as measured when they are reaped.
+"""
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterable, Optional
+
+from loguru import logger
+
+from .usage import ResourceUsage
+
+# Finished jobs whose peak memory predicts the next job's
+RECENT_JOBS = 20
+
+# Seconds a job may take to reach its peak memory; younger jobs are assumed
+# to still grow to it
+STARTUP = 30.0
+
+# Load per CPU above which jobs are shed
+OVERLOAD = 1.5
+
+
+@dataclass(frozen=True)
+class AutoscaleOptions:
+    """Bounds and thresholds of autoscaling.
+
+    The upper bound on jobs is the --jobs value.
+
+    Attributes:
+        min_jobs: Fewest conversions to run at once
+        reserve: Available memory to leave to the rest of the system, in bytes
+        job_memory: Peak memory of a job until one has been measured, in bytes
+        interval: Seconds between checks while no job finishes, and at least
+            between two increases
+    """
+
+    min_jobs: int = 1
+    reserve: int = 1024 * 1024 * 1024
+    job_memory: int = 4 * 1024 * 1024 * 1024
+    interval: float = 5.0
+
+
+@dataclass(frozen=True)
+class SystemLoad:
+    """What the machine has to spare.
+
+    Attributes:
+        available: Memory available without swapping in bytes, None if
+            unknown
+        load: One-minute load average
+        cpus: Number of CPUs this process may use
+    """
+
+    available: Optional[int]
+    load: float
+    cpus: int
+
+
+def available_memory() -> Optional[int]:
+    """Return MemAvailable from /proc/meminfo in bytes, None if unknown."""
+    try:
+        with open("/proc/meminfo", "rb") as f:
+            for line in f:
+                if line.startswith(b"MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def read_system() -> SystemLoad:
+    """Return the current memory, load and CPUs of the machine."""
+    return SystemLoad(
+        available_memory(), os.getloadavg()[0], os.process_cpu_count() or 1
+    )
+
+
+class Autoscaler:
+    """Target number of concurrent conversions of a batch."""
+
+    def __init__(
+        self,
+        options: AutoscaleOptions,
+        max_jobs: int,
+        probe: Callable[[], SystemLoad] = read_system,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Start at the lower bound.
+
+        Args:
+            options: Bounds and thresholds
+            max_jobs: Most conversions to run at once
+            probe: Reads the system's memory and load
+            clock: Monotonic clock in seconds
+        """
+        if not 1 <= options.min_jobs <= max_jobs:
+            raise ValueError(
+                f"The lower bound of jobs must be between 1 and {max_jobs}"
+            )
+        self.options = options
+        self.max_jobs = max_jobs
+        self.target = options.min_jobs
+        self._probe = probe
+        self._clock = clock
+        self._last_raise = clock()
+        self._peaks: Deque[int] = deque(maxlen=RECENT_JOBS)
+
+    def record(self, usage: Optional[ResourceUsage]) -> None:
+        """Learn from the resources a finished job used."""
+        if usage is not None and usage.max_rss is not None:
+            self._peaks.append(usage.max_rss)
+
+    def job_memory(self) -> int:
+        """Return the peak memory expected of the next job in bytes."""
+        return max(self._peaks, default=self.options.job_memory)
+
+    def update(self, started: Iterable[float]) -> int:
+        """Check the system and return the new target.
+
+        Args:
+            started: Clock times at which the running jobs started
+
+        Returns:
+            Number of jobs to run at once
+        """
+        now = self._clock()
+        started = list(started)
+        running = len(started)
+        system = self._probe()
+        job_memory = self.job_memory()
+        reserve = self.options.reserve
+
+        if system.available is not None and system.available < reserve:
+            why = f"{system.available / 2**20:.0f} MiB of memory available"
+            return self._lower(running, why)
+        if system.load > system.cpus * OVERLOAD:
+            return self._lower(running, f"load {system.load:.1f}")
+
+        if self.target >= self.max_jobs or running < self.target:
+            return self.target
+        if now - self._last_raise < self.options.interval:
+            return self.target
+        if system.load + 1 > system.cpus:
+            return self.target
+        if system.available is not None:
+            starting = sum(1 for since in started if now - since < STARTUP)
+            spare = system.available - reserve - starting * job_memory
+            if spare < job_memory:
+                return self.target
+
+        self._last_raise = now
+        self.target += 1
+        logger.info(
+            f"Raising concurrent conversions to {self.target} "
+            f"(load {system.load:.1f}, {job_memory / 2**20:.0f} MiB per job)"
+        )
+        return self.target
+
+    def _lower(self, running: int, why: str) -> int:
+        """Lower the target below the number of running jobs."""
+        target = max(min(self.target, running - 1), self.options.min_jobs)
+        if target < self.target:
+            logger.info(f"Lowering concurrent conversions to {target} ({why})")
+        self.target = target
+        return target
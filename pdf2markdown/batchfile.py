@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming readers for batch files and sharding of their rows.
+
+A batch file lists PDF/Markdown path pairs as CSV, TSV or JSON Lines; the
+format follows the file extension. Rows are read one at a time, so batch
+files of any size are never loaded whole.
+
+With a shard, each of N hosts converts a disjoint subset of the same batch
+file without coordinating: a row belongs to the shard given by a stable hash
+of its PDF path as written in the file.
+"""
+
+import csv
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+from loguru import logger
+
+_SUFFIX_FORMATS = {".tsv": "tsv", ".tab": "tsv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def batch_format(path: Path) -> str:
+    """Return the batch format of a file from its extension, CSV by default."""
+    return _SUFFIX_FORMATS.get(path.suffix.lower(), "csv")
+
+
+def read_batch(path: Path) -> Iterator[Tuple[Path, Path]]:
+    """Read PDF/Markdown pairs from a batch file.
+
+    CSV and TSV rows hold the PDF and Markdown paths in two columns; paths
+    containing the delimiter must be quoted. JSON Lines rows are objects
+    with "pdf" and "markdown" keys. Empty lines are skipped and invalid rows
+    are logged and skipped.
+
+    Args:
+        path: Path to the batch file
+
+    Yields:
+        Tuples of PDF path and Markdown path
+    """
+    name = batch_format(path)
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if name == "jsonl":
+            yield from _read_jsonl(f)
+        else:
+            yield from _read_delimited(f, "\t" if name == "tsv" else ",")
+
+
+def _read_delimited(
+    lines: Iterable[str], delimiter: str
+) -> Iterator[Tuple[Path, Path]]:
+    reader = csv.reader(lines, delimiter=delimiter, skipinitialspace=True)
+    for row in reader:
+        fields = [field.strip() for field in row]
+        if not any(fields):  # Skip empty lines
+            continue
+        if len(fields) != 2 or not all(fields):
+            logger.error(f"Invalid CSV line {reader.line_num}: {row}")
+            continue
+        yield Path(fields[0]), Path(fields[1])
+
+
+def _read_jsonl(lines: Iterable[str]) -> Iterator[Tuple[Path, Path]]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+            yield Path(row["pdf"]), Path(row["markdown"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Invalid JSONL line {number}: {e}")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One of N disjoint parts of a batch.
+
+    Attributes:
+        index: Zero-based index of this part
+        count: Number of parts
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """Parse an "i/N" shard specification, with i counted from 0.
+
+        Raises:
+            ValueError: If the value is malformed or i is not below N
+        """
+        index, sep, count = value.partition("/")
+        if not sep:
+            raise ValueError(f"Shard '{value}' is not of the form i/N")
+        shard = cls(int(index), int(count))
+        if shard.count < 1 or not 0 <= shard.index < shard.count:
+            raise ValueError(f"Shard '{value}' needs 0 <= i < N")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, pdf_path: Path) -> bool:
+        """Return whether a row with this PDF path belongs to the shard."""
+        digest = hashlib.blake2b(str(pdf_path).encode(), digest_size=8).digest()
+        return int.from_bytes(digest) % self.count == self.index
+
+    def filter(self, rows: Iterable[Tuple[Path, Path]]) -> Iterator[Tuple[Path, Path]]:
+        """Yield the rows that belong to the shard."""
+        for pdf_path, markdown_path in rows:
+            if self.owns(pdf_path):
+                yield pdf_path, markdown_path
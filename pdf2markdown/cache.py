@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk cache of marker conversions keyed by PDF content and settings."""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024  # 1 GiB
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content.
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest of the file content
+    """
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def marker_version() -> str:
+    """Return the installed marker-pdf version, or "unknown"."""
+    from importlib import metadata
+
+    try:
+        return metadata.version("marker-pdf")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ConversionCache:
+    """Content-addressed cache of markdown produced by marker.
+
+    Entries are keyed by the PDF's content hash, the marker version and the
+    conversion options, so the same PDF converted to different output paths
+    is only run through marker once. The cache is capped in size; the least
+    recently used entries are evicted first. Lookups bump an entry's mtime,
+    which is what the eviction order is based on.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_CACHE_SIZE) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, pdf_path: Path, options: Optional[Dict[str, Any]] = None) -> str:
+        """Compute the cache key for converting a PDF.
+
+        Args:
+            pdf_path: Path to the PDF file
+            options: Conversion options that affect the output
+
+        Returns:
+            Hex digest identifying the conversion
+        """
+        settings = json.dumps(
+            {"marker": marker_version(), "options": options or {}},
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(file_digest(pdf_path).encode())
+        digest.update(settings.encode())
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.md"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached markdown for a key, or None on a miss.
+
+        Args:
+            key: Cache key from key()
+
+        Returns:
+            Cached markdown text, or None
+        """
+        entry = self._entry(key)
+        try:
+            text = entry.read_text(encoding="utf-8")
+            os.utime(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return text
+
+    def put(self, key: str, markdown: str) -> None:
+        """Store markdown under a key and evict old entries if over the cap.
+
+        Args:
+            key: Cache key from key()
+            markdown: Markdown text to store
+        """
+        entry = self._entry(key)
+        entry.parent.mkdir(exist_ok=True)
+        data = markdown.encode("utf-8")
+
+        # Write to a temporary file first so concurrent readers never see a
+        # partial entry.
+        fd, tmp_name = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, entry)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data)
+
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """List cache entries as (mtime, size, path) tuples."""
+        entries = []
+        for path in self.cache_dir.glob("*/*.md"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its cap."""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            evicted += 1
+
+        self._size = size
+        logger.debug(f"Evicted {evicted} cache entries")
+
+    def stats(self) -> str:
+        """Describe the hit and miss counters for log messages."""
+        return f"hits: {self.hits}, misses: {self.misses}"
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""Convert large PDFs as page ranges in parallel and stitch the results."""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from loguru import logger
+
+from .cache import ConversionCache
+from .converter import MarkerWorker, PageRange, convert_pdf_to_markdown
+from .limits import ResourceLimits
+from .pdfinfo import page_count
+from .timing import stage
+from .usage import carry_usage
+
+_TABLE_SEPARATOR = re.compile(r"^[\s\-:|]+$")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s")
+
+
+@dataclass(frozen=True)
+class ChunkOptions:
+    """Settings for page-chunked conversion.
+
+    Attributes:
+        size: Number of pages per chunk
+        threshold: Documents with at most this many pages are not chunked
+        jobs: Number of chunks converted concurrently
+    """
+
+    size: int = 50
+    threshold: int = 100
+    jobs: int = 4
+
+
+def page_chunks(pages: int, size: int) -> List[PageRange]:
+    """Split a document into consecutive page ranges.
+
+    Args:
+        pages: Number of pages in the document
+        size: Number of pages per chunk
+
+    Returns:
+        Zero-based, inclusive page ranges covering every page
+    """
+    return [(start, min(start + size, pages) - 1) for start in range(0, pages, size)]
+
+
+def _is_table_row(line: str) -> bool:
+    return line.lstrip().startswith("|")
+
+
+def _cells(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _strip_blank_lines(lines: List[str]) -> List[str]:
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
+
+
+def stitch_markdown(parts: Sequence[str]) -> str:
+    """Join the markdown of consecutive chunks of one document.
+
+    Chunks are normally separated by a blank line. A table that continues
+    across a chunk boundary is merged into one table: marker renders the
+    continuation with its own header and separator, so a repeated header is
+    dropped, and a header that is really the next data row is kept as a row.
+    List items on both sides of a boundary stay in one list.
+
+    Args:
+        parts: Markdown of each chunk, in page order
+
+    Returns:
+        Markdown of the whole document
+    """
+    stitched: List[str] = []
+    for part in parts:
+        lines = _strip_blank_lines(part.split("\n"))
+        if not lines:
+            continue
+
+        if stitched:
+            last, first = stitched[-1], lines[0]
+            if _is_table_row(last) and _is_table_row(first):
+                start = len(stitched) - 1
+                while start > 0 and _is_table_row(stitched[start - 1]):
+                    start -= 1
+                header = _cells(stitched[start])
+                if (
+                    len(lines) > 1
+                    and "|" in lines[1]
+                    and _TABLE_SEPARATOR.match(lines[1])
+                ):
+                    if _cells(first) == header:
+                        lines = lines[2:]
+                    elif len(_cells(first)) == len(header):
+                        lines = [first] + lines[2:]
+                    else:
+                        stitched.append("")  # A different table
+            elif not (_LIST_ITEM.match(last) and _LIST_ITEM.match(first)):
+                stitched.append("")
+
+        stitched.extend(lines)
+
+    text = "\n".join(stitched)
+    if parts and parts[-1].endswith("\n"):
+        text += "\n"
+    return text
+
+
+def convert_pdf_chunked(
+    pdf_path: Path,
+    options: ChunkOptions,
+    worker: Optional[MarkerWorker] = None,
+    cache: Optional[ConversionCache] = None,
+    limits: Optional[ResourceLimits] = None,
+) -> str:
+    """Convert a PDF as page ranges in parallel and stitch the markdown.
+
+    Documents at or below the page threshold, or whose page count cannot be
+    read, are converted in one piece. With more than one job, chunks run as
+    concurrent marker_single processes even when a worker is given: its
+    models are not thread-safe, and loading the models once per chunk costs
+    little next to converting a document large enough to chunk. With one
+    job, the chunks share the worker sequentially.
+
+    Args:
+        pdf_path: Path to the PDF file
+        options: Chunk size, threshold and concurrency
+        worker: Warm in-process worker to use instead of marker_single with
+            a single job
+        cache: Conversion cache to consult before running marker
+        limits: Time and memory limits for each marker_single run
+
+    Returns:
+        Markdown text of the whole document
+    """
+    pages = page_count(pdf_path)
+    if pages is None or pages <= options.threshold:
+        return convert_pdf_to_markdown(pdf_path, worker, cache, limits=limits)
+
+    chunks = page_chunks(pages, options.size)
+    logger.info(f"Converting {pages} pages of '{pdf_path}' in {len(chunks)} chunks")
+    if options.jobs > 1 and worker is not None:
+        logger.info(
+            f"Converting up to {options.jobs} chunks at once with marker_single "
+            "instead of one at a time with the in-process worker"
+        )
+        worker = None
+
+    def convert_chunk(page_range: PageRange) -> str:
+        return convert_pdf_to_markdown(pdf_path, worker, cache, page_range, limits)
+
+    if options.jobs == 1:
+        parts = [convert_chunk(page_range) for page_range in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=options.jobs) as executor:
+            parts = list(executor.map(carry_usage(convert_chunk), chunks))
+
+    with stage("stitch"):
+        return stitch_markdown(parts)
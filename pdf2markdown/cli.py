@@ -6,25 +6,169 @@ You may pass a CSV file with the following format:
 /path/to/pdf1.pdf, /path/to/markdown1.md
 /path/to/pdf2.pdf, /path/to/markdown2.md
 
-or you can pass the PDF and Markdown files as arguments.
+a TSV file, a JSON Lines file of {"pdf": ..., "markdown": ...} objects, or
+you can pass the PDF and Markdown files as arguments.
+
+Importing this module has no side effects: logging is set up by main(), and
+modules only some runs need, like multiprocessing for --jobs, are imported
+when they are used.
 """
 
 import argparse
+import importlib
+import io
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from loguru import logger
 
-from .align_tables import align_markdown_tables
-from .converter import convert_pdf_to_markdown
+from .align_tables import iter_aligned_lines
+from .autoscale import AutoscaleOptions, Autoscaler
+from .batchfile import Shard, read_batch
+from .cache import DEFAULT_CACHE_SIZE, ConversionCache
+from .chunking import ChunkOptions, convert_pdf_chunked
+from .converter import BACKENDS, MarkerWorker, create_worker, marker_output
+from .errors import ConversionError
+from .images import ImageOptions, marker_output_with_images
+from .jobstore import DEFAULT_MAX_ATTEMPTS, JobStore, job_owner
+from .limits import ResourceLimits
+from .manifest import BatchManifest
+from .pagecache import convert_pdf_paged
+from .progress import log_progress
+from .report import FileReport, RunReport, track
+from .scheduler import ORDERS, CostModel, History, schedule
+from .sinks import ArchiveSink, FileSink, MemorySink, OutputSink, open_sink
+from .sinks import Record as ArchiveRecord
+from .textlayer import ENGINES, choose_engine, text_layer_markdown
+from .timing import stage, timed_iter
+from .usage import ResourceUsage, traced_memory
+
+if TYPE_CHECKING:
+    from loguru import Message, Record
+
+# Errors of command line runs are logged to this file by default
+DEFAULT_LOG_FILE = Path("convert.log")
+LOG_LEVELS = ("TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL")
+
+# Marker worker, conversion cache, chunking settings, resource limits, image
+# settings, conversion engine, page cache switch and output archive of each
+# process of a --jobs pool
+_pool_worker: Optional[MarkerWorker] = None
+_pool_cache: Optional[ConversionCache] = None
+_pool_chunking: Optional[ChunkOptions] = None
+_pool_limits: Optional[ResourceLimits] = None
+_pool_images: Optional[ImageOptions] = None
+_pool_engine = "marker"
+_pool_page_cache = False
+_pool_sink: Optional[Path] = None
+
+# Subcommands and the modules whose main() runs them
+_SUBCOMMANDS = {"serve": "server", "watch": "watch", "status": "jobstore"}
+
+# Log record of a pool job: level, message, module, function and line
+_LogRecord = Tuple[str, str, Optional[str], str, int]
+
+# Log records, report entry and, when the Markdown is sent back to go to an
+# archive or to be returned, the record of one pool job
+_JobOutcome = Tuple[List[_LogRecord], FileReport, Optional[ArchiveRecord]]
+
+
+@dataclass(slots=True)
+class ConversionResult:
+    """Outcome of converting one PDF.
+
+    Attributes:
+        pdf: Path to the PDF file
+        output: Path to the Markdown file, None if the Markdown was returned
+        markdown: The Markdown, if it was returned and the PDF converted
+        status: "converted", "skipped" or "failed"
+        seconds: Wall-clock time spent on the file
+        stages: Exclusive seconds per conversion stage
+        pages: Number of pages, None if unknown or skipped
+        engine: "marker" or "text", None if the file was not converted
+        error: Error message of a failed file
+        usage: Resources used by the conversion, None if unknown or skipped
+    """
+
+    pdf: Path
+    output: Optional[Path]
+    markdown: Optional[str] = None
+    status: str = "converted"
+    seconds: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    pages: Optional[int] = None
+    engine: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[ResourceUsage] = None
+
+    @classmethod
+    def _from_report(
+        cls,
+        pdf_path: Path,
+        markdown_path: Optional[Path],
+        entry: FileReport,
+        markdown: Optional[str] = None,
+    ) -> "ConversionResult":
+        return cls(
+            pdf_path,
+            markdown_path,
+            markdown,
+            entry.status,
+            entry.seconds,
+            entry.stages,
+            entry.pages,
+            entry.engine,
+            entry.error,
+            entry.usage,
+        )
 
-logfile = Path("convert.log")
-logger.add(logfile, level="ERROR", encoding="utf-8")
+    def to_report(self) -> FileReport:
+        """Return the run report entry of the result."""
+        return FileReport(
+            str(self.pdf),
+            str(self.output),
+            self.status,
+            self.seconds,
+            self.stages,
+            self.pages,
+            self.error,
+            self.engine,
+            self.usage,
+        )
 
 
-def _convert_single_file(
-    pdf_path: Path, markdown_path: Path, force: bool = False
+def convert_single_file(
+    pdf_path: Path,
+    markdown_path: Path,
+    force: bool = False,
+    worker: Optional[MarkerWorker] = None,
+    cache: Optional[ConversionCache] = None,
+    chunking: Optional[ChunkOptions] = None,
+    limits: Optional[ResourceLimits] = None,
+    images: Optional[ImageOptions] = None,
+    on_report: Optional[Callable[[FileReport], None]] = None,
+    engine: str = "marker",
+    page_cache: bool = False,
+    sink: Optional[OutputSink] = None,
+    measure: bool = True,
+    trace: bool = False,
 ) -> None:
     """Convert a single PDF file to Markdown.
 
@@ -32,50 +176,717 @@ def _convert_single_file(
         pdf_path: Path to the PDF file
         markdown_path: Path to the output Markdown file
         force: Whether to overwrite existing file
+        worker: Warm in-process marker worker, None to use marker_single
+        cache: Conversion cache to consult before running marker
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single
+        images: Keep extracted images with these settings, None to discard
+            them; the cache and chunking are not used then
+        on_report: Called with the outcome and stage timings of the file
+        engine: "marker", "text" to convert from the PDF's text layer, or
+            "auto" to use the text layer when a preflight finds it good enough
+        page_cache: Also cache the conversion under the content hashes of
+            the PDF's pages, so that a PDF saved again with the same pages is
+            not converted again; needs a cache
+        sink: Where to write the Markdown, None for markdown_path
+        measure: Whether to time the stages and measure the resources of the
+            file for on_report, or only report its outcome
+        trace: Whether to also trace the Python allocations of aligning and
+            writing the file, which slows them down several times
+    """
+    if sink is None:
+        sink = FileSink()
+    with track(pdf_path, markdown_path, on_report, measure, trace) as entry:
+        if sink.exists(pdf_path, markdown_path) and not force:
+            logger.info(
+                f"Output file {sink.describe(markdown_path)} already exists. "
+                "Use -F to overwrite."
+            )
+            entry.status = "skipped"
+            return
+
+        try:
+            with stage("preflight"):
+                entry.engine = choose_engine(pdf_path, engine, images is not None)
+            source: ContextManager[Iterable[str]]
+            if entry.engine == "text":
+                with stage("text"):
+                    md_text = text_layer_markdown(pdf_path)
+                source = nullcontext(io.StringIO(md_text))
+            elif images is not None:
+                source = marker_output_with_images(
+                    pdf_path,
+                    markdown_path,
+                    images,
+                    worker,
+                    limits,
+                    log_progress(pdf_path),
+                )
+            elif page_cache and cache is not None:
+                with stage("marker"):
+                    md_text = convert_pdf_paged(
+                        pdf_path,
+                        cache,
+                        worker,
+                        limits,
+                        log_progress(pdf_path),
+                        chunking,
+                    )
+                source = nullcontext(io.StringIO(md_text))
+            elif chunking is not None:
+                with stage("marker"):
+                    md_text = convert_pdf_chunked(
+                        pdf_path, chunking, worker, cache, limits
+                    )
+                source = nullcontext(io.StringIO(md_text))
+            else:
+                source = marker_output(
+                    pdf_path,
+                    worker,
+                    cache,
+                    limits=limits,
+                    progress=log_progress(pdf_path),
+                )
+            with source as markdown, stage("write"), traced_memory():
+                # Align tables for better readability
+                lines = timed_iter(markdown, "read")
+                sink.write(
+                    pdf_path,
+                    markdown_path,
+                    timed_iter(iter_aligned_lines(lines), "align"),
+                )
+            logger.info(f"Converted '{pdf_path}' to {sink.describe(markdown_path)}")
+        except Exception as e:
+            logger.error(f"Error converting '{pdf_path}': {e}")
+            raise
+
+
+def create_cache(
+    cache_dir: Optional[Path], cache_size: int
+) -> Optional[ConversionCache]:
+    """Create the conversion cache if a cache directory was given."""
+    if cache_dir is None:
+        return None
+    return ConversionCache(cache_dir, cache_size)
+
+
+def _init_pool_worker(
+    backend: str,
+    cache_dir: Optional[Path],
+    cache_size: int,
+    chunking: Optional[ChunkOptions],
+    limits: Optional[ResourceLimits],
+    images: Optional[ImageOptions],
+    engine: str,
+    page_cache: bool,
+    sink: Optional[Path],
+) -> None:
+    """Set up a --jobs pool process.
+
+    Log handlers inherited from the parent are dropped; each file's messages
+    are collected by _convert_job and replayed by the parent instead.
+
+    Args:
+        backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+        cache_dir: Conversion cache directory, None to disable the cache
+        cache_size: Conversion cache size cap in bytes
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single
+        images: Keep extracted images with these settings
+        engine: Conversion engine, one of "auto", "marker" or "text"
+        page_cache: Also cache conversions by the PDFs' page hashes
+        sink: Archive the parent process writes the Markdown to, None to
+            write Markdown files
     """
-    if markdown_path.exists() and not force:
-        logger.info(
-            f"Output file '{markdown_path}' already exists. Use -F to overwrite."
+    global _pool_worker, _pool_cache, _pool_chunking, _pool_limits, _pool_images
+    global _pool_engine, _pool_page_cache, _pool_sink
+    logger.remove()
+    _pool_worker = create_worker(backend)
+    _pool_cache = create_cache(cache_dir, cache_size)
+    _pool_chunking = chunking
+    _pool_limits = limits
+    _pool_images = images
+    _pool_engine = engine
+    _pool_page_cache = page_cache
+    _pool_sink = sink
+
+
+def _convert_row(
+    pdf_path: Path,
+    markdown_path: Optional[Path],
+    force: bool,
+    worker: Optional[MarkerWorker],
+    cache: Optional[ConversionCache],
+    chunking: Optional[ChunkOptions],
+    limits: Optional[ResourceLimits],
+    images: Optional[ImageOptions],
+    engine: str,
+    page_cache: bool,
+    sink: Optional[OutputSink],
+    measure: bool,
+    trace: bool,
+) -> Tuple[FileReport, Optional[MemorySink]]:
+    """Convert one row, keeping the Markdown in memory if it has no output path.
+
+    The row's entry always holds its outcome; its timings, resource usage
+    and page count are only measured if asked to.
+
+    Returns:
+        The row's report entry, and the memory sink holding its record if
+        the Markdown was kept in memory
+    """
+    memory = None
+    if markdown_path is None:
+        # The Markdown is returned; there is no place to keep images next to
+        memory = sink = MemorySink(None, False)
+        images = None
+    elif isinstance(sink, MemorySink):
+        memory = sink
+    entries: List[FileReport] = []
+    try:
+        convert_single_file(
+            pdf_path,
+            markdown_path or pdf_path.with_suffix(".md"),
+            force,
+            worker,
+            cache,
+            chunking,
+            limits,
+            images,
+            entries.append,
+            engine,
+            page_cache,
+            sink,
+            measure,
+            trace,
         )
-        return
+    except (ConversionError, OSError):
+        pass  # Already logged in convert_single_file and recorded in the entry
+    return entries[0], memory
+
+
+def _convert_job(
+    pdf_path: Path,
+    markdown_path: Optional[Path],
+    force: bool,
+    exists: bool = False,
+    measure: bool = False,
+    trace: bool = False,
+) -> _JobOutcome:
+    """Convert one row inside a pool process.
+
+    Args:
+        pdf_path: Path to the PDF file
+        markdown_path: Path to the output Markdown file, None to send the
+            Markdown back
+        force: Whether to overwrite existing file
+        exists: Whether the archive the parent writes to holds the row
+        measure: Whether to measure the row's timings and resource usage
+        trace: Whether to also trace its Python allocations
+
+    Returns:
+        The log records the conversion produced, its report entry and its
+        record if the Markdown is sent back
+    """
+    records: List[_LogRecord] = []
+    sink = MemorySink(_pool_sink, exists) if _pool_sink is not None else None
+
+    def collect(message: "Message") -> None:
+        record = message.record
+        records.append(
+            (
+                record["level"].name,
+                record["message"],
+                record["name"],
+                record["function"],
+                record["line"],
+            )
+        )
+
+    sink_id = logger.add(collect, level=0)
+    try:
+        entry, memory = _convert_row(
+            pdf_path,
+            markdown_path,
+            force,
+            _pool_worker,
+            _pool_cache,
+            _pool_chunking,
+            _pool_limits,
+            _pool_images,
+            _pool_engine,
+            _pool_page_cache,
+            sink,
+            measure,
+            trace,
+        )
+    finally:
+        logger.remove(sink_id)
+    return records, entry, memory.record if memory is not None else None
+
+
+def _replay_record(log_record: _LogRecord) -> None:
+    """Log a record collected in a pool process at its original location."""
+    level, message, name, function, line = log_record
+
+    def relocate(record: "Record") -> None:
+        record["name"] = name
+        record["function"] = function
+        record["line"] = line
+
+    logger.patch(relocate).log(level, message)
+
 
+def _finish_job(
+    pdf_path: Path,
+    markdown_path: Optional[Path],
+    future: "Future[_JobOutcome]",
+    sink: Optional[ArchiveSink] = None,
+) -> ConversionResult:
+    """Replay the log records of a finished pool job in one block.
+
+    Args:
+        pdf_path: Path to the PDF file the job converted
+        markdown_path: Path to the output Markdown file, None if the
+            Markdown was sent back
+        future: The finished job
+        sink: Archive to add the job's record to
+
+    Returns:
+        The result of the conversion
+    """
     try:
-        md_text = convert_pdf_to_markdown(pdf_path)
-        # Align tables for better readability
-        md_text = align_markdown_tables(md_text)
-        markdown_path.write_text(md_text, encoding="utf-8")
-        logger.info(f"Converted '{pdf_path}' to '{markdown_path}'")
+        records, entry, record = future.result()
     except Exception as e:
-        logger.error(f"Error converting '{pdf_path}': {e}")
-        raise
+        error = f"worker failed: {e}"
+        logger.error(f"Error converting '{pdf_path}': {error}")
+        return ConversionResult(pdf_path, markdown_path, status="failed", error=error)
+
+    for log_record in records:
+        _replay_record(log_record)
+    markdown = None
+    if record is not None and markdown_path is None:
+        markdown = record.text
+    elif record is not None and sink is not None:
+        try:
+            sink.add(record)
+        except Exception as e:
+            logger.error(f"Error writing '{pdf_path}' to '{sink.path}': {e}")
+            entry.status, entry.error = "failed", str(e) or type(e).__name__
+    return ConversionResult._from_report(pdf_path, markdown_path, entry, markdown)
+
+
+def _convert_parallel(
+    pairs: Iterable[Tuple[Path, Optional[Path]]],
+    force: bool,
+    backend: str,
+    jobs: int,
+    cache_dir: Optional[Path],
+    cache_size: int,
+    chunking: Optional[ChunkOptions],
+    limits: Optional[ResourceLimits],
+    images: Optional[ImageOptions],
+    engine: str,
+    page_cache: bool,
+    sink: Optional[ArchiveSink],
+    autoscale: Optional[AutoscaleOptions] = None,
+    measure: bool = False,
+    trace: bool = False,
+) -> Iterator[ConversionResult]:
+    """Convert rows on a pool of worker processes.
+
+    At most two jobs per worker are queued at a time so that huge CSV files
+    are not read into memory up front. Each worker writes its output as soon
+    as the file is converted; outputs that go to an archive or are returned
+    are sent back and handled here instead. With autoscaling, no job is
+    queued: as many run as the autoscaler's target, up to one per worker.
+
+    Args:
+        pairs: PDF paths and output Markdown paths, None to return the
+            Markdown
+        force: Whether to overwrite existing files
+        backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+        jobs: Number of worker processes
+        cache_dir: Conversion cache directory, None to disable the cache
+        cache_size: Conversion cache size cap in bytes
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single
+        images: Keep extracted images with these settings
+        engine: Conversion engine, one of "auto", "marker" or "text"
+        page_cache: Also cache conversions by the PDFs' page hashes
+        sink: Archive to write the Markdown to, None to write Markdown files
+        autoscale: Vary the number of concurrent jobs between its lower
+            bound and jobs, None to keep it at jobs
+        measure: Whether to measure the rows' timings and resource usage;
+            the autoscaler needs the usage, so it is measured for it too
+        trace: Whether to also trace the rows' Python allocations
+
+    Yields:
+        The result of each row, in order of completion
+    """
+    # Imported here, as multiprocessing takes a while to import
+    from concurrent.futures import ProcessPoolExecutor
 
+    pending: Set["Future[_JobOutcome]"] = set()
+    sources: Dict["Future[_JobOutcome]", Tuple[Path, Optional[Path]]] = {}
+    started: Dict["Future[_JobOutcome]", float] = {}
+    scaler = None if autoscale is None else Autoscaler(autoscale, jobs)
+    measure = measure or scaler is not None
+
+    def capacity() -> int:
+        if scaler is None:
+            return jobs * 2
+        return scaler.update(started.values())
+
+    def drain() -> List[ConversionResult]:
+        nonlocal pending
+        # With autoscaling, wake up now and then to check the system
+        timeout = None if autoscale is None else autoscale.interval
+        done, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
+        results = []
+        for future in done:
+            started.pop(future, None)
+            results.append(_finish_job(*sources.pop(future), future, sink))
+            if scaler is not None:
+                scaler.record(results[-1].usage)
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_pool_worker,
+        initargs=(
+            backend,
+            cache_dir,
+            cache_size,
+            chunking,
+            limits,
+            images,
+            engine,
+            page_cache,
+            sink.path if sink is not None else None,
+        ),
+    ) as pool:
+        for pdf_path, markdown_path in pairs:
+            while len(pending) >= capacity():
+                yield from drain()
+            exists = (
+                sink is not None
+                and markdown_path is not None
+                and sink.exists(pdf_path, markdown_path)
+            )
+            future = pool.submit(
+                _convert_job,
+                pdf_path,
+                markdown_path,
+                force,
+                exists,
+                measure,
+                measure and trace,
+            )
+            sources[future] = (pdf_path, markdown_path)
+            started[future] = time.monotonic()
+            pending.add(future)
+
+        while pending:
+            yield from drain()
+
+
+def iter_convert(
+    pairs: Iterable[Tuple[Path, Optional[Path]]],
+    *,
+    force: bool = False,
+    backend: str = "auto",
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    chunking: Optional[ChunkOptions] = None,
+    limits: Optional[ResourceLimits] = None,
+    images: Optional[ImageOptions] = None,
+    engine: str = "marker",
+    page_cache: bool = False,
+    sink: Optional[ArchiveSink] = None,
+    autoscale: Optional[AutoscaleOptions] = None,
+    measure: bool = False,
+    trace: bool = False,
+) -> Iterator[ConversionResult]:
+    """Convert PDFs and yield the result of each as soon as it is done.
+
+    The pairs are read as they are converted, so any number of them can be
+    given. A PDF without an output path is converted to Markdown that is
+    returned in its result; its images are not kept. A failed conversion
+    is yielded as a result with its error and does not stop the others.
+
+    The marker worker is created once so that its models stay loaded for
+    every PDF. With more than one job, the PDFs are fanned out to a pool of
+    processes that each keep their own worker, and results are yielded in
+    order of completion instead of the order of the pairs.
+
+    Unless measure is set, results only hold the outcome of each PDF: its
+    seconds, stages, pages and usage are left unset, so that conversions
+    nobody reports on pay nothing for instrumentation.
+
+    Args:
+        pairs: PDF paths and output Markdown paths, None to return the
+            Markdown
+        force: Whether to overwrite existing outputs
+        backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+        jobs: Number of PDFs to convert concurrently
+        cache_dir: Conversion cache directory, None to disable the cache
+        cache_size: Conversion cache size cap in bytes
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single; only marker_single
+            can be killed without killing the converter, so the subprocess
+            backend is used
+        images: Keep extracted images with these settings, None to discard
+            them
+        engine: "marker", "text" to convert from the PDFs' text layer, or
+            "auto" to use the text layer when a preflight finds it good enough
+        page_cache: Also cache conversions under the content hashes of the
+            PDFs' pages, so that PDFs saved again with the same pages are not
+            converted again
+        sink: Archive to write the Markdown to instead of the output paths
+        autoscale: Vary the number of concurrent PDFs between its lower
+            bound and jobs as memory and CPUs allow; it measures the memory
+            of marker_single, so the subprocess backend is used
+        measure: Whether to time the stages of each PDF, measure the
+            resources it used and count its pages
+        trace: With measure, also trace the Python allocations of aligning
+            and writing each PDF with tracemalloc, which slows them down
+            several times
 
-def convert_batch(csv_file: Path, force: bool = False) -> None:
+    Yields:
+        The result of each PDF
+
+    Raises:
+        ValueError: If limits or autoscaling are asked for with the in-process
+            backend
+    """
+    if limits is not None:
+        if backend == "inprocess":
+            raise ValueError("Time and memory limits need the subprocess backend")
+        backend = "subprocess"
+    if autoscale is not None:
+        if backend == "inprocess":
+            raise ValueError("Autoscaling needs the subprocess backend")
+        backend = "subprocess"
+    if jobs > 1:
+        yield from _convert_parallel(
+            pairs,
+            force,
+            backend,
+            jobs,
+            cache_dir,
+            cache_size,
+            chunking,
+            limits,
+            images,
+            engine,
+            page_cache,
+            sink,
+            autoscale,
+            measure,
+            trace,
+        )
+        return
+
+    worker = create_worker(backend)
+    cache = create_cache(cache_dir, cache_size)
+    for pdf_path, markdown_path in pairs:
+        entry, memory = _convert_row(
+            pdf_path,
+            markdown_path,
+            force,
+            worker,
+            cache,
+            chunking,
+            limits,
+            images,
+            engine,
+            page_cache,
+            sink,
+            measure,
+            trace,
+        )
+        markdown = memory.record.text if memory and memory.record else None
+        yield ConversionResult._from_report(pdf_path, markdown_path, entry, markdown)
+
+    if cache is not None:
+        logger.info(f"Conversion cache: {cache.stats()}")
+
+
+def _reject_row(
+    pdf_path: Path,
+    markdown_path: Path,
+    reason: str,
+    on_report: Optional[Callable[[FileReport], None]] = None,
+    job_store: Optional[JobStore] = None,
+) -> None:
+    """Report a batch row that failed the scheduler's preflight."""
+    error = f"Preflight: {reason}"
+    if on_report is not None:
+        on_report(FileReport(str(pdf_path), str(markdown_path), "failed", error=error))
+    if job_store is not None:
+        job_store.reject(pdf_path, markdown_path, error)
+
+
+def _chain_reports(
+    first: Callable[[FileReport], None],
+    second: Optional[Callable[[FileReport], None]],
+) -> Callable[[FileReport], None]:
+    """Return a report callback that calls two callbacks in turn."""
+
+    def on_report(entry: FileReport) -> None:
+        first(entry)
+        if second is not None:
+            second(entry)
+
+    return on_report
+
+
+def convert_batch(
+    csv_file: Path,
+    force: bool = False,
+    backend: str = "auto",
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    incremental: bool = False,
+    chunking: Optional[ChunkOptions] = None,
+    limits: Optional[ResourceLimits] = None,
+    images: Optional[ImageOptions] = None,
+    report: Optional[RunReport] = None,
+    shard: Optional[Shard] = None,
+    job_store: Optional[JobStore] = None,
+    engine: str = "marker",
+    page_cache: bool = False,
+    order: str = "csv",
+    sink: Optional[ArchiveSink] = None,
+    autoscale: Optional[AutoscaleOptions] = None,
+) -> None:
     """Convert multiple PDF files using a CSV file.
 
+    The rows are converted by iter_convert, whose results are recorded in
+    the run report, the manifest or the job store.
+
+    In incremental mode a manifest next to the CSV file records what each
+    row was converted from, and only rows whose input was added or changed,
+    or whose output is missing, are converted again.
+
+    With a job store the rows are imported into the store once and claimed
+    from it one at a time, so that an interrupted batch resumes where it
+    stopped and several runs can work through the same batch.
+
+    In any order but "csv", every row is preflighted before the first one is
+    converted, rows that fail the preflight are rejected, and the rest are
+    ordered by a cost model fitted to the history of earlier runs.
+
     Args:
         csv_file: Path to CSV file with PDF/Markdown pairs
         force: Whether to overwrite existing files
+        backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+        jobs: Number of files to convert concurrently
+        cache_dir: Conversion cache directory, None to disable the cache
+        cache_size: Conversion cache size cap in bytes
+        incremental: Only convert rows that changed since the last run
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single
+        images: Keep extracted images with these settings
+        report: Run report to record each row's outcome and timings in
+        shard: Only convert the rows of this shard of the batch
+        job_store: Track the rows' conversion state in this store, which
+            incremental mode cannot be combined with
+        engine: Conversion engine, one of "auto", "marker" or "text"
+        page_cache: Also cache conversions by the PDFs' page hashes
+        order: "csv" to convert rows in batch file order, "longest" or
+            "shortest" to convert them by estimated duration
+        sink: Archive to write the Markdown to instead of the Markdown
+            paths, which incremental mode and images cannot be combined with
+        autoscale: Vary the number of concurrent rows up to jobs
+
+    Raises:
+        ValueError: If both a job store and incremental mode are given, or
+            an archive and incremental mode or images
     """
-    with csv_file.open("r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:  # Skip empty lines
-                continue
+    if job_store is not None and incremental:
+        raise ValueError("A job store cannot be combined with incremental mode")
+    if sink is not None and (incremental or images is not None):
+        raise ValueError(
+            "An archive cannot be combined with incremental mode or images"
+        )
+    rows = read_batch(csv_file)
+    if shard is not None:
+        rows = shard.filter(rows)
+    on_report: Optional[Callable[[FileReport], None]] = None
+    if report is not None:
+        on_report = report.add
+    manifest: Optional[BatchManifest] = None
+    on_success: Optional[Callable[[Path, Path], None]] = None
+    on_failure: Optional[Callable[[Path, Path, str], None]] = None
+    heartbeat: ContextManager[None] = nullcontext()
+    if incremental:
+        manifest = BatchManifest.load(BatchManifest.path_for(csv_file, shard))
+        if not force:
+            rows = manifest.filter(rows)
+        # Rows that pass the filter have stale outputs that must be replaced
+        force = True
+        on_success = manifest.record
 
-            parts = line.split(",")
-            if len(parts) != 2:
-                logger.error(f"Invalid CSV line: {line}")
-                continue
+    history: Optional[History] = None
+    if order != "csv":
+        history = History.load(History.path_for(csv_file))
+        rows = schedule(
+            rows,
+            order,
+            CostModel.fit(history.samples),
+            force,
+            partial(_reject_row, on_report=on_report, job_store=job_store),
+            (sink or FileSink()).exists,
+        )
+        on_report = _chain_reports(history.record, on_report)
 
-            pdf_path = Path(parts[0].strip())
-            markdown_path = Path(parts[1].strip())
+    if job_store is not None:
+        # Rows are imported in scheduled order and claimed in that order
+        owner = job_owner()
+        job_store.import_batch(csv_file, rows, shard)
+        job_store.recover()
+        rows = job_store.claims(owner, shard)
+        on_success = partial(job_store.complete, owner)
+        on_failure = partial(job_store.fail, owner)
+        heartbeat = job_store.heartbeat(owner)
 
-            try:
-                _convert_single_file(pdf_path, markdown_path, force)
-            except Exception:
-                # Error already logged in _convert_single_file
-                continue
+    results = iter_convert(
+        rows,
+        force=force,
+        backend=backend,
+        jobs=jobs,
+        cache_dir=cache_dir,
+        cache_size=cache_size,
+        chunking=chunking,
+        limits=limits,
+        images=images,
+        engine=engine,
+        page_cache=page_cache,
+        sink=sink,
+        autoscale=autoscale,
+        measure=on_report is not None,
+        trace=report is not None,
+    )
+    try:
+        with heartbeat:
+            for result in results:
+                if on_report is not None:
+                    on_report(result.to_report())
+                assert result.output is not None  # Batch rows have one
+                if result.status != "failed":
+                    if on_success is not None:
+                        on_success(result.pdf, result.output)
+                elif on_failure is not None:
+                    on_failure(result.pdf, result.output, result.error or "failed")
+    finally:
+        if manifest is not None:
+            manifest.save()
+        if history is not None:
+            history.save()
 
 
 def convert(
@@ -84,6 +895,22 @@ def convert(
     *,
     file: Optional[Path] = None,
     force: bool = False,
+    backend: str = "auto",
+    jobs: int = 1,
+    cache_dir: Optional[Path] = None,
+    cache_size: int = DEFAULT_CACHE_SIZE,
+    incremental: bool = False,
+    chunking: Optional[ChunkOptions] = None,
+    limits: Optional[ResourceLimits] = None,
+    images: Optional[ImageOptions] = None,
+    report: Optional[RunReport] = None,
+    shard: Optional[Shard] = None,
+    job_store: Optional[JobStore] = None,
+    engine: str = "marker",
+    page_cache: bool = False,
+    order: str = "csv",
+    sink: Optional[ArchiveSink] = None,
+    autoscale: Optional[AutoscaleOptions] = None,
 ) -> None:
     """Convert PDF to Markdown.
 
@@ -92,55 +919,492 @@ def convert(
         markdown: Path to output Markdown file
         file: Path to CSV file for batch conversion
         force: Whether to overwrite existing files
+        backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+        jobs: Number of files to convert concurrently in batch mode
+        cache_dir: Conversion cache directory, None to disable the cache
+        cache_size: Conversion cache size cap in bytes
+        incremental: Only convert batch rows that changed since the last run
+        chunking: Convert large PDFs as page ranges with these settings
+        limits: Time and memory limits for marker_single, which make the
+            "auto" backend use marker_single
+        images: Keep extracted images with these settings, None to discard
+            them
+        report: Run report to record each file's outcome and timings in
+        shard: Only convert the rows of this shard of the batch file
+        job_store: Track the batch rows' conversion state in this store
+        engine: "marker", "text" to convert from the PDFs' text layer, or
+            "auto" to use the text layer when a preflight finds it good enough
+        page_cache: Also cache conversions under the content hashes of the
+            PDFs' pages, so that PDFs saved again with the same pages are not
+            converted again
+        order: Order of the batch rows: "csv", or "longest" or "shortest"
+            first by estimated duration
+        sink: Archive to write the Markdown to, keyed by PDF path, instead
+            of the Markdown paths
+        autoscale: Vary the number of files converted concurrently in batch
+            mode between its lower bound and jobs
+
+    Raises:
+        ConversionError: If a single PDF could not be converted
+        ValueError: If limits or autoscaling are asked for with the
+            in-process backend
     """
     if file:
-        convert_batch(file, force)
+        convert_batch(
+            file,
+            force,
+            backend,
+            jobs,
+            cache_dir,
+            cache_size,
+            incremental,
+            chunking,
+            limits,
+            images,
+            report,
+            shard,
+            job_store,
+            engine,
+            page_cache,
+            order,
+            sink,
+            autoscale,
+        )
     elif pdf and markdown:
-        _convert_single_file(pdf, markdown, force)
+        (result,) = iter_convert(
+            [(pdf, markdown)],
+            force=force,
+            backend=backend,
+            cache_dir=cache_dir,
+            cache_size=cache_size,
+            chunking=chunking,
+            limits=limits,
+            images=images,
+            engine=engine,
+            page_cache=page_cache,
+            sink=sink,
+            measure=report is not None,
+            trace=report is not None,
+        )
+        if report is not None:
+            report.add(result.to_report())
+        if result.status == "failed":
+            raise ConversionError(result.error)
     else:
         logger.error("Please provide either PDF/Markdown paths or a CSV file.")
         sys.exit(1)
 
 
-def main() -> None:
+def positive_int(value: str) -> int:
+    """Parse a strictly positive integer command line value."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
+def _positive_float(value: str) -> float:
+    """Parse a strictly positive number command line value."""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+    return number
+
+
+def _shard(value: str) -> Shard:
+    """Parse an I/N shard command line value."""
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the --log-file, --no-log-file and --log-level options to a parser."""
+    parser.add_argument(
+        "--log-file",
+        type=Path,
+        default=DEFAULT_LOG_FILE,
+        help="Log errors to this file, created on the first error "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-log-file",
+        dest="log_file",
+        action="store_const",
+        const=None,
+        help="Do not log errors to a file",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str.upper,
+        choices=LOG_LEVELS,
+        default="INFO",
+        help="Lowest level of messages printed to stderr (default: %(default)s)",
+    )
+
+
+def configure_logging(args: argparse.Namespace) -> None:
+    """Replace loguru's default handler with the ones the options ask for."""
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    if args.log_file is not None:
+        logger.add(args.log_file, level="ERROR", encoding="utf-8", delay=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Main entry point for the CLI."""
-    parser = argparse.ArgumentParser(description="Convert PDF to Markdown")
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in _SUBCOMMANDS:
+        module = importlib.import_module(f".{_SUBCOMMANDS[argv[0]]}", __package__)
+        module.main(argv[1:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Convert PDF to Markdown",
+        epilog="Run 'pdf2markdown serve --help' for the conversion daemon, "
+        "'pdf2markdown watch --help' for watch-folder mode and "
+        "'pdf2markdown status --help' for the progress of a job store.",
+    )
     parser.add_argument("pdf", type=Path, nargs="?", help="Path to the PDF file")
     parser.add_argument(
         "markdown", type=Path, nargs="?", help="Path to the output Markdown file"
     )
-    parser.add_argument("-f", "--file", type=Path, help="Path to CSV batch file")
+    parser.add_argument(
+        "-f",
+        "--file",
+        type=Path,
+        help="Path to CSV, TSV (.tsv) or JSON Lines (.jsonl) batch file",
+    )
     parser.add_argument(
         "-F",
         "--force",
         action="store_true",
         help="Force overwrite the output file(s) if it exists",
     )
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="marker",
+        help="Convert with marker, from the PDF's embedded text layer, or "
+        "pick per file: auto samples the text layer and skips marker for "
+        "clean, born-digital PDFs (default: marker)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="auto",
+        help="Run marker in-process with models kept loaded, or as a "
+        "marker_single subprocess per file (default: auto)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of CSV rows to convert concurrently, or with --autoscale "
+        "the most to convert concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--autoscale",
+        action="store_true",
+        help="Start with --min-jobs rows at once and raise or lower the number "
+        "up to --jobs as available memory, load and the peak memory of recent "
+        "rows allow; uses the subprocess backend",
+    )
+    parser.add_argument(
+        "--min-jobs",
+        type=positive_int,
+        metavar="N",
+        help="With --autoscale, the fewest rows to convert concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--memory-reserve",
+        type=positive_int,
+        metavar="MIB",
+        help="With --autoscale, available memory to leave to the rest of the "
+        "system (default: 1024)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="Directory of a conversion cache keyed by PDF content and settings",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=positive_int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Conversion cache size cap in MiB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--page-cache",
+        action="store_true",
+        help="With --cache-dir, also cache conversions under the content "
+        "hashes of the PDFs' pages, so that PDFs saved again with the same "
+        "pages are not converted again; the output does not change",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Only convert CSV rows whose PDF was added or changed, or whose "
+        "output is missing, according to a manifest next to the CSV file",
+    )
+    parser.add_argument(
+        "--shard",
+        type=_shard,
+        metavar="I/N",
+        help="Only convert the rows of shard I of N (I counted from 0), "
+        "assigned by a hash of the PDF path",
+    )
+    parser.add_argument(
+        "--order",
+        choices=ORDERS,
+        default="csv",
+        help="Convert batch rows in file order, or preflight them all and "
+        "convert the longest or the shortest first, estimated from the page "
+        "counts and sizes and the durations of earlier runs (default: csv)",
+    )
+    parser.add_argument(
+        "--job-store",
+        type=Path,
+        metavar="PATH",
+        help="Import the batch file once into this SQLite database and track "
+        "each row's state there, so that an interrupted batch resumes where "
+        "it stopped; runs sharing the database share the work",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=positive_int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help="With --job-store, give a row up after this many failed "
+        "conversions (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=positive_int,
+        help="Convert large PDFs as ranges of this many pages in parallel",
+    )
+    parser.add_argument(
+        "--chunk-threshold",
+        type=positive_int,
+        default=ChunkOptions.threshold,
+        help="Only chunk PDFs with more pages than this (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--chunk-jobs",
+        type=positive_int,
+        default=ChunkOptions.jobs,
+        help="Number of chunks of one PDF converted concurrently "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=_positive_float,
+        metavar="SECONDS",
+        help="Kill marker_single after this many seconds per file",
+    )
+    parser.add_argument(
+        "--page-timeout",
+        type=_positive_float,
+        metavar="SECONDS",
+        help="Kill marker_single after this many seconds per page",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=positive_int,
+        metavar="MIB",
+        help="Kill marker_single when it and its children use more resident "
+        "memory than this",
+    )
+    parser.add_argument(
+        "--max-address-space",
+        type=positive_int,
+        metavar="MIB",
+        help="Address space limit (RLIMIT_AS) of marker_single",
+    )
+    parser.add_argument(
+        "--keep-images",
+        action="store_true",
+        help="Move the extracted images to <name>_assets next to each "
+        "Markdown file and point the image links at them",
+    )
+    parser.add_argument(
+        "--image-store",
+        type=Path,
+        metavar="DIR",
+        help="With --keep-images, hardlink identical images of all documents "
+        "to one file in this directory, on the same filesystem as the outputs",
+    )
+    parser.add_argument(
+        "--sink",
+        type=Path,
+        metavar="ARCHIVE",
+        help="Write the Markdown to this archive, indexed by PDF path, instead "
+        "of one file per PDF: JSON Lines (.jsonl, .jsonl.gz, .jsonl.zst), tar "
+        "(.tar) or SQLite (.sqlite, .sqlite3, .db)",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        help="Write per-file stage timings and a run summary to this JSONL file",
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=Path,
+        metavar="PATH",
+        help="Write the run summary to this Prometheus textfile",
+    )
+    add_logging_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    configure_logging(args)
 
-    # Handle different argument combinations
-    if args.file:
-        if not args.file.exists():
-            print(f"File '{args.file}' does not exist.")
-            sys.exit(1)
-        if not args.file.is_file():
-            print(f"'{args.file}' is not a file.")
-            sys.exit(1)
-        if args.pdf or args.markdown:
-            print("You can't specify both a CSV file and PDF/Markdown files.")
-            sys.exit(1)
+    chunking = None
+    if args.chunk_size:
+        chunking = ChunkOptions(args.chunk_size, args.chunk_threshold, args.chunk_jobs)
 
-        convert(file=args.file, force=args.force)
+    limits = None
+    limit_args = (
+        args.timeout,
+        args.page_timeout,
+        args.max_memory,
+        args.max_address_space,
+    )
+    if any(value is not None for value in limit_args):
+        if args.backend == "inprocess":
+            parser.error("Time and memory limits need the subprocess backend.")
+        # Only marker_single can be killed without killing the converter
+        args.backend = "subprocess"
+        limits = ResourceLimits(
+            args.timeout,
+            args.page_timeout,
+            args.max_memory and args.max_memory * 1024 * 1024,
+            args.max_address_space and args.max_address_space * 1024 * 1024,
+        )
 
-    elif args.pdf and args.markdown:
-        args.markdown.parent.mkdir(parents=True, exist_ok=True)
-        convert(pdf=args.pdf, markdown=args.markdown, force=args.force)
+    autoscale = None
+    if args.autoscale:
+        if args.file is None:
+            parser.error("--autoscale needs a batch file.")
+        if args.backend == "inprocess":
+            parser.error("--autoscale needs the subprocess backend.")
+        args.backend = "subprocess"
+        defaults = AutoscaleOptions()
+        min_jobs = args.min_jobs or defaults.min_jobs
+        if min_jobs > args.jobs:
+            parser.error("--min-jobs cannot be more than --jobs.")
+        reserve = defaults.reserve
+        if args.memory_reserve is not None:
+            reserve = args.memory_reserve * 1024 * 1024
+        job_memory = defaults.job_memory
+        if limits is not None and limits.max_memory is not None:
+            # No job outgrows the memory limit
+            job_memory = min(job_memory, limits.max_memory)
+        autoscale = AutoscaleOptions(min_jobs, reserve, job_memory)
+    elif args.min_jobs is not None or args.memory_reserve is not None:
+        parser.error("--min-jobs and --memory-reserve need --autoscale.")
 
-    else:
-        print("Please provide either PDF/Markdown files or a CSV file.")
-        parser.print_help()
-        sys.exit(1)
+    if args.page_cache and args.cache_dir is None:
+        parser.error("--page-cache needs --cache-dir.")
+    if args.shard is not None and args.file is None:
+        parser.error("--shard needs a batch file.")
+    if args.order != "csv" and args.file is None:
+        parser.error("--order needs a batch file.")
+    if args.job_store is not None:
+        if args.file is None:
+            parser.error("--job-store needs a batch file.")
+        if args.incremental:
+            parser.error("--job-store and --incremental cannot be combined.")
+
+    images = None
+    if args.keep_images:
+        images = ImageOptions(args.image_store)
+    elif args.image_store is not None:
+        parser.error("--image-store needs --keep-images.")
+    if args.sink is not None and (args.keep_images or args.incremental):
+        parser.error("--sink cannot be combined with --keep-images or --incremental.")
+
+    report = None
+    if args.report is not None or args.prometheus is not None:
+        report = RunReport(args.report, args.prometheus)
+
+    sink = None
+    if args.sink is not None:
+        try:
+            sink = open_sink(args.sink)
+        except (ValueError, RuntimeError) as e:
+            parser.error(str(e))
+
+    job_store = None
+    if args.job_store is not None:
+        job_store = JobStore(args.job_store, max_attempts=args.max_attempts)
+
+    try:
+        # Handle different argument combinations
+        if args.file:
+            if not args.file.exists():
+                print(f"File '{args.file}' does not exist.")
+                sys.exit(1)
+            if not args.file.is_file():
+                print(f"'{args.file}' is not a file.")
+                sys.exit(1)
+            if args.pdf or args.markdown:
+                print("You can't specify both a CSV file and PDF/Markdown files.")
+                sys.exit(1)
+
+            convert(
+                file=args.file,
+                force=args.force,
+                backend=args.backend,
+                jobs=args.jobs,
+                cache_dir=args.cache_dir,
+                cache_size=args.cache_size * 1024 * 1024,
+                incremental=args.incremental,
+                shard=args.shard,
+                job_store=job_store,
+                engine=args.engine,
+                page_cache=args.page_cache,
+                order=args.order,
+                sink=sink,
+                autoscale=autoscale,
+                chunking=chunking,
+                limits=limits,
+                images=images,
+                report=report,
+            )
+
+        elif args.pdf and args.markdown:
+            args.markdown.parent.mkdir(parents=True, exist_ok=True)
+            convert(
+                pdf=args.pdf,
+                markdown=args.markdown,
+                force=args.force,
+                backend=args.backend,
+                cache_dir=args.cache_dir,
+                cache_size=args.cache_size * 1024 * 1024,
+                engine=args.engine,
+                page_cache=args.page_cache,
+                sink=sink,
+                chunking=chunking,
+                limits=limits,
+                images=images,
+                report=report,
+            )
+
+        else:
+            print("Please provide either PDF/Markdown files or a CSV file.")
+            parser.print_help()
+            sys.exit(1)
+
+    finally:
+        if report is not None:
+            report.close()
+        if job_store is not None:
+            job_store.close()
+        if sink is not None:
+            sink.close()
 
 
 if __name__ == "__main__":
@@ -2,66 +2,370 @@
 
 """PDF to Markdown conversion using marker-pdf."""
 
-import subprocess
+import io
 import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
 
 from loguru import logger
 
+from .cache import ConversionCache
+from .errors import ConversionError
+from .limits import ResourceLimits, run_limited
+from .pdfinfo import page_count
+from .progress import ProgressCallback
+from .timing import stage
 
-def convert_pdf_to_markdown(pdf_path: Path) -> str:
+BACKENDS = ("auto", "inprocess", "subprocess")
+
+# First and last page of a conversion, zero-based and inclusive like marker's
+# --page_range option
+PageRange = Tuple[int, int]
+
+
+def marker_options(page_range: Optional[PageRange] = None) -> Dict[str, Any]:
+    """Return the marker settings for a conversion.
+
+    Args:
+        page_range: Pages to convert, None for the whole document
+
+    Returns:
+        Marker settings, as used for the config and the cache key
+    """
+    options: Dict[str, Any] = {"output_format": "markdown"}
+    if page_range is not None:
+        options["page_range"] = f"{page_range[0]}-{page_range[1]}"
+    return options
+
+
+def _marker_command(
+    pdf_path: Path, output_dir: Path, options: Dict[str, Any]
+) -> List[str]:
+    """Build the marker_single command line for a conversion."""
+    cmd = ["marker_single", str(pdf_path), "--output_dir", str(output_dir)]
+    for name, value in options.items():
+        cmd.extend([f"--{name}", str(value)])
+    cmd.append("--disable_multiprocessing")  # More stable for single file
+    return cmd
+
+
+class MarkerWorker:
+    """Long-lived in-process marker converter.
+
+    Loading marker's layout/OCR models dominates the runtime for short
+    documents, so the models are loaded once on first use and kept resident
+    for every document fed to this worker afterwards.
+    """
+
+    def __init__(self) -> None:
+        self._models: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def available() -> bool:
+        """Return whether marker's Python API can be imported."""
+        try:
+            import marker.converters.pdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def load(self) -> None:
+        """Load marker's models if they are not loaded yet."""
+        if self._models is not None:
+            return
+
+        from marker.models import create_model_dict
+
+        logger.info("Loading marker models...")
+        with stage("model_load"):
+            self._models = create_model_dict()
+
+    def convert(
+        self,
+        pdf_path: Path,
+        options: Optional[Dict[str, Any]] = None,
+        image_dir: Optional[Path] = None,
+    ) -> str:
+        """Convert a PDF with the resident models.
+
+        Args:
+            pdf_path: Path to the PDF file
+            options: Marker settings from marker_options()
+            image_dir: Directory to save the extracted images to, None to
+                discard them
+
+        Returns:
+            Markdown text
+        """
+        from marker.config.parser import ConfigParser
+        from marker.converters.pdf import PdfConverter
+        from marker.output import text_from_rendered
+
+        self.load()
+
+        config_parser = ConfigParser(
+            {**(options or marker_options()), "disable_multiprocessing": True}
+        )
+        converter = PdfConverter(
+            config=config_parser.generate_config_dict(),
+            artifact_dict=self._models,
+            processor_list=config_parser.get_processors(),
+            renderer=config_parser.get_renderer(),
+            llm_service=config_parser.get_llm_service(),
+        )
+        with stage("marker"):
+            rendered = converter(str(pdf_path))
+            text, _, images = text_from_rendered(rendered)
+        if image_dir is not None:
+            image_dir.mkdir(parents=True, exist_ok=True)
+            for name, image in images.items():
+                image.save(image_dir / name)
+        return str(text)
+
+    def close(self) -> None:
+        """Release the resident models."""
+        self._models = None
+
+
+def create_worker(backend: str = "auto") -> Optional[MarkerWorker]:
+    """Create a converter worker for the requested backend.
+
+    Args:
+        backend: One of "auto", "inprocess" or "subprocess"
+
+    Returns:
+        A MarkerWorker, or None when conversions should use marker_single
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'")
+    if backend == "subprocess":
+        return None
+    if MarkerWorker.available():
+        return MarkerWorker()
+    if backend == "inprocess":
+        logger.warning(
+            "marker's Python API is not available, falling back to marker_single"
+        )
+    return None
+
+
+def convert_pdf_to_markdown(
+    pdf_path: Path,
+    worker: Optional[MarkerWorker] = None,
+    cache: Optional[ConversionCache] = None,
+    page_range: Optional[PageRange] = None,
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> str:
     """Convert PDF to markdown using marker.
 
     Args:
         pdf_path: Path to the PDF file
+        worker: Warm in-process worker to use instead of marker_single
+        cache: Conversion cache to consult before running marker
+        page_range: Pages to convert, None for the whole document
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
 
     Returns:
         Markdown text
 
     Raises:
         RuntimeError: If marker-pdf is not installed or conversion fails
+        ConversionError: If marker fails or exceeds a limit
         FileNotFoundError: If the output file is not found
     """
-    logger.info("Converting PDF with marker...")
+    with marker_output(
+        pdf_path, worker, cache, page_range, limits, progress
+    ) as markdown:
+        return markdown.read()
 
-    try:
-        # Create temporary output directory
+
+@contextmanager
+def marker_output(
+    pdf_path: Path,
+    worker: Optional[MarkerWorker] = None,
+    cache: Optional[ConversionCache] = None,
+    page_range: Optional[PageRange] = None,
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Iterator[TextIO]:
+    """Convert PDF to markdown and open the result as a text stream.
+
+    With marker_single and no cache, the stream reads marker's output file
+    directly, so large documents never have to be held in memory as one
+    string. The file is removed when the context exits.
+
+    Args:
+        pdf_path: Path to the PDF file
+        worker: Warm in-process worker to use instead of marker_single
+        cache: Conversion cache to consult before running marker
+        page_range: Pages to convert, None for the whole document
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
+
+    Yields:
+        Text stream of the markdown
+
+    Raises:
+        RuntimeError: If marker-pdf is not installed or conversion fails
+        ConversionError: If marker fails or exceeds a limit
+        FileNotFoundError: If the output file is not found
+    """
+    options = marker_options(page_range)
+    if cache is not None:
+        with stage("cache"):
+            key = cache.key(pdf_path, options)
+            cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit for '{pdf_path}' ({cache.stats()})")
+            yield io.StringIO(cached)
+            return
+
+        logger.info(f"Cache miss for '{pdf_path}' ({cache.stats()})")
+        md_text = _run_marker(pdf_path, worker, options, limits, progress)
+        with stage("cache"):
+            cache.put(key, md_text)
+        yield io.StringIO(md_text)
+        return
+
+    if worker is not None:
+        yield io.StringIO(_run_marker(pdf_path, worker, options))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        md_file = _run_marker_single(
+            pdf_path, Path(temp_dir), options, limits, progress
+        )
+        with md_file.open(encoding="utf-8") as markdown:
+            yield markdown
+
+
+def _run_marker(
+    pdf_path: Path,
+    worker: Optional[MarkerWorker],
+    options: Dict[str, Any],
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> str:
+    """Run marker on a PDF with the worker, or marker_single without one.
+
+    Args:
+        pdf_path: Path to the PDF file
+        worker: Warm in-process worker to use instead of marker_single
+        options: Marker settings from marker_options()
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
+
+    Returns:
+        Markdown text
+    """
+    if worker is None:
         with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir)
-
-            # Run marker_single command
-            cmd = [
-                "marker_single",
-                str(pdf_path),
-                "--output_dir",
-                str(temp_path),
-                "--output_format",
-                "markdown",
-                "--disable_multiprocessing",  # More stable for single file
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=None)
-
-            if result.returncode != 0:
-                logger.error(f"Marker command failed: {result.stderr}")
-                raise RuntimeError(f"Marker conversion failed: {result.stderr}")
-
-            # Find the generated markdown file
-            output_name = pdf_path.stem
-
-            # Try with subdirectory first (common pattern)
-            md_file = temp_path / output_name / f"{output_name}.md"
-            if md_file.exists():
-                return md_file.read_text()
-
-            # Try without subdirectory
-            md_file = temp_path / f"{output_name}.md"
-            if md_file.exists():
-                return md_file.read_text()
-
-            # File not found at either location
-            logger.error("Could not find output file at expected locations")
-            raise FileNotFoundError("Marker output file not found")
+            md_file = _run_marker_single(
+                pdf_path, Path(temp_dir), options, limits, progress
+            )
+            with stage("read"):
+                return md_file.read_text(encoding="utf-8")
+
+    _log_conversion(options)
+    try:
+        return worker.convert(pdf_path, options)
+    except Exception as e:
+        logger.error(f"Error with marker conversion: {e}")
+        raise
+
+
+def _log_conversion(options: Dict[str, Any]) -> None:
+    if "page_range" in options:
+        logger.info(f"Converting pages {options['page_range']} with marker...")
+    else:
+        logger.info("Converting PDF with marker...")
+
+
+def _find_marker_output(pdf_path: Path, temp_path: Path) -> Path:
+    """Locate the markdown file marker_single wrote for a PDF.
+
+    Args:
+        pdf_path: Path to the PDF file
+        temp_path: Directory marker wrote its output to
+
+    Returns:
+        Path to the markdown file
+
+    Raises:
+        FileNotFoundError: If the output file is not found
+    """
+    # Find the generated markdown file
+    output_name = pdf_path.stem
+
+    # Try with subdirectory first (common pattern)
+    md_file = temp_path / output_name / f"{output_name}.md"
+    if md_file.exists():
+        return md_file
+
+    # Try without subdirectory
+    md_file = temp_path / f"{output_name}.md"
+    if md_file.exists():
+        return md_file
+
+    # File not found at either location
+    logger.error("Could not find output file at expected locations")
+    raise FileNotFoundError("Marker output file not found")
+
+
+def _page_count(
+    pdf_path: Path, options: Dict[str, Any], limits: Optional[ResourceLimits]
+) -> Optional[int]:
+    """Return the number of pages converted, if a per-page limit needs it."""
+    if limits is None or limits.page_timeout is None:
+        return None
+    if "page_range" in options:
+        first, last = options["page_range"].split("-")
+        return int(last) - int(first) + 1
+    return page_count(pdf_path)
+
+
+def _run_marker_single(
+    pdf_path: Path,
+    temp_path: Path,
+    options: Dict[str, Any],
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Path:
+    """Run marker_single on a PDF and locate its markdown output.
+
+    Args:
+        pdf_path: Path to the PDF file
+        temp_path: Directory marker writes its output to
+        options: Marker settings from marker_options()
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
+
+    Returns:
+        Path to the markdown file inside temp_path
+
+    Raises:
+        RuntimeError: If marker-pdf is not installed
+        ConversionError: If marker fails or exceeds a limit
+        FileNotFoundError: If the output file is not found
+    """
+    _log_conversion(options)
+
+    try:
+        # Run marker_single command
+        cmd = _marker_command(pdf_path, temp_path, options)
+
+        pages = _page_count(pdf_path, options, limits)
+        with stage("marker"):
+            returncode, stderr = run_limited(cmd, pdf_path, limits, pages, progress)
+
+        if returncode != 0:
+            logger.error(f"Marker command failed: {stderr}")
+            raise ConversionError(f"Marker conversion failed: {stderr}")
+
+        return _find_marker_output(pdf_path, temp_path)
 
     except FileNotFoundError as e:
         if "marker_single" in str(e):
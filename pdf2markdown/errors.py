@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""Structured errors for failed conversions.
+
+All of them derive from RuntimeError, which conversions raised before, so
+existing handlers keep working while batch code can tell a file that hit a
+limit from one that marker could not convert.
+"""
+
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+class ConversionError(RuntimeError):
+    """Marker failed to convert a PDF."""
+
+
+class ConversionTimeout(ConversionError):
+    """Marker ran longer than the time limit and was killed.
+
+    Attributes:
+        pdf_path: Path to the PDF file
+        timeout: Time limit in seconds
+    """
+
+    def __init__(self, pdf_path: Path, timeout: float) -> None:
+        super().__init__(f"Conversion of '{pdf_path}' timed out after {timeout:g}s")
+        self.pdf_path = pdf_path
+        self.timeout = timeout
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.pdf_path, self.timeout)
+
+
+class MemoryLimitExceeded(ConversionError):
+    """Marker used more memory than allowed and was killed.
+
+    Attributes:
+        pdf_path: Path to the PDF file
+        limit: Memory limit in bytes
+        used: Memory in use when marker was killed, None if unknown
+    """
+
+    def __init__(self, pdf_path: Path, limit: int, used: Optional[int] = None) -> None:
+        message = (
+            f"Conversion of '{pdf_path}' exceeded the memory limit of {limit >> 20} MiB"
+        )
+        if used is not None:
+            message += f" ({used >> 20} MiB in use)"
+        super().__init__(message)
+        self.pdf_path = pdf_path
+        self.limit = limit
+        self.used = used
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), (self.pdf_path, self.limit, self.used)
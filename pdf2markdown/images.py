@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+"""Keep the images marker extracts next to the converted Markdown.
+
+marker writes images beside its markdown file. To keep them without copying,
+marker's workspace is created next to the destination, on the same
+filesystem, and the images are moved into a ``<stem>_assets`` directory with
+os.replace once the Markdown is written, so that a failed write leaves no
+images behind. With an image store, identical images of different documents
+are hardlinks to one file named by its content hash.
+"""
+
+import os
+import re
+import tempfile
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import quote
+
+from loguru import logger
+
+from .cache import file_digest
+from .converter import (
+    MarkerWorker,
+    _log_conversion,
+    _run_marker_single,
+    marker_options,
+)
+from .limits import ResourceLimits
+from .progress import ProgressCallback
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
+# Markdown image link: ![alt](target "title")
+_IMAGE_LINK = re.compile(r"(!\[[^\]]*\]\()([^)\s]+)")
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    """Settings for keeping extracted images.
+
+    Attributes:
+        store: Directory of a content-addressed image store on the same
+            filesystem as the outputs, None to only move the images
+    """
+
+    store: Optional[Path] = None
+
+
+def assets_dir(markdown_path: Path) -> Path:
+    """Return the directory holding the images of a Markdown file."""
+    return markdown_path.with_name(f"{markdown_path.stem}_assets")
+
+
+def _link(source: Path, dest: Path) -> None:
+    """Hardlink source to dest, replacing dest atomically if it exists."""
+    tmp_path = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+    os.link(source, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+def _store_image(image: Path, dest: Path, store: Path) -> None:
+    """Put an image into the store and hardlink it to its destination.
+
+    Args:
+        image: Image written by marker
+        dest: Path of the image in the assets directory
+        store: Root of the image store
+
+    Raises:
+        OSError: If the image cannot be hardlinked, e.g. across filesystems
+    """
+    digest = file_digest(image)
+    stored = store / digest[:2] / f"{digest}{image.suffix.lower()}"
+    stored.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(image, stored)
+    except FileExistsError:
+        pass  # An identical image is stored already
+    _link(stored, dest)
+    image.unlink()
+
+
+def find_images(source_dir: Path) -> List[Path]:
+    """Return the images marker wrote to a directory, sorted by name."""
+    return [
+        path
+        for path in sorted(source_dir.iterdir())
+        if path.suffix.lower() in IMAGE_SUFFIXES and path.is_file()
+    ]
+
+
+def move_images(
+    source_dir: Path, assets: Path, store: Optional[Path] = None
+) -> List[str]:
+    """Move marker's images into an assets directory.
+
+    Images of an earlier conversion that the new one did not produce are
+    removed. The assets directory is removed if it ends up empty.
+
+    Args:
+        source_dir: Directory marker wrote its images to
+        assets: Assets directory next to the Markdown file
+        store: Image store to deduplicate through, None to only move
+
+    Returns:
+        File names of the moved images
+    """
+    images = find_images(source_dir)
+    if images:
+        assets.mkdir(parents=True, exist_ok=True)
+
+    for image in images:
+        dest = assets / image.name
+        if store is not None:
+            try:
+                _store_image(image, dest, store)
+                continue
+            except OSError as e:
+                logger.warning(f"Cannot deduplicate '{image.name}' via '{store}': {e}")
+        os.replace(image, dest)
+
+    names = [image.name for image in images]
+    if assets.is_dir():
+        for old in assets.iterdir():
+            if old.name not in names:
+                old.unlink()
+        if not names:
+            assets.rmdir()
+    return names
+
+
+def rewrite_links(
+    lines: Iterable[str], names: Iterable[str], prefix: str
+) -> Iterator[str]:
+    """Point image links at the assets directory.
+
+    The link targets are percent-encoded, so that names with spaces or other
+    special characters are valid link destinations.
+
+    Args:
+        lines: Markdown lines
+        names: File names of the moved images
+        prefix: Assets directory relative to the Markdown file
+
+    Yields:
+        Lines with the links of moved images rewritten
+    """
+    targets: Dict[str, str] = {name: quote(f"{prefix}/{name}") for name in names}
+    if not targets:
+        yield from lines
+        return
+
+    def replace(match: "re.Match[str]") -> str:
+        target = targets.get(match[2], match[2])
+        return f"{match[1]}{target}"
+
+    for line in lines:
+        yield _IMAGE_LINK.sub(replace, line) if "![" in line else line
+
+
+@contextmanager
+def marker_output_with_images(
+    pdf_path: Path,
+    markdown_path: Path,
+    options: ImageOptions,
+    worker: Optional[MarkerWorker] = None,
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Iterator[Iterable[str]]:
+    """Convert a PDF and move its images next to the Markdown file.
+
+    The conversion cache stores text only, so it is not consulted here.
+
+    Args:
+        pdf_path: Path to the PDF file
+        markdown_path: Path the Markdown will be written to
+        options: Image store settings
+        worker: Warm in-process worker to use instead of marker_single
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
+
+    Yields:
+        Markdown lines with image links pointing at the assets directory;
+        the images are moved there when the block exits without an error
+    """
+    assets = assets_dir(markdown_path)
+    markdown_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(
+        dir=markdown_path.parent, prefix=".pdf2markdown-"
+    ) as temp_dir:
+        temp_path = Path(temp_dir)
+        if worker is not None:
+            image_dir = temp_path / pdf_path.stem
+            _log_conversion(marker_options())
+            md_text = worker.convert(pdf_path, marker_options(), image_dir)
+            md_file = image_dir / f"{pdf_path.stem}.md"
+            md_file.write_text(md_text, encoding="utf-8")
+        else:
+            md_file = _run_marker_single(
+                pdf_path, temp_path, marker_options(), limits, progress
+            )
+
+        names = [image.name for image in find_images(md_file.parent)]
+        with md_file.open(encoding="utf-8") as markdown:
+            yield rewrite_links(markdown, names, assets.name)
+
+        # Images of a failed write are removed with marker's workspace
+        move_images(md_file.parent, assets, options.store)
+        if names:
+            logger.info(f"Moved {len(names)} images to '{assets}'")
@@ -0,0 +1,510 @@
+# -*- coding: utf-8 -*-
+
+"""Durable SQLite job queue for batch conversions.
+
+A batch file is imported into the store once. Runs then claim rows one at a
+time with a lease; a claimed row is marked done or failed when its conversion
+ends, so a run that dies resumes where it stopped. Any number of local runs
+can share a store: claims are single UPDATE statements inside BEGIN
+IMMEDIATE transactions, and the database runs in WAL mode so that ``status``
+readers never block the writers.
+
+Leases are renewed by a heartbeat thread while a run is alive. Rows leased
+to a run that crashed go back to the queue when the lease expires, or at once
+when the run was on this host and its process is gone.
+
+Runs of different shards of a batch may share a store: each shard imports
+its own rows, and a run only claims the rows of its shard.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .batchfile import Shard
+
+# Seconds a claimed row stays leased without a heartbeat
+DEFAULT_LEASE = 600.0
+
+# Conversions of a row before it is given up as failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Rows inserted per transaction while importing a batch file
+IMPORT_BATCH = 1000
+
+# Seconds of finished rows the throughput is measured over
+THROUGHPUT_WINDOW = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    pdf TEXT NOT NULL,
+    markdown TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    started REAL,
+    finished REAL,
+    UNIQUE (pdf, markdown)
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (state, attempts, id);
+CREATE INDEX IF NOT EXISTS jobs_lease ON jobs (state, lease_expires);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (state, finished);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    imported REAL NOT NULL
+);
+"""
+
+STATES = ("pending", "running", "done", "failed")
+
+
+def job_owner() -> str:
+    """Return the lease owner name of this process, ``host:pid``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, but belongs to another user
+    return True
+
+
+def _in_shard(pdf: str, index: int, count: int) -> bool:
+    """Return whether a row belongs to a shard, for use in SQL."""
+    return Shard(index, count).owns(Path(pdf))
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """Open the store in autocommit mode; transactions are explicit."""
+    conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+class JobStore:
+    """Batch rows and their conversion state in a SQLite database.
+
+    Attributes:
+        path: Path to the database file
+        lease: Seconds a claimed row stays leased without a heartbeat
+        max_attempts: Conversions of a row before it is given up as failed
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        lease: float = DEFAULT_LEASE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        """Open or create a job store.
+
+        Args:
+            path: Path to the database file
+            lease: Seconds a claimed row stays leased without a heartbeat
+            max_attempts: Conversions of a row before it is given up as failed
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._conn = _connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._conn.create_function("in_shard", 3, _in_shard, deterministic=True)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run statements in a write transaction that takes the lock up front."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def import_batch(
+        self,
+        batch_file: Path,
+        rows: Iterable[Tuple[Path, Path]],
+        shard: Optional[Shard] = None,
+    ) -> int:
+        """Add the rows of a batch file, unless that file was imported already.
+
+        The batch file is recognized by its resolved path, size and mtime and
+        the shard, so an unchanged file is not read again for the same shard.
+        Rows already in the store keep their state.
+
+        Args:
+            batch_file: Path to the batch file
+            rows: PDF/Markdown pairs read from the batch file, only those of
+                the shard if one is given
+            shard: Shard of the batch file the rows belong to, None for all
+
+        Returns:
+            Number of rows added to the store
+        """
+        key = str(batch_file.resolve())
+        if shard is not None:
+            key += f" shard {shard}"
+        stat = batch_file.stat()
+        known = self._conn.execute(
+            "SELECT size, mtime_ns FROM imports WHERE path = ?", (key,)
+        ).fetchone()
+        if known == (stat.st_size, stat.st_mtime_ns):
+            what = (
+                f"Shard {shard} of '{batch_file}'"
+                if shard is not None
+                else f"'{batch_file}'"
+            )
+            logger.info(f"{what} is already in job store '{self.path}'")
+            return 0
+
+        added = 0
+        batch: List[Tuple[str, str]] = []
+
+        def flush() -> None:
+            nonlocal added
+            with self._transaction() as conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (pdf, markdown) VALUES (?, ?)", batch
+                )
+                added += conn.total_changes - before
+            batch.clear()
+
+        for pdf_path, markdown_path in rows:
+            batch.append((str(pdf_path), str(markdown_path)))
+            if len(batch) >= IMPORT_BATCH:
+                flush()
+        flush()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, added, time.time()),
+            )
+        logger.info(f"Imported {added} new rows into job store '{self.path}'")
+        return added
+
+    def _expire(
+        self, conn: sqlite3.Connection, where: str, params: Tuple[Any, ...]
+    ) -> int:
+        """Return matching running rows to the queue, or fail exhausted ones."""
+        cursor = conn.execute(
+            "UPDATE jobs SET"
+            " state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+            " error = 'lease of ' || lease_owner || ' expired',"
+            " lease_owner = NULL, lease_expires = NULL"
+            f" WHERE state = 'running' AND {where}",
+            (self.max_attempts, *params),
+        )
+        return cursor.rowcount
+
+    def recover(self) -> int:
+        """Requeue rows leased to runs on this host whose process is gone.
+
+        Returns:
+            Number of rows taken back
+        """
+        host = socket.gethostname()
+        owners = [
+            owner
+            for (owner,) in self._conn.execute(
+                "SELECT DISTINCT lease_owner FROM jobs WHERE state = 'running'"
+            )
+        ]
+        taken = 0
+        for owner in owners:
+            owner_host, _, pid = owner.rpartition(":")
+            if owner_host != host or not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            with self._transaction() as conn:
+                taken += self._expire(conn, "lease_owner = ?", (owner,))
+        if taken:
+            logger.warning(f"Requeued {taken} rows of crashed runs")
+        return taken
+
+    def claim(
+        self, owner: str, shard: Optional[Shard] = None
+    ) -> Optional[Tuple[Path, Path]]:
+        """Lease the next queued row.
+
+        Rows whose lease expired are returned to the queue first. Rows that
+        were tried less often are claimed first, so retries go last.
+
+        Args:
+            owner: Lease owner name, see job_owner()
+            shard: Only claim rows of this shard, None to claim any row
+
+        Returns:
+            The PDF and Markdown paths of the claimed row, or None if the
+            queue is empty
+        """
+        in_shard: Tuple[Any, ...] = ()
+        where = ""
+        if shard is not None:
+            where = " AND in_shard(pdf, ?, ?)"
+            in_shard = (shard.index, shard.count)
+        now = time.time()
+        with self._transaction() as conn:
+            self._expire(conn, "lease_expires < ?", (now,))
+            row = conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1,"
+                " lease_owner = ?, lease_expires = ?, started = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE state = 'pending'"
+                f"{where} ORDER BY attempts, id LIMIT 1)"
+                " RETURNING pdf, markdown",
+                (owner, now + self.lease, now, *in_shard),
+            ).fetchone()
+        if row is None:
+            return None
+        return Path(row[0]), Path(row[1])
+
+    def claims(
+        self, owner: str, shard: Optional[Shard] = None
+    ) -> Iterator[Tuple[Path, Path]]:
+        """Claim rows one at a time until the queue is empty.
+
+        Args:
+            owner: Lease owner name, see job_owner()
+            shard: Only claim rows of this shard, None to claim any row
+
+        Yields:
+            PDF and Markdown paths of each claimed row
+        """
+        while (row := self.claim(owner, shard)) is not None:
+            yield row
+
+    def complete(self, owner: str, pdf_path: Path, markdown_path: Path) -> None:
+        """Mark a claimed row as done."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = 'done', error = NULL, finished = ?,"
+                " lease_owner = NULL, lease_expires = NULL"
+                " WHERE pdf = ? AND markdown = ? AND lease_owner = ?",
+                (time.time(), str(pdf_path), str(markdown_path), owner),
+            )
+
+    def fail(self, owner: str, pdf_path: Path, markdown_path: Path, error: str) -> None:
+        """Requeue a claimed row that failed, or fail it for good.
+
+        Args:
+            owner: Lease owner name, see job_owner()
+            pdf_path: Path to the PDF file of the row
+            markdown_path: Path to the Markdown file of the row
+            error: Why the conversion failed
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET"
+                " state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " error = ?, finished = ?, lease_owner = NULL, lease_expires = NULL"
+                " WHERE pdf = ? AND markdown = ? AND lease_owner = ?",
+                (
+                    self.max_attempts,
+                    error,
+                    time.time(),
+                    str(pdf_path),
+                    str(markdown_path),
+                    owner,
+                ),
+            )
+
+    def reject(self, pdf_path: Path, markdown_path: Path, error: str) -> None:
+        """Record a row that failed before it could be queued as failed.
+
+        A row that another run is converting is left alone.
+
+        Args:
+            pdf_path: Path to the PDF file of the row
+            markdown_path: Path to the Markdown file of the row
+            error: Why the row was rejected
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (pdf, markdown, state, error, finished)"
+                " VALUES (?, ?, 'failed', ?, ?)"
+                " ON CONFLICT (pdf, markdown) DO UPDATE SET state = 'failed',"
+                " error = excluded.error, finished = excluded.finished"
+                " WHERE state != 'running'",
+                (str(pdf_path), str(markdown_path), error, time.time()),
+            )
+
+    def release(self, owner: str) -> int:
+        """Requeue the rows of a run that stops early, without using up an attempt.
+
+        Returns:
+            Number of rows released
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = attempts - 1,"
+                " lease_owner = NULL, lease_expires = NULL"
+                " WHERE state = 'running' AND lease_owner = ?",
+                (owner,),
+            )
+        return cursor.rowcount
+
+    def retry_failed(self) -> int:
+        """Requeue all failed rows with fresh attempts.
+
+        Returns:
+            Number of rows requeued
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0 WHERE state = 'failed'"
+            )
+        return cursor.rowcount
+
+    @contextmanager
+    def heartbeat(self, owner: str) -> Iterator[None]:
+        """Renew the leases of a run while the block runs.
+
+        Leases are renewed from a thread with its own connection every third
+        of the lease. Rows still leased when the block exits, e.g. on Ctrl-C,
+        are released.
+
+        Args:
+            owner: Lease owner name, see job_owner()
+        """
+        stop = threading.Event()
+
+        def renew() -> None:
+            conn = _connect(self.path)
+            try:
+                while not stop.wait(self.lease / 3):
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(
+                        "UPDATE jobs SET lease_expires = ?"
+                        " WHERE state = 'running' AND lease_owner = ?",
+                        (time.time() + self.lease, owner),
+                    )
+                    conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+        thread = threading.Thread(target=renew, name="lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+            released = self.release(owner)
+            if released:
+                logger.info(f"Released {released} unfinished rows")
+
+    def stats(self, window: float = THROUGHPUT_WINDOW) -> Dict[str, Any]:
+        """Return the backlog and recent throughput of the store.
+
+        Args:
+            window: Seconds of finished rows the throughput is measured over
+
+        Returns:
+            Row counts per state, the backlog, the rows finished within the
+            window, files per minute over the window and the estimated
+            minutes until the backlog is done
+        """
+        counts = dict.fromkeys(STATES, 0)
+        for state, count in self._conn.execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        ):
+            counts[state] = count
+
+        now = time.time()
+        cutoff = now - window
+        recent, first = self._conn.execute(
+            "SELECT COUNT(*), MIN(started) FROM jobs"
+            " WHERE state = 'done' AND finished >= ?",
+            (cutoff,),
+        ).fetchone()
+        span = now - max(cutoff, first) if first is not None else 0.0
+        per_minute = recent / span * 60 if span > 0 else 0.0
+        backlog = counts["pending"] + counts["running"]
+        return {
+            **counts,
+            "total": sum(counts.values()),
+            "backlog": backlog,
+            "recent": recent,
+            "files_per_minute": round(per_minute, 2),
+            "eta_minutes": round(backlog / per_minute, 1) if per_minute else None,
+        }
+
+    def failures(self, limit: int = 20) -> List[Tuple[str, Optional[str]]]:
+        """Return the PDF paths and errors of rows that failed for good."""
+        return self._conn.execute(
+            "SELECT pdf, error FROM jobs WHERE state = 'failed' ORDER BY id LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of ``pdf2markdown status``."""
+    parser = argparse.ArgumentParser(
+        prog="pdf2markdown status",
+        description="Show the backlog and throughput of a job store",
+    )
+    parser.add_argument("job_store", type=Path, help="Path to the job store")
+    parser.add_argument("--json", action="store_true", help="Print the stats as JSON")
+    parser.add_argument(
+        "--failed", action="store_true", help="List rows that failed for good"
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Requeue rows that failed for good with fresh attempts",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.job_store.is_file():
+        parser.error(f"Job store '{args.job_store}' does not exist.")
+
+    store = JobStore(args.job_store)
+    try:
+        if args.retry_failed:
+            print(f"Requeued {store.retry_failed()} failed rows")
+        stats = store.stats()
+        if args.json:
+            print(json.dumps(stats))
+        else:
+            for state in STATES:
+                print(f"{state:<8} {stats[state]:>8}")
+            minutes = THROUGHPUT_WINDOW / 60
+            print(
+                f"Throughput: {stats['files_per_minute']} files/min "
+                f"over the last {minutes:g} min"
+            )
+            eta = stats["eta_minutes"]
+            print(
+                f"Backlog: {stats['backlog']} files"
+                + (f", about {eta} min left" if eta is not None else "")
+            )
+        if args.failed:
+            for pdf, error in store.failures():
+                print(f"{pdf}: {error}")
+    finally:
+        store.close()
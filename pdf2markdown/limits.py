@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+"""Time and memory limits for marker_single processes.
+
+marker_single runs in its own session so that it and every process it starts
+can be killed as a group: first with SIGTERM, then with SIGKILL if the group
+does not exit within a grace period. Memory is watched by summing the
+resident set size of the group from /proc, and the address space of the
+marker process can additionally be capped with RLIMIT_AS. The limits are
+checked while the process's pipes are read, see progress.py.
+
+The process is reaped with wait4 rather than by subprocess, so that its
+resource usage can be charged to the file being converted, see usage.py.
+"""
+
+import os
+import resource
+import selectors
+import signal
+import subprocess
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+from .errors import ConversionTimeout, MemoryLimitExceeded
+from .progress import OutputStream, ProgressCallback
+from .usage import charge_process
+
+# How often the limits are checked, in seconds
+CHECK_INTERVAL = 0.5
+
+# Bytes read from a pipe at a time
+READ_SIZE = 64 * 1024
+
+# Time a killed group gets to exit on SIGTERM before it is sent SIGKILL
+KILL_GRACE = 5.0
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Limits applied to each marker_single process.
+
+    They do not apply to the in-process backend, which cannot be killed
+    without killing the converter itself.
+
+    Attributes:
+        timeout: Wall-clock limit per file in seconds
+        page_timeout: Wall-clock limit per page in seconds; with timeout also
+            set, the smaller of the two limits applies
+        max_memory: Limit on the resident memory of marker and the processes
+            it started, in bytes
+        max_address_space: RLIMIT_AS of the marker process in bytes
+    """
+
+    timeout: Optional[float] = None
+    page_timeout: Optional[float] = None
+    max_memory: Optional[int] = None
+    max_address_space: Optional[int] = None
+
+    def time_limit(self, pages: Optional[int]) -> Optional[float]:
+        """Return the wall-clock limit for a document.
+
+        Args:
+            pages: Number of pages converted, None if unknown
+
+        Returns:
+            Limit in seconds, None for no limit
+        """
+        limits = []
+        if self.timeout is not None:
+            limits.append(self.timeout)
+        if self.page_timeout is not None and pages is not None:
+            limits.append(self.page_timeout * pages)
+        return min(limits, default=None)
+
+
+def group_rss(pgid: int) -> Optional[int]:
+    """Return the resident memory of a process group in bytes.
+
+    Args:
+        pgid: Process group ID
+
+    Returns:
+        Sum of the resident set sizes, None if /proc is not available
+    """
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except FileNotFoundError:
+        return None
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue  # The process exited
+        # Fields after the parenthesised command name, which may hold spaces
+        fields = stat[stat.rfind(b")") + 2 :].split()
+        if int(fields[2]) == pgid:
+            total += int(fields[21]) * page_size
+    return total
+
+
+def reap(process: "subprocess.Popen[bytes]", timeout: Optional[float] = None) -> bool:
+    """Wait for a subprocess to exit and charge its resource usage.
+
+    Args:
+        process: Subprocess to wait for
+        timeout: Seconds to wait, None to wait until it exits
+
+    Returns:
+        Whether the subprocess has exited
+    """
+    if process.returncode is not None:
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        flags = 0 if deadline is None else os.WNOHANG
+        pid, status, rusage = os.wait4(process.pid, flags)
+        if pid != 0:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            charge_process(rusage)
+            return True
+        assert deadline is not None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Back off like subprocess does while polling
+        delay = min(delay * 2, remaining, 0.05)
+        time.sleep(delay)
+
+
+def kill_process_group(process: "subprocess.Popen[bytes]") -> None:
+    """Terminate a process group led by a subprocess and reap the subprocess.
+
+    Args:
+        process: Subprocess started with start_new_session=True
+    """
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            break
+        if reap(process, KILL_GRACE):
+            break
+        logger.warning(f"Process group {process.pid} ignored {sig.name}")
+    reap(process)
+
+
+def run_limited(
+    cmd: List[str],
+    pdf_path: Path,
+    limits: Optional[ResourceLimits] = None,
+    pages: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[int, str]:
+    """Run a command in its own session within resource limits.
+
+    The child's pipes are read as they fill, so its output is never held in
+    memory as a whole: progress bars are passed to the callback and only
+    the last lines of stderr are kept.
+
+    Args:
+        cmd: Command line
+        pdf_path: PDF being converted, for error messages
+        limits: Limits to apply, None for no limits
+        pages: Number of pages converted, for the per-page time limit
+        progress: Called with each progress update of marker
+
+    Returns:
+        Return code and the tail of standard error
+
+    Raises:
+        ConversionTimeout: If the command ran out of time
+        MemoryLimitExceeded: If the command used too much memory
+    """
+    limits = limits or ResourceLimits()
+    time_limit = limits.time_limit(pages)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    watch = deadline is not None or limits.max_memory is not None
+
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    # marker's progress bars go to stderr; stdout is parsed the same way
+    stderr = OutputStream(progress)
+    streams = {"stdout": OutputStream(progress, tail_lines=0), "stderr": stderr}
+    try:
+        if limits.max_address_space is not None:
+            # Set from the parent: a preexec_fn is not safe in threaded
+            # programs, and marker allocates nothing big before it has started
+            resource.prlimit(
+                process.pid,
+                resource.RLIMIT_AS,
+                (limits.max_address_space, limits.max_address_space),
+            )
+
+        with selectors.DefaultSelector() as selector:
+            assert process.stdout is not None and process.stderr is not None
+            selector.register(process.stdout, selectors.EVENT_READ, "stdout")
+            selector.register(process.stderr, selectors.EVENT_READ, "stderr")
+            next_check = time.monotonic() + CHECK_INTERVAL
+
+            while selector.get_map() or process.returncode is None:
+                if selector.get_map():
+                    ready = selector.select(CHECK_INTERVAL if watch else None)
+                    for key, _ in ready:
+                        data = os.read(key.fd, READ_SIZE)
+                        streams[key.data].feed(data)
+                        if not data:
+                            selector.unregister(key.fileobj)
+                else:
+                    # Both pipes are closed; wait for the exit status
+                    reap(process, CHECK_INTERVAL if watch else None)
+
+                if not watch or time.monotonic() < next_check:
+                    continue
+                next_check = time.monotonic() + CHECK_INTERVAL
+
+                if deadline is not None and time.monotonic() > deadline:
+                    assert time_limit is not None
+                    logger.error(f"marker_single timed out on '{pdf_path}'")
+                    kill_process_group(process)
+                    raise ConversionTimeout(pdf_path, time_limit)
+
+                if limits.max_memory is not None:
+                    used = group_rss(process.pid)
+                    if used is not None and used > limits.max_memory:
+                        logger.error(f"marker_single ran out of memory on '{pdf_path}'")
+                        kill_process_group(process)
+                        raise MemoryLimitExceeded(pdf_path, limits.max_memory, used)
+    except BaseException:
+        if process.returncode is None:
+            kill_process_group(process)
+        raise
+    finally:
+        for pipe in (process.stdout, process.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    if (
+        process.returncode != 0
+        and limits.max_address_space is not None
+        and any("MemoryError" in line for line in stderr.tail)
+    ):
+        raise MemoryLimitExceeded(pdf_path, limits.max_address_space)
+    return process.returncode, stderr.text()
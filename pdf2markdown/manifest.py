@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+"""Manifest of batch inputs and outputs for incremental conversion."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from .batchfile import Shard
+from .cache import file_digest
+
+# Number of recorded conversions between two manifest saves
+SAVE_INTERVAL = 100
+
+
+class BatchManifest:
+    """Input and output fingerprints of previously converted batch rows.
+
+    The manifest is a JSON file stored next to the batch CSV. For each PDF it
+    records the size, mtime and SHA-256 of the input and the path and SHA-256
+    of the output. A row needs converting again only if its input is new or
+    has changed, or if its output is missing; the output hash is recorded
+    for auditing outputs and is not checked. Size and mtime are compared first,
+    so unchanged inputs are never rehashed.
+
+    The input of a row is fingerprinted when filter yields it, before it is
+    converted, and that fingerprint is recorded: a PDF replaced while it was
+    being converted no longer matches it and is converted again next time.
+    """
+
+    def __init__(self, path: Path, entries: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.entries: Dict[str, Any] = entries or {}
+        self._digests: Dict[str, str] = {}
+        # Fingerprints of the inputs yielded by filter, until recorded
+        self._inputs: Dict[str, Dict[str, Any]] = {}
+        self._unsaved = 0
+
+    @staticmethod
+    def path_for(csv_file: Path, shard: Optional[Shard] = None) -> Path:
+        """Return the manifest path of a batch CSV file.
+
+        Each shard of a batch keeps its own manifest, so hosts sharing the
+        batch file's directory never write the same manifest.
+        """
+        if shard is None:
+            return csv_file.with_name(csv_file.name + ".manifest.json")
+        suffix = f".shard-{shard.index}-of-{shard.count}.manifest.json"
+        return csv_file.with_name(csv_file.name + suffix)
+
+    @classmethod
+    def load(cls, path: Path) -> "BatchManifest":
+        """Load a manifest, or start an empty one if it does not exist.
+
+        Args:
+            path: Path to the manifest file
+
+        Returns:
+            The loaded manifest
+        """
+        try:
+            entries = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            entries = {}
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring unreadable manifest '{path}': {e}")
+            entries = {}
+        return cls(path, entries)
+
+    def _digest(self, pdf_path: Path) -> str:
+        key = str(pdf_path)
+        if key not in self._digests:
+            self._digests[key] = file_digest(pdf_path)
+        return self._digests[key]
+
+    def _fingerprint(self, pdf_path: Path) -> Dict[str, Any]:
+        """Return the size, mtime and SHA-256 of an input as it is now."""
+        stat = pdf_path.stat()
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": self._digest(pdf_path),
+        }
+
+    def needs_conversion(self, pdf_path: Path, markdown_path: Path) -> bool:
+        """Return whether a batch row has to be converted.
+
+        Args:
+            pdf_path: Path to the PDF file
+            markdown_path: Path to the output Markdown file
+
+        Returns:
+            True if the input is new or changed or the output is missing
+        """
+        entry = self.entries.get(str(pdf_path))
+        if entry is None or entry["output"] != str(markdown_path):
+            return True
+        if not markdown_path.exists():
+            return True
+
+        stat = pdf_path.stat()
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+            return False
+        if stat.st_size != entry["size"]:
+            return True
+
+        # Same size but touched: only the content hash can tell.
+        if self._digest(pdf_path) != entry["sha256"]:
+            return True
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._changed()
+        return False
+
+    def filter(self, rows: Iterable[Tuple[Path, Path]]) -> Iterator[Tuple[Path, Path]]:
+        """Yield only the batch rows that need converting.
+
+        Args:
+            rows: PDF/Markdown pairs
+
+        Yields:
+            PDF/Markdown pairs whose input changed or whose output is missing
+        """
+        for pdf_path, markdown_path in rows:
+            try:
+                changed = self.needs_conversion(pdf_path, markdown_path)
+                if changed:
+                    self._inputs[str(pdf_path)] = self._fingerprint(pdf_path)
+            except OSError:
+                # Let the conversion itself report unreadable inputs
+                changed = True
+
+            if changed:
+                yield pdf_path, markdown_path
+            else:
+                logger.debug(f"Skipping unchanged '{pdf_path}'")
+
+    def record(self, pdf_path: Path, markdown_path: Path) -> None:
+        """Record a successful conversion.
+
+        The input is recorded as filter found it before the conversion, or
+        as it is now if the row did not come from filter. The output is
+        hashed as just written.
+
+        Args:
+            pdf_path: Path to the PDF file
+            markdown_path: Path to the output Markdown file
+        """
+        key = str(pdf_path)
+        fingerprint = self._inputs.pop(key, None) or self._fingerprint(pdf_path)
+        self.entries[key] = {
+            **fingerprint,
+            "output": str(markdown_path),
+            "output_sha256": file_digest(markdown_path),
+        }
+        self._digests.pop(key, None)
+        self._changed()
+
+    def _changed(self) -> None:
+        self._unsaved += 1
+        if self._unsaved >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self._unsaved = 0
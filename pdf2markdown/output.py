@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+"""Writing converted Markdown to disk."""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Iterable
+
+
+def write_markdown(lines: Iterable[str], markdown_path: Path) -> None:
+    """Stream lines into a Markdown file.
+
+    The lines are written to a temporary file next to the output, which then
+    replaces it, so an interrupted conversion never leaves a truncated file
+    that later runs would skip as already converted.
+
+    Args:
+        lines: Markdown lines with their line endings
+        markdown_path: Path to the output Markdown file
+    """
+    tmp_path = markdown_path.with_name(f".{markdown_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp_path.open("x", encoding="utf-8") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, markdown_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""Reuse conversions of PDFs whose pages did not change.
+
+Each page is copied into a one-page PDF with pypdfium2. The copy holds the
+page's content streams and the resources they use, and nothing else; the
+random document ID and the creation date pdfium writes are blanked, so the
+same page yields the same bytes in every revision of a document. A PDF's
+conversion is cached under the sequence of its pages' content hashes, so a
+re-issued document whose pages are all unchanged, such as one saved again
+with new metadata or document IDs, is not run through marker again, even
+though its file differs.
+
+Only the conversion of the whole document is cached, never that of single
+pages: marker uses context from other pages, so markdown stitched from
+pages converted on their own differs from a conversion of the whole
+document. A document with any page added, removed, moved or changed is
+converted exactly as without the page cache, as a whole or in chunks, and
+the page cache never changes the output.
+"""
+
+import hashlib
+import re
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from loguru import logger
+
+from .cache import ConversionCache
+from .chunking import ChunkOptions, convert_pdf_chunked
+from .converter import MarkerWorker, convert_pdf_to_markdown, marker_options
+from .limits import ResourceLimits
+from .progress import ProgressCallback
+from .timing import stage
+
+# Trailer ID pdfium generates randomly for each saved document
+_DOCUMENT_ID = re.compile(rb"/ID\s*\[\s*<([0-9A-Fa-f]*)>\s*<([0-9A-Fa-f]*)>\s*\]")
+
+# Time of saving pdfium writes into the document information
+_CREATION_DATE = re.compile(rb"/CreationDate\s*\(D:([^)]*)\)")
+
+
+def _blank(match: "re.Match[bytes]") -> bytes:
+    # Zero the groups in place, so the cross-reference offsets stay valid
+    blanked = bytearray(match[0])
+    for group in range(1, len(match.groups()) + 1):
+        start, end = (offset - match.start() for offset in match.span(group))
+        blanked[start:end] = b"0" * (end - start)
+    return bytes(blanked)
+
+
+def split_pages(pdf_path: Path, output_dir: Path) -> List[Path]:
+    """Write every page of a PDF to its own reproducible one-page PDF.
+
+    Args:
+        pdf_path: Path to the PDF file
+        output_dir: Directory to write the pages to
+
+    Returns:
+        Paths of the one-page PDFs, in page order. Each is named page.pdf in
+        a directory of its own, so that marker sees the same input for the
+        same page of any document.
+
+    Raises:
+        RuntimeError: If pypdfium2 is not installed
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError as e:
+        raise RuntimeError(
+            "pypdfium2 is not installed. Install with: pip install marker-pdf"
+        ) from e
+
+    paths = []
+    source = pdfium.PdfDocument(str(pdf_path))
+    try:
+        for index in range(len(source)):
+            page = pdfium.PdfDocument.new()
+            try:
+                page.import_pages(source, [index])
+                page_dir = output_dir / f"{index:05d}"
+                page_dir.mkdir()
+                path = page_dir / "page.pdf"
+                page.save(path)
+            finally:
+                page.close()
+            data = _DOCUMENT_ID.sub(_blank, path.read_bytes())
+            path.write_bytes(_CREATION_DATE.sub(_blank, data))
+            paths.append(path)
+    finally:
+        source.close()
+    return paths
+
+
+def convert_pdf_paged(
+    pdf_path: Path,
+    cache: ConversionCache,
+    worker: Optional[MarkerWorker] = None,
+    limits: Optional[ResourceLimits] = None,
+    progress: Optional[ProgressCallback] = None,
+    chunking: Optional[ChunkOptions] = None,
+) -> str:
+    """Convert a PDF, reusing the conversion of a PDF with the same pages.
+
+    Args:
+        pdf_path: Path to the PDF file
+        cache: Conversion cache holding the markdown of each document
+        worker: Warm in-process worker to use instead of marker_single
+        limits: Time and memory limits for marker_single
+        progress: Called with marker_single's progress updates
+        chunking: Convert large PDFs as page ranges with these settings
+
+    Returns:
+        Markdown text of the whole document, the same as converting it
+        without the page cache
+    """
+    options = marker_options()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with stage("split"):
+            pages = split_pages(pdf_path, Path(temp_dir))
+        with stage("cache"):
+            digest = hashlib.sha256(b"pages")
+            if chunking is not None:
+                # Chunks are stitched, which changes the output
+                digest.update(f"chunks {chunking.size} {chunking.threshold}".encode())
+            for page in pages:
+                digest.update(cache.key(page, options).encode())
+            key = digest.hexdigest()
+            cached = cache.get(key)
+
+    if cached is not None:
+        logger.info(f"Page cache: all {len(pages)} pages of '{pdf_path}' reused")
+        return cached
+
+    logger.info(f"Page cache: pages of '{pdf_path}' changed, converting it")
+    if chunking is not None:
+        md_text = convert_pdf_chunked(pdf_path, chunking, worker, cache, limits)
+    else:
+        md_text = convert_pdf_to_markdown(
+            pdf_path, worker, cache, limits=limits, progress=progress
+        )
+    with stage("cache"):
+        cache.put(key, md_text)
+    return md_text
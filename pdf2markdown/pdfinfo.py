@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+"""Cheap PDF inspection with pypdfium2, which marker-pdf depends on."""
+
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+
+def page_count(pdf_path: Path) -> Optional[int]:
+    """Return the number of pages of a PDF without converting it.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        Number of pages, or None if the PDF cannot be opened
+    """
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        logger.debug("pypdfium2 is not installed, page counts are unavailable")
+        return None
+
+    try:
+        pdf = pdfium.PdfDocument(str(pdf_path))
+    except (pdfium.PdfiumError, OSError) as e:
+        logger.debug(f"Could not open '{pdf_path}' with pypdfium2: {e}")
+        return None
+
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Incremental parsing of marker's output streams.
+
+marker reports progress with tqdm bars on stderr, which redraw themselves
+with carriage returns. The child's pipes are read as they fill up, split on
+both line endings, and progress lines are turned into callbacks instead of
+being kept; only a bounded tail of the other stderr lines is kept for error
+messages.
+"""
+
+import codecs
+import re
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from loguru import logger
+
+# Called with marker's stage description, completed and total steps
+ProgressCallback = Callable[[str, int, int], None]
+
+# Number of stderr lines kept for error messages, and their maximum length
+STDERR_TAIL_LINES = 50
+MAX_LINE_LENGTH = 4096
+
+# A tqdm bar: "Recognizing Text:  45%|████▌     | 9/20 [00:03<00:04, 2.6it/s]"
+_TQDM = re.compile(
+    r"^\s*(?P<desc>.*?):?\s*\d+%\|[^|]*\|\s*(?P<done>\d+)/(?P<total>\d+)"
+)
+_LINE_BREAK = re.compile(r"\r\n|[\r\n]")
+
+
+def parse_progress(line: str) -> Optional[Tuple[str, int, int]]:
+    """Parse a tqdm progress line.
+
+    Args:
+        line: One line of marker's output
+
+    Returns:
+        Stage description, completed and total steps, or None if the line is
+        not a progress bar
+    """
+    match = _TQDM.match(line)
+    if match is None:
+        return None
+    return match["desc"].strip(), int(match["done"]), int(match["total"])
+
+
+class OutputStream:
+    """Split a child's output stream into lines as it arrives.
+
+    Progress lines go to the callback; other lines are kept in a bounded
+    tail. A line longer than MAX_LINE_LENGTH is cut so that memory stays
+    bounded however the child writes.
+    """
+
+    def __init__(
+        self,
+        progress: Optional[ProgressCallback] = None,
+        tail_lines: int = STDERR_TAIL_LINES,
+    ) -> None:
+        self.progress = progress
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._partial = ""
+        self._last: Optional[Tuple[str, int, int]] = None
+
+    def feed(self, data: bytes) -> None:
+        """Process a chunk read from the pipe; empty at end of stream."""
+        text = self._partial + self._decoder.decode(data, final=not data)
+        *lines, self._partial = _LINE_BREAK.split(text)
+        if not data or len(self._partial) > MAX_LINE_LENGTH:
+            lines.append(self._partial)
+            self._partial = ""
+        for line in lines:
+            self._line(line)
+
+    def text(self) -> str:
+        """Return the kept tail as text."""
+        return "\n".join(self.tail)
+
+    def _line(self, line: str) -> None:
+        if not line.strip():
+            return
+        update = parse_progress(line)
+        if update is None:
+            self.tail.append(line[:MAX_LINE_LENGTH])
+        elif update != self._last:
+            self._last = update
+            if self.progress is not None:
+                self.progress(*update)
+
+
+def log_progress(pdf_path: Path, step: int = 10) -> ProgressCallback:
+    """Create a progress callback that logs every few percent of each stage.
+
+    Args:
+        pdf_path: PDF being converted
+        step: Percentage between two log messages of a stage
+
+    Returns:
+        The callback
+    """
+    logged: Dict[str, int] = {}
+
+    def log(stage: str, done: int, total: int) -> None:
+        percent = 100 * done // total if total else 100
+        last = logged.get(stage)
+        if last is None or percent >= last + step or (percent == 100 and last < 100):
+            logged[stage] = percent
+            logger.info(f"'{pdf_path.name}': {stage} {done}/{total}")
+
+    return log
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+
+"""Machine-readable run reports.
+
+A run report is a JSONL file with one line per file, written as each file
+finishes, and a summary line at the end of the run. Besides timings, each
+file records the resources its marker processes used, and the summary the
+distribution of their peak memory, to size workers and memory limits by.
+The summary can also be written as a Prometheus textfile for the node
+exporter's textfile collector.
+"""
+
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from .pdfinfo import page_count
+from .timing import timed_stages
+from .usage import ResourceUsage, measured_usage
+
+# Percentiles of the per-file durations in the summary
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class FileReport:
+    """Outcome, stage timings and resource usage of one file.
+
+    Attributes:
+        pdf: Path to the PDF file
+        markdown: Path to the output Markdown file
+        status: "converted", "skipped" or "failed"
+        seconds: Wall-clock time spent on the file
+        stages: Exclusive seconds per conversion stage
+        pages: Number of pages, None if unknown or skipped
+        error: Error message of a failed file
+        engine: "marker" or "text", None if the file was not converted
+        usage: Resources used by the conversion, None if unknown or skipped
+    """
+
+    pdf: str
+    markdown: str
+    status: str = "converted"
+    seconds: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    pages: Optional[int] = None
+    error: Optional[str] = None
+    engine: Optional[str] = None
+    usage: Optional[ResourceUsage] = None
+
+    @property
+    def pages_per_second(self) -> Optional[float]:
+        """Return the conversion throughput, None if unknown."""
+        if self.pages is None or self.seconds <= 0:
+            return None
+        return self.pages / self.seconds
+
+
+@contextmanager
+def track(
+    pdf_path: Path,
+    markdown_path: Path,
+    on_report: Optional[Callable[[FileReport], None]],
+    measure: bool = True,
+    trace: bool = False,
+) -> Iterator[FileReport]:
+    """Time the stages of one file's conversion and report its outcome.
+
+    The block may set the status of the yielded entry to "skipped"; an
+    exception marks it failed. Without a callback nothing is timed or
+    measured.
+
+    Args:
+        pdf_path: Path to the PDF file
+        markdown_path: Path to the output Markdown file
+        on_report: Called with the entry when the block exits
+        measure: Whether to time the stages, measure the resources used and
+            count the pages; otherwise the entry only holds the outcome
+        trace: Whether to also trace the Python allocations of aligning and
+            writing, see usage.traced_memory
+
+    Yields:
+        The entry for the file
+    """
+    entry = FileReport(str(pdf_path), str(markdown_path))
+    if on_report is None:
+        yield entry
+        return
+
+    with ExitStack() as stack:
+        timer = stack.enter_context(timed_stages()) if measure else None
+        usage = stack.enter_context(measured_usage(trace)) if measure else None
+        try:
+            yield entry
+        except Exception as e:
+            entry.status = "failed"
+            entry.error = str(e) or type(e).__name__
+            raise
+        finally:
+            if timer is not None:
+                entry.seconds = timer.elapsed()
+                entry.stages = timer.stages
+            if usage is not None and entry.status != "skipped":
+                entry.pages = page_count(pdf_path)
+                entry.usage = usage
+                if usage.max_rss is not None:
+                    logger.debug(
+                        f"marker used {usage.user_seconds + usage.system_seconds:.1f}s "
+                        f"of CPU and at most {usage.max_rss / 2**20:.0f} MiB in "
+                        f"{usage.processes} processes on '{pdf_path}'"
+                    )
+            on_report(entry)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Return a nearest-rank percentile of sorted values."""
+    rank = math.ceil(percent / 100 * len(values))
+    return values[max(rank, 1) - 1]
+
+
+def _quantiles(values: List[float]) -> Dict[str, float]:
+    """Return the summary percentiles and the maximum of values."""
+    values = sorted(values)
+    if not values:
+        return {}
+    quantiles = {f"p{percent}": _percentile(values, percent) for percent in PERCENTILES}
+    quantiles["max"] = values[-1]
+    return quantiles
+
+
+class RunReport:
+    """Collect file reports into a JSONL report and a run summary.
+
+    File lines are written as they arrive, so a report of an interrupted run
+    is still useful; only the numbers needed for the summary stay in memory.
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, prometheus_path: Optional[Path] = None
+    ) -> None:
+        """Start a run.
+
+        Args:
+            path: JSONL report file, None to only keep the summary
+            prometheus_path: Prometheus textfile to write the summary to
+        """
+        self.path = path
+        self.prometheus_path = prometheus_path
+        self._start = time.monotonic()
+        self._file: Optional[IO[str]] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = path.open("w", encoding="utf-8")
+        self._counts = {"converted": 0, "skipped": 0, "failed": 0}
+        self._durations: List[float] = []
+        self._pages = 0
+        self._stages: Dict[str, float] = {}
+        self._engines: Dict[str, int] = {}
+        self._usage = ResourceUsage()
+        self._max_rss: List[float] = []
+
+    def add(self, entry: FileReport) -> None:
+        """Record the outcome of one file."""
+        self._counts[entry.status] += 1
+        if entry.status == "converted":
+            self._durations.append(entry.seconds)
+            self._pages += entry.pages or 0
+            if entry.engine is not None:
+                self._engines[entry.engine] = self._engines.get(entry.engine, 0) + 1
+        for name, seconds in entry.stages.items():
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+        if entry.usage is not None:
+            self._usage.add(entry.usage)
+            if entry.usage.max_rss is not None:
+                self._max_rss.append(entry.usage.max_rss)
+
+        if self._file is not None:
+            line = {"type": "file", **asdict(entry)}
+            line["pages_per_second"] = entry.pages_per_second
+            self._file.write(json.dumps(line) + "\n")
+            self._file.flush()
+
+    def summary(self) -> Dict[str, Any]:
+        """Return the batch summary of the files recorded so far."""
+        wall = time.monotonic() - self._start
+        return {
+            "files": sum(self._counts.values()),
+            **self._counts,
+            "seconds": wall,
+            "pages": self._pages,
+            "pages_per_second": self._pages / wall if wall > 0 else None,
+            "file_seconds": _quantiles(self._durations),
+            "stage_seconds": self._stages,
+            "engines": self._engines,
+            # Percentiles of the per-file peaks rather than only their maximum
+            "resources": {**asdict(self._usage), "max_rss": _quantiles(self._max_rss)},
+        }
+
+    def close(self) -> None:
+        """Write the summary line and the Prometheus textfile."""
+        summary = self.summary()
+        logger.info(
+            f"Run summary: {summary['converted']} converted, "
+            f"{summary['skipped']} skipped, {summary['failed']} failed "
+            f"in {summary['seconds']:.1f}s"
+        )
+        resources = summary["resources"]
+        if resources["processes"]:
+            cpu = resources["user_seconds"] + resources["system_seconds"]
+            logger.info(
+                f"marker used {cpu:.1f}s of CPU in {resources['processes']} "
+                f"processes, at most {resources['max_rss']['max'] / 2**20:.0f} MiB"
+            )
+        if self._file is not None:
+            self._file.write(json.dumps({"type": "summary", **summary}) + "\n")
+            self._file.close()
+            self._file = None
+        if self.prometheus_path is not None:
+            write_prometheus(summary, self.prometheus_path)
+
+
+def write_prometheus(summary: Dict[str, Any], path: Path) -> None:
+    """Write a run summary in the Prometheus text exposition format.
+
+    The file is replaced atomically, as the textfile collector requires.
+
+    Args:
+        summary: Summary from RunReport.summary()
+        path: Textfile to write, conventionally ending in .prom
+    """
+    lines = [
+        "# HELP pdf2markdown_files Files handled by the last run, by status.",
+        "# TYPE pdf2markdown_files gauge",
+    ]
+    for status in ("converted", "skipped", "failed"):
+        lines.append(f'pdf2markdown_files{{status="{status}"}} {summary[status]}')
+    lines += [
+        "# HELP pdf2markdown_engine_files Files converted by the last run, by engine.",
+        "# TYPE pdf2markdown_engine_files gauge",
+    ]
+    for engine, count in sorted(summary["engines"].items()):
+        lines.append(f'pdf2markdown_engine_files{{engine="{engine}"}} {count}')
+    lines += [
+        "# HELP pdf2markdown_pages Pages converted by the last run.",
+        "# TYPE pdf2markdown_pages gauge",
+        f"pdf2markdown_pages {summary['pages']}",
+        "# HELP pdf2markdown_run_seconds Wall-clock duration of the last run.",
+        "# TYPE pdf2markdown_run_seconds gauge",
+        f"pdf2markdown_run_seconds {summary['seconds']}",
+        "# HELP pdf2markdown_file_seconds Per-file conversion time quantiles.",
+        "# TYPE pdf2markdown_file_seconds gauge",
+    ]
+    for name, seconds in summary["file_seconds"].items():
+        quantile = "1" if name == "max" else str(int(name[1:]) / 100)
+        lines.append(f'pdf2markdown_file_seconds{{quantile="{quantile}"}} {seconds}')
+    lines += [
+        "# HELP pdf2markdown_stage_seconds Time spent per stage in the last run.",
+        "# TYPE pdf2markdown_stage_seconds gauge",
+    ]
+    for name, seconds in sorted(summary["stage_seconds"].items()):
+        lines.append(f'pdf2markdown_stage_seconds{{stage="{name}"}} {seconds}')
+    resources = summary["resources"]
+    user, system = resources["user_seconds"], resources["system_seconds"]
+    lines += [
+        "# HELP pdf2markdown_marker_cpu_seconds CPU time of marker in the last run.",
+        "# TYPE pdf2markdown_marker_cpu_seconds gauge",
+        f'pdf2markdown_marker_cpu_seconds{{mode="user"}} {user}',
+        f'pdf2markdown_marker_cpu_seconds{{mode="system"}} {system}',
+        "# HELP pdf2markdown_marker_max_rss_bytes Peak marker memory per file.",
+        "# TYPE pdf2markdown_marker_max_rss_bytes gauge",
+    ]
+    for name, size in resources["max_rss"].items():
+        quantile = "1" if name == "max" else str(int(name[1:]) / 100)
+        lines.append(
+            f'pdf2markdown_marker_max_rss_bytes{{quantile="{quantile}"}} {size}'
+        )
+    lines += [
+        "# HELP pdf2markdown_last_run_timestamp_seconds End time of the last run.",
+        "# TYPE pdf2markdown_last_run_timestamp_seconds gauge",
+        f"pdf2markdown_last_run_timestamp_seconds {time.time()}",
+    ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, path)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""Order batch rows by their estimated conversion time.
+
+Every row is preflighted cheaply before anything is converted: the PDF's
+size is read from the filesystem and its page count with pypdfium2. Rows
+whose PDF is missing, empty, unreadable or has no pages are rejected there
+instead of going to marker.
+
+Conversion time is estimated as a fixed cost plus a cost per page and per
+MiB, fitted by least squares to the files of earlier runs, which a history
+file next to the batch file keeps. Longest-first order keeps every worker of
+a parallel run busy until the end; shortest-first order gets the most files
+done early.
+"""
+
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .report import FileReport
+
+ORDERS = ("csv", "longest", "shortest")
+_ORDER_NAMES = {
+    "csv": "in batch file order",
+    "longest": "longest first",
+    "shortest": "shortest first",
+}
+
+# Files of earlier runs the cost model is fitted to
+HISTORY_SIZE = 1000
+
+# Bytes per page assumed for PDFs whose page count is unknown
+DEFAULT_PAGE_BYTES = 100 * 1024
+
+# A sample of one converted file: pages, size in MiB and seconds
+Sample = Tuple[int, float, float]
+
+
+@dataclass(frozen=True)
+class Preflight:
+    """What a cheap look at a PDF found.
+
+    Attributes:
+        size: Size of the PDF in bytes
+        pages: Number of pages, None if pypdfium2 is not installed
+        error: Why the PDF cannot be converted, None if it looks fine
+    """
+
+    size: int
+    pages: Optional[int] = None
+    error: Optional[str] = None
+
+
+def preflight(pdf_path: Path) -> Preflight:
+    """Check that a PDF can be converted and read its size and page count.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        The findings
+    """
+    try:
+        size = pdf_path.stat().st_size
+    except FileNotFoundError:
+        return Preflight(0, error="PDF not found")
+    except OSError as e:
+        return Preflight(0, error=f"PDF cannot be read: {e}")
+    if size == 0:
+        return Preflight(0, error="PDF is empty")
+
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return Preflight(size)
+
+    try:
+        pdf = pdfium.PdfDocument(str(pdf_path))
+    except (pdfium.PdfiumError, OSError) as e:
+        return Preflight(size, error=f"PDF cannot be opened: {e}")
+    try:
+        pages = len(pdf)
+    finally:
+        pdf.close()
+    if pages == 0:
+        return Preflight(size, pages, error="PDF has no pages")
+    return Preflight(size, pages)
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """Solve a small linear system by Gaussian elimination, None if singular."""
+    n = len(vector)
+    rows = [matrix[i][:] + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-9:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] for i in range(n)]
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """Estimated seconds to convert a PDF from its pages and size.
+
+    Attributes:
+        fixed: Seconds per file
+        per_page: Seconds per page
+        per_mib: Seconds per MiB of PDF
+        page_bytes: Average bytes per page, for PDFs of unknown page count
+    """
+
+    fixed: float = 5.0
+    per_page: float = 1.0
+    per_mib: float = 0.0
+    page_bytes: float = DEFAULT_PAGE_BYTES
+
+    @classmethod
+    def fit(cls, samples: Iterable[Sample]) -> "CostModel":
+        """Fit the model to converted files by least squares.
+
+        Costs that come out negative are dropped and the rest refitted; with
+        fewer than three samples, or samples that cannot tell the costs
+        apart, the defaults are kept.
+
+        Args:
+            samples: Pages, MiB and seconds of converted files
+
+        Returns:
+            The fitted model
+        """
+        samples = list(samples)
+        if len(samples) < 3:
+            return cls()
+        page_bytes = sum(mib for _, mib, _ in samples) * 1024 * 1024
+        page_bytes /= max(sum(pages for pages, _, _ in samples), 1)
+
+        features = [0, 1, 2]  # fixed, per page, per MiB
+        while features:
+            xs = [[1.0, float(pages), mib] for pages, mib, _ in samples]
+            xs = [[x[i] for i in features] for x in xs]
+            ys = [seconds for _, _, seconds in samples]
+            n = len(features)
+            xtx = [[sum(x[i] * x[j] for x in xs) for j in range(n)] for i in range(n)]
+            xty = [sum(x[i] * y for x, y in zip(xs, ys)) for i in range(n)]
+            solution = _solve(xtx, xty)
+            if solution is None:
+                if 2 not in features:
+                    break
+                # Sizes proportional to pages; keep the per-page cost
+                features.remove(2)
+                continue
+            if min(solution) >= 0:
+                costs = dict(zip(features, solution))
+                return cls(
+                    costs.get(0, 0.0), costs.get(1, 0.0), costs.get(2, 0.0), page_bytes
+                )
+            features.pop(solution.index(min(solution)))
+        return cls(page_bytes=page_bytes)
+
+    def estimate(self, size: int, pages: Optional[int]) -> float:
+        """Return the estimated seconds to convert a PDF."""
+        if pages is None:
+            pages = max(round(size / self.page_bytes), 1)
+        return self.fixed + self.per_page * pages + self.per_mib * size / 2**20
+
+    def __str__(self) -> str:
+        return (
+            f"{self.fixed:.1f}s + {self.per_page:.2f}s/page + {self.per_mib:.2f}s/MiB"
+        )
+
+
+class History:
+    """Pages, sizes and durations of files converted by marker in past runs.
+
+    The history is a JSON file that keeps the most recent HISTORY_SIZE files.
+    """
+
+    def __init__(self, path: Path, samples: Iterable[Sample] = ()) -> None:
+        self.path = path
+        self.samples: Deque[Sample] = deque(samples, maxlen=HISTORY_SIZE)
+
+    @staticmethod
+    def path_for(batch_file: Path) -> Path:
+        """Return the history path of a batch file."""
+        return batch_file.with_name(batch_file.name + ".history.json")
+
+    @classmethod
+    def load(cls, path: Path) -> "History":
+        """Load a history, or start an empty one if it does not exist."""
+        try:
+            samples = json.loads(path.read_text(encoding="utf-8"))
+            return cls(path, (tuple(sample) for sample in samples))
+        except FileNotFoundError:
+            return cls(path)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable history '{path}': {e}")
+            return cls(path)
+
+    def record(self, entry: FileReport) -> None:
+        """Add a converted file to the history.
+
+        Skipped and failed files, files of unknown page count and files that
+        took the text-layer path say nothing about marker's speed.
+        """
+        if entry.status != "converted" or entry.pages is None:
+            return
+        if entry.engine not in (None, "marker"):
+            return
+        try:
+            mib = Path(entry.pdf).stat().st_size / 2**20
+        except OSError:
+            return
+        self.samples.append((entry.pages, mib, entry.seconds))
+
+    def save(self) -> None:
+        """Write the history atomically."""
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(self.samples), f)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+def schedule(
+    rows: Iterable[Tuple[Path, Path]],
+    order: str,
+    model: CostModel,
+    force: bool = False,
+    on_reject: Optional[Callable[[Path, Path, str], None]] = None,
+    exists: Optional[Callable[[Path, Path], bool]] = None,
+) -> Iterator[Tuple[Path, Path]]:
+    """Preflight batch rows and yield them in order of estimated duration.
+
+    All rows are read and preflighted when the first row is requested. Rows
+    whose output exists and is not to be overwritten are yielded first
+    without a preflight, since they will only be skipped.
+
+    Args:
+        rows: PDF/Markdown pairs
+        order: "longest" or "shortest" first; "csv" keeps the order but
+            still rejects rows that fail the preflight
+        model: Cost model to estimate durations with
+        force: Whether existing outputs will be overwritten
+        on_reject: Called with the PDF and Markdown paths and the reason of
+            each rejected row
+        exists: Tells from the PDF and Markdown paths whether a row's output
+            exists, by default whether the Markdown file exists
+
+    Yields:
+        PDF/Markdown pairs that passed the preflight
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order '{order}'")
+
+    start = time.monotonic()
+    costed: List[Tuple[float, Path, Path]] = []
+    rejected = 0
+    for pdf_path, markdown_path in rows:
+        done = exists(pdf_path, markdown_path) if exists else markdown_path.exists()
+        if not force and done:
+            yield pdf_path, markdown_path
+            continue
+        found = preflight(pdf_path)
+        if found.error is not None:
+            rejected += 1
+            logger.error(f"Rejecting '{pdf_path}': {found.error}")
+            if on_reject is not None:
+                on_reject(pdf_path, markdown_path, found.error)
+            continue
+        costed.append(
+            (model.estimate(found.size, found.pages), pdf_path, markdown_path)
+        )
+
+    if order != "csv":
+        # sort() is stable, so equal estimates keep their batch file order
+        costed.sort(key=lambda row: row[0], reverse=order == "longest")
+    total = sum(cost for cost, _, _ in costed)
+    logger.info(
+        f"Preflighted {len(costed) + rejected} rows in "
+        f"{time.monotonic() - start:.1f}s, rejected {rejected}; "
+        f"about {total / 60:.1f} min of work, {_ORDER_NAMES[order]} "
+        f"(model: {model})"
+    )
+    for _, pdf_path, markdown_path in costed:
+        yield pdf_path, markdown_path
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+
+"""Long-running conversion daemon with a local HTTP API.
+
+The daemon keeps marker's models loaded, so requests skip Python startup and
+model loading. Its worker threads share a single in-process worker and take
+turns converting with it: more threads do not convert more documents at
+once, as the models are loaded only once. With the subprocess backend each
+thread runs its own marker_single process, which loads the models itself.
+It listens on a Unix socket or on localhost:
+
+    GET  /health   liveness check
+    GET  /stats    queue depth, conversions in flight and totals
+    POST /convert  {"pdf": "...", "markdown": "...", "force": false}
+
+A /convert request waits for its conversion. Without "markdown" the reply
+carries the converted text; with it, the output is written to that path.
+
+Requests read and write files as the user running the daemon, so by default
+it listens on a Unix socket that only that user may connect to. With a
+shared token, every request but /health must carry it in an
+"Authorization: Bearer <token>" header; listening on a port requires one.
+POST requests must have the application/json content type, which browsers
+do not send to other sites without asking them first. A root directory, if
+set, must contain every PDF and Markdown path of a request.
+"""
+
+import argparse
+import hmac
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Type, Union
+
+from loguru import logger
+
+from .align_tables import iter_aligned_lines
+from .cache import DEFAULT_CACHE_SIZE, ConversionCache
+from .cli import (
+    add_logging_arguments,
+    configure_logging,
+    convert_single_file,
+    create_cache,
+    positive_int,
+)
+from .converter import BACKENDS, MarkerWorker, create_worker, marker_output
+
+DEFAULT_PORT = 8765
+
+# Largest request body accepted, in bytes; a request only holds a few paths
+MAX_REQUEST_SIZE = 64 * 1024
+
+# Environment variable holding the shared token, which keeps it out of the
+# process list
+TOKEN_VARIABLE = "PDF2MARKDOWN_TOKEN"
+
+
+def default_socket() -> Path:
+    """Return the Unix socket the daemon listens on by default."""
+    import tempfile
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime_dir) / "pdf2markdown.sock"
+
+
+@dataclass
+class ConversionJob:
+    """A conversion request waiting in or taken from the service queue."""
+
+    pdf_path: Path
+    markdown_path: Optional[Path] = None
+    force: bool = False
+    done: threading.Event = field(default_factory=threading.Event)
+    markdown: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ConversionService:
+    """Queue of conversion jobs served by worker threads.
+
+    The threads share one marker worker whose models are loaded when the
+    service starts, before the first job arrives, and hold a lock while they
+    convert with it.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        backend: str = "auto",
+        cache: Optional[ConversionCache] = None,
+        queue_size: int = 0,
+    ) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+        self._worker: Optional[MarkerWorker] = None
+        self._worker_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[ConversionJob]]" = queue.Queue(queue_size)
+        self._threads = [
+            threading.Thread(target=self._run, name=f"worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        """Load the models and start the worker threads."""
+        self._worker = create_worker(self.backend)
+        if self._worker is not None:
+            self._worker.load()
+        for thread in self._threads:
+            thread.start()
+
+    def close(self) -> None:
+        """Finish the queued jobs and stop the worker threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def submit(
+        self, pdf_path: Path, markdown_path: Optional[Path] = None, force: bool = False
+    ) -> ConversionJob:
+        """Queue a conversion.
+
+        Args:
+            pdf_path: Path to the PDF file
+            markdown_path: Where to write the output, None to keep it in the job
+            force: Whether to overwrite an existing output file
+
+        Returns:
+            The queued job; its done event is set when it finishes
+
+        Raises:
+            queue.Full: If the queue is at its size limit
+        """
+        job = ConversionJob(pdf_path, markdown_path, force)
+        self._queue.put_nowait(job)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue and throughput counters."""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "workers": len(self._threads),
+                "uptime": time.monotonic() - self._started,
+            }
+
+    def _run(self) -> None:
+        while (job := self._queue.get()) is not None:
+            with self._lock:
+                self.in_flight += 1
+            try:
+                if self._worker is None:
+                    self._convert(job, None)
+                else:
+                    # marker's models are not safe to share between threads
+                    with self._worker_lock:
+                        self._convert(job, self._worker)
+            except Exception as e:
+                job.error = str(e)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    if job.error is None:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                job.done.set()
+
+    def _convert(self, job: ConversionJob, worker: Optional[MarkerWorker]) -> None:
+        if job.markdown_path is not None:
+            job.markdown_path.parent.mkdir(parents=True, exist_ok=True)
+            convert_single_file(
+                job.pdf_path, job.markdown_path, job.force, worker, self.cache
+            )
+            return
+
+        with marker_output(job.pdf_path, worker, self.cache) as markdown:
+            # Align tables for better readability
+            job.markdown = "".join(iter_aligned_lines(markdown))
+        logger.info(f"Converted '{job.pdf_path}'")
+
+
+def _make_handler(
+    service: ConversionService,
+    token: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> Type[BaseHTTPRequestHandler]:
+    """Create a request handler class bound to a service.
+
+    Args:
+        service: Service that runs the conversions
+        token: Shared token requests must carry, None to accept any request
+        root: Directory that must contain the paths of a request, None to
+            accept any path
+    """
+    root = root.resolve() if root is not None else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._reply(200, {"status": "ok"})
+            elif not self._authorized():
+                return
+            elif self.path == "/stats":
+                self._reply(200, service.stats())
+            else:
+                self._reply(404, {"error": f"Unknown path '{self.path}'"})
+
+        def do_POST(self) -> None:
+            if not self._authorized():
+                return
+            if self.path != "/convert":
+                self._reply(404, {"error": f"Unknown path '{self.path}'"})
+                return
+            if self.headers.get_content_type() != "application/json":
+                self._reply(415, {"error": "Content-Type must be application/json"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                self._reply(400, {"error": "Invalid Content-Length"})
+                return
+            if length < 0:
+                self._reply(400, {"error": "Invalid Content-Length"})
+                return
+            if length > MAX_REQUEST_SIZE:
+                self._reply(413, {"error": f"Request is over {MAX_REQUEST_SIZE} bytes"})
+                return
+
+            try:
+                request = json.loads(self.rfile.read(length))
+                pdf_path = Path(request["pdf"])
+                markdown = request.get("markdown")
+                markdown_path = Path(markdown) if markdown else None
+                force = bool(request.get("force", False))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"Invalid request: {e}"})
+                return
+
+            for path in (pdf_path, markdown_path):
+                if path is not None and not _inside(path, root):
+                    self._reply(403, {"error": f"'{path}' is outside {root}"})
+                    return
+
+            try:
+                job = service.submit(pdf_path, markdown_path, force)
+            except queue.Full:
+                self._reply(503, {"error": "Conversion queue is full"})
+                return
+
+            job.done.wait()
+            if job.error is not None:
+                self._reply(500, {"error": job.error})
+            elif markdown_path is not None:
+                self._reply(200, {"markdown_path": str(markdown_path)})
+            else:
+                self._reply(200, {"markdown": job.markdown})
+
+        def _authorized(self) -> bool:
+            if token is None:
+                return True
+            scheme, _, given = self.headers.get("Authorization", "").partition(" ")
+            if scheme.lower() == "bearer" and hmac.compare_digest(
+                given.strip().encode("utf-8"), token.encode("utf-8")
+            ):
+                return True
+            self._reply(
+                401, {"error": "Missing or wrong token"}, {"WWW-Authenticate": "Bearer"}
+            )
+            return False
+
+        def _reply(
+            self,
+            status: int,
+            body: Dict[str, Any],
+            headers: Optional[Dict[str, str]] = None,
+        ) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def address_string(self) -> str:
+            # Unix socket peers have no address
+            return str(self.client_address[0]) if self.client_address else "unix"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def _inside(path: Path, root: Optional[Path]) -> bool:
+    """Return whether a path resolves to a location under root."""
+    return root is None or path.resolve().is_relative_to(root)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+Server = Union[ThreadingHTTPServer, _UnixHTTPServer]
+
+
+def create_server(
+    service: ConversionService,
+    socket_path: Optional[Path] = None,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    token: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> Server:
+    """Create an HTTP server for a service on a Unix socket or TCP port.
+
+    The Unix socket is created with 0600 permissions, so only the user
+    running the daemon may connect to it.
+
+    Args:
+        service: Service that runs the conversions
+        socket_path: Unix socket to listen on, None to listen on host:port
+        host: Address to listen on without a socket path
+        port: Port to listen on without a socket path
+        token: Shared token requests must carry; required without a socket
+            path
+        root: Directory that must contain the paths of a request, None to
+            accept any path
+
+    Returns:
+        The bound server
+
+    Raises:
+        ValueError: If listening on a port without a token
+    """
+    handler = _make_handler(service, token, root)
+    if socket_path is None:
+        if token is None:
+            raise ValueError("Listening on a port needs a token")
+        return ThreadingHTTPServer((host, port), handler)
+
+    # Remove a socket left behind by a daemon that did not shut down cleanly
+    if socket_path.is_socket():
+        socket_path.unlink()
+    # Bind with no permissions for the group and others, rather than chmod
+    # after binding, which would leave the socket open in between
+    umask = os.umask(0o177)
+    try:
+        return _UnixHTTPServer(str(socket_path), handler)
+    finally:
+        os.umask(umask)
+
+
+def serve(
+    service: ConversionService,
+    socket_path: Optional[Path] = None,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    token: Optional[str] = None,
+    root: Optional[Path] = None,
+) -> None:
+    """Serve conversion requests until interrupted.
+
+    Args:
+        service: Service that runs the conversions
+        socket_path: Unix socket to listen on, None to listen on host:port
+        host: Address to listen on without a socket path
+        port: Port to listen on without a socket path
+        token: Shared token requests must carry; required without a socket
+            path
+        root: Directory that must contain the paths of a request, None to
+            accept any path
+    """
+    server = create_server(service, socket_path, host, port, token, root)
+    service.start()
+    where = socket_path if socket_path is not None else f"{host}:{port}"
+    logger.info(f"Serving conversions on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path is not None:
+            socket_path.unlink(missing_ok=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of ``pdf2markdown serve``."""
+    parser = argparse.ArgumentParser(
+        prog="pdf2markdown serve", description="Run the conversion daemon"
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=default_socket(),
+        help="Listen on this Unix socket (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        nargs="?",
+        const=DEFAULT_PORT,
+        help=(
+            "Listen on this localhost port instead of the Unix socket "
+            f"(default port: {DEFAULT_PORT}); needs --token"
+        ),
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get(TOKEN_VARIABLE),
+        help=(
+            "Shared token requests must carry as a bearer token "
+            f"(default: ${TOKEN_VARIABLE})"
+        ),
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        help="Reject requests for PDF or Markdown paths outside this directory",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_int,
+        default=1,
+        help=(
+            "Number of worker threads (default: %(default)s). Threads share "
+            "one set of in-process models and take turns with it; only the "
+            "subprocess backend converts documents in parallel"
+        ),
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=0,
+        help="Reject requests once this many are queued (default: unlimited)",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--cache-dir", type=Path, help="Conversion cache directory")
+    parser.add_argument(
+        "--cache-size",
+        type=positive_int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Conversion cache size cap in MiB (default: %(default)s)",
+    )
+    add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.port is not None and not args.token:
+        parser.error(f"--port needs --token or ${TOKEN_VARIABLE}")
+    configure_logging(args)
+
+    cache = create_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+    service = ConversionService(args.workers, args.backend, cache, args.queue_size)
+    if args.port is not None:
+        serve(service, port=args.port, token=args.token, root=args.root)
+    else:
+        serve(service, args.socket, token=args.token or None, root=args.root)
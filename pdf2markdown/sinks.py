@@ -0,0 +1,564 @@
+# -*- coding: utf-8 -*-
+
+"""Write converted Markdown to one archive instead of one file per PDF.
+
+A corpus of millions of PDFs converted to as many small files costs inodes,
+backup time and slow directory scans. An output sink collects the records
+of a batch in a single archive instead:
+
+- JSON Lines (.jsonl), optionally with every record compressed as its own
+  gzip member (.jsonl.gz) or zstd frame (.jsonl.zst)
+- a tar archive (.tar) with one member per Markdown file
+- a SQLite database (.sqlite, .sqlite3 or .db)
+
+Each record holds the source PDF's path and SHA-256, the Markdown path from
+the batch file and the Markdown. Records are appended with buffered writes.
+JSON Lines and tar archives keep an index next to the archive with the
+offset of each PDF's latest record, so that any record can be read without
+scanning; SQLite indexes its table by PDF path.
+
+The buffers are flushed every FLUSH_RECORDS records and at the first record
+FLUSH_INTERVAL seconds after the last flush, the archive before its index,
+and SQLite commits its pending rows at the same times. A run that is killed
+therefore loses at most the records since the last flush. The records past
+the last indexed one are cut off when the archive is opened again, and
+their PDFs are converted again.
+"""
+
+import fcntl
+import gzip
+import io
+import json
+import sqlite3
+import tarfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from pathlib import Path, PurePosixPath
+from types import ModuleType
+from typing import IO, Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from loguru import logger
+
+from .cache import file_digest
+from .output import write_markdown
+
+# Buffer size of archive and index writes
+BUFFER_SIZE = 1024 * 1024
+
+# Records an archive buffers, or a SQLite sink writes per transaction, before
+# they are flushed
+FLUSH_RECORDS = 100
+
+# Seconds after which the next record flushes the buffered ones
+FLUSH_INTERVAL = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    pdf TEXT PRIMARY KEY,
+    markdown TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    text TEXT NOT NULL,
+    converted REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class Record:
+    """A converted PDF as stored in an archive.
+
+    Attributes:
+        pdf: Path to the source PDF, as given in the batch file
+        markdown: Path to the Markdown file, as given in the batch file
+        sha256: SHA-256 hex digest of the source PDF
+        text: The Markdown
+    """
+
+    pdf: str
+    markdown: str
+    sha256: str
+    text: str
+
+    @classmethod
+    def of(cls, pdf_path: Path, markdown_path: Path, lines: Iterable[str]) -> "Record":
+        """Build the record of a conversion, hashing the PDF."""
+        text = "".join(lines)
+        return cls(str(pdf_path), str(markdown_path), file_digest(pdf_path), text)
+
+
+class OutputSink(ABC):
+    """Where converted Markdown is written."""
+
+    @abstractmethod
+    def exists(self, pdf_path: Path, markdown_path: Path) -> bool:
+        """Return whether the output of a batch row was already written."""
+
+    @abstractmethod
+    def write(self, pdf_path: Path, markdown_path: Path, lines: Iterable[str]) -> None:
+        """Write the Markdown lines of a converted PDF."""
+
+    def describe(self, markdown_path: Path) -> str:
+        """Return where the output of a batch row goes, for log messages."""
+        return f"'{markdown_path}'"
+
+    def close(self) -> None:
+        """Flush and close the sink."""
+
+
+class FileSink(OutputSink):
+    """One Markdown file per PDF at the path given in the batch file."""
+
+    def exists(self, pdf_path: Path, markdown_path: Path) -> bool:
+        return markdown_path.exists()
+
+    def write(self, pdf_path: Path, markdown_path: Path, lines: Iterable[str]) -> None:
+        write_markdown(lines, markdown_path)
+
+
+class MemorySink(OutputSink):
+    """Keeps the record of one conversion in memory.
+
+    Pool processes of a --jobs run convert into a memory sink and hand the
+    record to the parent, which is the archive's only writer or returns the
+    Markdown.
+
+    Attributes:
+        path: Path to the archive the record goes to, None if the Markdown
+            is returned
+        record: The record of the conversion, None until written
+    """
+
+    def __init__(self, path: Optional[Path], exists: bool) -> None:
+        self.path = path
+        self.record: Optional[Record] = None
+        self._exists = exists
+
+    def exists(self, pdf_path: Path, markdown_path: Path) -> bool:
+        return self._exists
+
+    def write(self, pdf_path: Path, markdown_path: Path, lines: Iterable[str]) -> None:
+        self.record = Record.of(pdf_path, markdown_path, lines)
+
+    def describe(self, markdown_path: Path) -> str:
+        if self.path is None:
+            return "memory"
+        return f"'{markdown_path}' in '{self.path}'"
+
+
+class ArchiveSink(OutputSink):
+    """An archive holding the records of many conversions.
+
+    Attributes:
+        path: Path to the archive
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def exists(self, pdf_path: Path, markdown_path: Path) -> bool:
+        return str(pdf_path) in self
+
+    @abstractmethod
+    def __contains__(self, pdf_path: Union[str, Path]) -> bool:
+        """Return whether the archive holds a record of a PDF."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Return the number of PDFs with a record."""
+
+    def write(self, pdf_path: Path, markdown_path: Path, lines: Iterable[str]) -> None:
+        self.add(Record.of(pdf_path, markdown_path, lines))
+
+    @abstractmethod
+    def add(self, record: Record) -> None:
+        """Append a record, replacing an earlier record of the same PDF."""
+
+    @abstractmethod
+    def get(self, pdf_path: Union[str, Path]) -> Optional[Record]:
+        """Return the latest record of a PDF, None if there is none."""
+
+    def describe(self, markdown_path: Path) -> str:
+        return f"'{markdown_path}' in '{self.path}'"
+
+    def __enter__(self) -> "ArchiveSink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _due(records: int, since: float) -> bool:
+    """Return whether buffered records are due to be flushed.
+
+    Args:
+        records: Number of records buffered
+        since: Monotonic time of the last flush
+    """
+    return records >= FLUSH_RECORDS or time.monotonic() - since >= FLUSH_INTERVAL
+
+
+def _lock(f: IO[bytes], path: Path) -> None:
+    """Lock an archive against a second writer."""
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise RuntimeError(f"'{path}' is being written by another run") from None
+
+
+class _IndexedSink(ArchiveSink):
+    """An append-only archive file with an index of each PDF's latest record.
+
+    The index is a JSON Lines file next to the archive, named after it with
+    ".index" appended, with the PDF path and the offset and length of each
+    record in the archive.
+    """
+
+    def __init__(self, path: Path, writable: bool = True) -> None:
+        """Open an archive, creating it if it does not exist.
+
+        Args:
+            path: Path to the archive
+            writable: Whether records will be added; a read-only archive may
+                be read while another run is writing it
+
+        Raises:
+            RuntimeError: If another run is writing the archive
+            ValueError: If the archive exists without its index
+        """
+        super().__init__(path)
+        self.index_path = path.with_name(path.name + ".index")
+        self._entries: Dict[str, Tuple[int, int]] = {}
+        self._data: Optional[IO[bytes]] = None
+        self._index: Optional[IO[str]] = None
+        self._end = 0
+        self._unflushed = 0
+        self._flushed = time.monotonic()
+        if not writable:
+            self._load_index(self._size())
+            return
+
+        self._data = open(path, "ab", buffering=BUFFER_SIZE)
+        _lock(self._data, path)
+        try:
+            size = self._size()
+            if size and not self.index_path.exists():
+                raise ValueError(f"'{path}' has no index '{self.index_path}'")
+            self._end, index_size = self._load_index(size)
+            self._cut_off(size)
+            self._index = open(
+                self.index_path, "a", encoding="utf-8", buffering=BUFFER_SIZE
+            )
+            # Entries of records that were cut off must not point at the
+            # records written in their place
+            self._index.truncate(index_size)
+        except BaseException:
+            self._data.close()
+            raise
+
+    def _size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _load_index(self, size: int) -> Tuple[int, int]:
+        """Load the index entries of the records that are complete.
+
+        Args:
+            size: Size of the archive
+
+        Returns:
+            Offsets of the end of the last complete record in the archive and
+            of the end of its entry in the index
+        """
+        end = index_size = 0
+        try:
+            with open(self.index_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        offset, length = entry["offset"], entry["length"]
+                    except (ValueError, KeyError):
+                        break  # Cut off in the middle of a line
+                    if not line.endswith(b"\n") or offset + length > size:
+                        break
+                    self._entries[entry["pdf"]] = (offset, length)
+                    end = offset + length
+                    index_size += len(line)
+        except FileNotFoundError:
+            pass
+        return end, index_size
+
+    def _cut_off(self, size: int) -> None:
+        """Truncate the archive after the last complete record."""
+        assert self._data is not None
+        if size > self._end:
+            with open(self.path, "rb") as f:
+                f.seek(self._end)
+                tail = f.read(BUFFER_SIZE)
+            # The end of an archive is not a cut off record
+            if tail.strip(b"\0") or size - self._end > len(tail):
+                logger.warning(
+                    f"Cutting off {size - self._end} bytes of unindexed records "
+                    f"at the end of '{self.path}'"
+                )
+        self._data.truncate(self._end)
+
+    @abstractmethod
+    def _encode(self, record: Record) -> bytes:
+        """Return the bytes of a record in the archive."""
+
+    @abstractmethod
+    def _decode(self, payload: bytes) -> Record:
+        """Return the record stored in bytes read from the archive."""
+
+    def __contains__(self, pdf_path: Union[str, Path]) -> bool:
+        return str(pdf_path) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, record: Record) -> None:
+        if self._data is None or self._index is None:
+            raise ValueError(f"'{self.path}' is not open for writing")
+        data = self._encode(record)
+        self._data.write(data)
+        self._index.write(
+            json.dumps({"pdf": record.pdf, "offset": self._end, "length": len(data)})
+            + "\n"
+        )
+        self._entries[record.pdf] = (self._end, len(data))
+        self._end += len(data)
+        self._unflushed += 1
+        if _due(self._unflushed, self._flushed):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records out, the archive before the index."""
+        if self._data is None or self._index is None:
+            return
+        self._data.flush()
+        self._index.flush()
+        self._unflushed = 0
+        self._flushed = time.monotonic()
+
+    def get(self, pdf_path: Union[str, Path]) -> Optional[Record]:
+        entry = self._entries.get(str(pdf_path))
+        if entry is None:
+            return None
+        if self._data is not None:
+            self._data.flush()
+        offset, length = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return self._decode(f.read(length))
+
+    def _finish(self) -> bytes:
+        """Return the bytes that end the archive."""
+        return b""
+
+    def close(self) -> None:
+        if self._data is None or self._index is None:
+            return
+        # The archive first, so that the index never points past its end
+        self._data.write(self._finish())
+        self._data.close()
+        self._index.close()
+        self._data = self._index = None
+
+
+def _zstd() -> ModuleType:
+    """Import a zstd module with compress() and decompress()."""
+    try:
+        from compression import zstd  # type: ignore[import-not-found, unused-ignore]
+
+        return zstd  # type: ignore[no-any-return, unused-ignore]
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            "zstandard is not installed. Install with: pip install zstandard"
+        ) from e
+    return zstandard  # type: ignore[no-any-return, unused-ignore]
+
+
+class JsonlSink(_IndexedSink):
+    """Records as JSON Lines, each compressed on its own if the name says so.
+
+    Compressed records are independent gzip members or zstd frames, which
+    concatenated are a valid compressed file: gunzip or zstdcat read the
+    whole archive.
+    """
+
+    def __init__(self, path: Path, writable: bool = True) -> None:
+        self._compression: Optional[ModuleType] = None
+        if path.suffix == ".gz":
+            self._compression = gzip
+        elif path.suffix == ".zst":
+            self._compression = _zstd()
+        super().__init__(path, writable)
+
+    def _encode(self, record: Record) -> bytes:
+        data = (json.dumps(asdict(record), ensure_ascii=False) + "\n").encode()
+        if self._compression is not None:
+            data = self._compression.compress(data)
+        return data
+
+    def _decode(self, payload: bytes) -> Record:
+        if self._compression is not None:
+            payload = self._compression.decompress(payload)
+        return Record(**json.loads(payload))
+
+
+class TarSink(_IndexedSink):
+    """Records as members of an uncompressed tar archive.
+
+    Each member is named after the Markdown path, without its leading "/",
+    and carries the other fields of the record as JSON in the PAX comment
+    header, which tar itself ignores.
+    """
+
+    def _encode(self, record: Record) -> bytes:
+        text = record.text.encode()
+        path = PurePosixPath(Path(record.markdown).as_posix())
+        info = tarfile.TarInfo(str(path.relative_to(path.anchor)))
+        info.size = len(text)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        fields = {
+            "pdf": record.pdf,
+            "markdown": record.markdown,
+            "sha256": record.sha256,
+        }
+        info.pax_headers = {"comment": json.dumps(fields, ensure_ascii=False)}
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+        return header + text + b"\0" * (-len(text) % tarfile.BLOCKSIZE)
+
+    def _decode(self, payload: bytes) -> Record:
+        # A member on its own is a tar archive without the end blocks
+        with tarfile.open(fileobj=io.BytesIO(payload), mode="r:") as archive:
+            info = archive.next()
+            assert info is not None
+            f = archive.extractfile(info)
+            assert f is not None
+            text = f.read().decode()
+        return Record(**json.loads(info.pax_headers["comment"]), text=text)
+
+    def _finish(self) -> bytes:
+        # Two zero blocks end a tar archive; the next run cuts them off
+        # again, since they lie past the last indexed record
+        end = self._end + 2 * tarfile.BLOCKSIZE
+        padding = -end % tarfile.RECORDSIZE
+        return b"\0" * (2 * tarfile.BLOCKSIZE + padding)
+
+
+class SqliteSink(ArchiveSink):
+    """Records as rows of a documents table, keyed by PDF path.
+
+    Records are inserted up to FLUSH_RECORDS at a time, each batch in one
+    transaction.
+    """
+
+    def __init__(self, path: Path, writable: bool = True) -> None:
+        """Open or create a SQLite archive.
+
+        Args:
+            path: Path to the database file
+            writable: Whether records will be added
+        """
+        super().__init__(path)
+        self._writable = writable
+        self._pending: Dict[str, Record] = {}
+        self._committed = time.monotonic()
+        uri = path.absolute().as_uri() + ("" if writable else "?mode=ro")
+        self._conn = sqlite3.connect(uri, uri=True, timeout=60.0)
+        if writable:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def __contains__(self, pdf_path: Union[str, Path]) -> bool:
+        key = str(pdf_path)
+        if key in self._pending:
+            return True
+        row = self._conn.execute("SELECT 1 FROM documents WHERE pdf = ?", (key,))
+        return row.fetchone() is not None
+
+    def __len__(self) -> int:
+        if self._pending:
+            self._commit()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()
+        return int(count)
+
+    def add(self, record: Record) -> None:
+        if not self._writable:
+            raise ValueError(f"'{self.path}' is not open for writing")
+        self._pending[record.pdf] = record
+        if _due(len(self._pending), self._committed):
+            self._commit()
+
+    def _commit(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                [
+                    (record.pdf, record.markdown, record.sha256, record.text, now)
+                    for record in self._pending.values()
+                ],
+            )
+        self._pending.clear()
+        self._committed = time.monotonic()
+
+    def get(self, pdf_path: Union[str, Path]) -> Optional[Record]:
+        key = str(pdf_path)
+        if key in self._pending:
+            return self._pending[key]
+        row = self._conn.execute(
+            "SELECT pdf, markdown, sha256, text FROM documents WHERE pdf = ?", (key,)
+        ).fetchone()
+        return None if row is None else Record(*row)
+
+    def close(self) -> None:
+        if self._pending:
+            self._commit()
+        self._conn.close()
+
+
+# Archive kinds by file name suffix
+_SINKS: Dict[str, Callable[[Path, bool], ArchiveSink]] = {
+    ".jsonl": JsonlSink,
+    ".jsonl.gz": JsonlSink,
+    ".jsonl.zst": JsonlSink,
+    ".tar": TarSink,
+    ".sqlite": SqliteSink,
+    ".sqlite3": SqliteSink,
+    ".db": SqliteSink,
+}
+
+
+def open_sink(path: Path, writable: bool = True) -> ArchiveSink:
+    """Open an archive of the kind its file name says.
+
+    Args:
+        path: Path to the archive, ending in .jsonl, .jsonl.gz, .jsonl.zst,
+            .tar, .sqlite, .sqlite3 or .db
+        writable: Whether records will be added; a read-only archive may be
+            read while another run is writing it
+
+    Returns:
+        The open archive
+
+    Raises:
+        ValueError: If the file name has none of the suffixes
+    """
+    for suffix, sink in _SINKS.items():
+        if path.name.endswith(suffix):
+            return sink(path, writable)
+    raise ValueError(
+        f"Cannot tell the archive kind of '{path}'; use one of: {', '.join(_SINKS)}"
+    )
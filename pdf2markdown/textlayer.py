@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+
+"""Fast conversion of born-digital PDFs from their embedded text layer.
+
+Machine-generated PDFs carry a text layer that is already correct, so
+marker's layout and OCR models are wasted on them. A preflight samples a few
+pages with pypdfium2 and scores the text layer: pages without text, with
+undecodable characters or covered by large images score low. PDFs that score
+high enough are converted by a lightweight extractor built on pdftext, which
+turns font sizes into headings, bullet lines into lists and column-aligned
+lines into pipe tables. Both libraries come with marker-pdf.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+ENGINES = ("auto", "marker", "text")
+
+# Pages sampled by the preflight, spread evenly over the document
+SAMPLE_PAGES = 5
+
+# Non-whitespace characters a page needs to count as having text
+MIN_PAGE_CHARS = 40
+
+# Fraction of a page that images may cover before it needs marker
+MAX_IMAGE_COVERAGE = 0.3
+
+# Text layer score from which the text engine is used in auto mode
+DEFAULT_MIN_SCORE = 0.9
+
+# A line this much larger than the body text is a heading
+HEADING_RATIO = 1.15
+
+# Horizontal gap between spans, in body font sizes, that separates table cells
+CELL_GAP = 1.5
+
+# Vertical gap between lines, in line heights, that starts a new paragraph
+PARAGRAPH_GAP = 0.4
+
+_BULLET = re.compile(r"^[•◦▪‣●○■□–\-*]\s+(.*)")
+_NUMBERED = re.compile(r"^(\d{1,3})[.)]\s+(.*)")
+_BOLD_NAMES = ("bold", "black", "heavy", "semibold", "demi")
+_ITALIC_NAMES = ("italic", "oblique")
+_ITALIC_FLAG = 1 << 6
+_FORCE_BOLD_FLAG = 1 << 18
+
+
+@dataclass(frozen=True)
+class TextLayerQuality:
+    """Preflight assessment of a PDF's text layer.
+
+    Attributes:
+        pages: Number of pages of the PDF
+        sampled: Number of pages sampled
+        score: Mean quality of the sampled pages, from 0 to 1
+        images: Number of images on the sampled pages
+    """
+
+    pages: int
+    sampled: int
+    score: float
+    images: int
+
+
+def _sample(pages: int, count: int = SAMPLE_PAGES) -> List[int]:
+    """Return up to count page indices spread evenly over a document."""
+    if pages <= count:
+        return list(range(pages))
+    return sorted({round(i * (pages - 1) / (count - 1)) for i in range(count)})
+
+
+def _clean_ratio(text: str) -> Tuple[int, float]:
+    """Return the number of visible characters and the share that decoded."""
+    visible = 0
+    bad = 0
+    for char in text:
+        if char.isspace():
+            continue
+        visible += 1
+        if char == "\ufffd" or unicodedata.category(char) in ("Cc", "Co", "Cn"):
+            bad += 1
+    return visible, 1.0 - bad / visible if visible else 0.0
+
+
+def assess_text_layer(pdf_path: Path) -> Optional[TextLayerQuality]:
+    """Sample a PDF's text layer and score its quality.
+
+    A sampled page scores the share of its characters that decoded to real
+    text, or 0 if it has hardly any text or large images.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        The assessment, or None if pypdfium2 is missing or cannot open the PDF
+    """
+    try:
+        import pypdfium2 as pdfium
+        import pypdfium2.raw as pdfium_c
+    except ImportError:
+        logger.debug("pypdfium2 is not installed, text layers cannot be assessed")
+        return None
+
+    try:
+        pdf = pdfium.PdfDocument(str(pdf_path))
+    except (pdfium.PdfiumError, OSError) as e:
+        logger.debug(f"Could not open '{pdf_path}' with pypdfium2: {e}")
+        return None
+
+    try:
+        indices = _sample(len(pdf))
+        scores: List[float] = []
+        images = 0
+        for index in indices:
+            page = pdf[index]
+            width, height = page.get_size()
+            covered = 0.0
+            for image in page.get_objects(filter=(pdfium_c.FPDF_PAGEOBJ_IMAGE,)):
+                images += 1
+                left, bottom, right, top = image.get_pos()
+                covered += max(right - left, 0) * max(top - bottom, 0)
+            textpage = page.get_textpage()
+            visible, clean = _clean_ratio(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+
+            coverage = covered / (width * height) if width * height else 1.0
+            if visible < MIN_PAGE_CHARS or coverage > MAX_IMAGE_COVERAGE:
+                scores.append(0.0)
+            else:
+                scores.append(clean)
+        score = sum(scores) / len(scores) if scores else 0.0
+        return TextLayerQuality(len(pdf), len(indices), score, images)
+    finally:
+        pdf.close()
+
+
+def choose_engine(
+    pdf_path: Path,
+    engine: str = "auto",
+    keep_images: bool = False,
+    min_score: float = DEFAULT_MIN_SCORE,
+) -> str:
+    """Decide whether a PDF is converted by marker or from its text layer.
+
+    Args:
+        pdf_path: Path to the PDF file
+        engine: One of "auto", "marker" or "text"; only "auto" runs the
+            preflight
+        keep_images: Whether extracted images are wanted, which the text
+            engine does not provide
+        min_score: Text layer score from which the text engine is used
+
+    Returns:
+        "marker" or "text"
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'")
+    if engine != "auto":
+        return engine
+
+    quality = assess_text_layer(pdf_path)
+    if quality is None:
+        return "marker"
+    if keep_images and quality.images:
+        chosen = "marker"
+    else:
+        chosen = "text" if quality.score >= min_score else "marker"
+    logger.info(
+        f"Text layer of '{pdf_path}' scores {quality.score:.2f} on "
+        f"{quality.sampled} of {quality.pages} pages, using {chosen}"
+    )
+    return chosen
+
+
+def _style(span: Dict[str, Any]) -> Tuple[bool, bool]:
+    """Return whether a span is set in a bold and in an italic font."""
+    font = span["font"]
+    name = str(font.get("name") or "").lower()
+    flags = int(font.get("flags") or 0)
+    bold = any(part in name for part in _BOLD_NAMES) or bool(flags & _FORCE_BOLD_FLAG)
+    italic = any(part in name for part in _ITALIC_NAMES) or bool(flags & _ITALIC_FLAG)
+    return bold, italic
+
+
+def _emphasize(text: str, bold: bool, italic: bool) -> str:
+    """Wrap text in emphasis markers, keeping its outer whitespace outside."""
+    core = text.strip()
+    if not core or not (bold or italic):
+        return text
+    marker = "***" if bold and italic else "**" if bold else "*"
+    start = text.index(core[0])
+    return f"{text[:start]}{marker}{core}{marker}{text[start + len(core) :]}"
+
+
+@dataclass
+class _Line:
+    """A text line split into cells at wide horizontal gaps."""
+
+    cells: List[str]
+    plain: str
+    size: float
+    top: float
+    bottom: float
+
+
+def _read_line(line: Dict[str, Any], body_size: float) -> Optional[_Line]:
+    spans = [span for span in line["spans"] if span["text"].strip()]
+    if not spans:
+        return None
+
+    cells: List[List[Dict[str, Any]]] = [[spans[0]]]
+    for span in spans[1:]:
+        if span["bbox"][0] - cells[-1][-1]["bbox"][2] > CELL_GAP * body_size:
+            cells.append([span])
+        else:
+            cells[-1].append(span)
+
+    texts = []
+    for cell in cells:
+        # Merge neighbouring spans of the same style before marking them up
+        runs: List[Tuple[Tuple[bool, bool], str]] = []
+        for span in cell:
+            style = _style(span)
+            text = span["text"].replace("\n", " ")
+            if runs and runs[-1][0] == style:
+                runs[-1] = (style, runs[-1][1] + text)
+            else:
+                runs.append((style, text))
+        texts.append("".join(_emphasize(text, *style) for style, text in runs).strip())
+
+    plain = " ".join(
+        "".join(span["text"] for span in cell).replace("\n", " ").strip()
+        for cell in cells
+    )
+    size = max(float(span["font"]["size"]) for span in spans)
+    return _Line(texts, plain, size, line["bbox"][1], line["bbox"][3])
+
+
+def _body_size(pages: List[Dict[str, Any]]) -> float:
+    """Return the most common font size, weighted by characters."""
+    sizes: Counter[float] = Counter()
+    for page in pages:
+        for block in page["blocks"]:
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    if span["font"].get("name") and span["text"].strip():
+                        sizes[round(float(span["font"]["size"]), 1)] += len(
+                            span["text"]
+                        )
+    return sizes.most_common(1)[0][0] if sizes else 10.0
+
+
+class _Writer:
+    """Collect Markdown blocks from lines, grouping paragraphs, lists and tables."""
+
+    def __init__(self, heading_sizes: List[float], body_size: float) -> None:
+        self.blocks: List[str] = []
+        self._heading_sizes = heading_sizes
+        self._body_size = body_size
+        self._paragraph: List[_Line] = []
+        self._items: List[str] = []
+        self._rows: List[List[str]] = []
+
+    def flush(self) -> None:
+        if self._paragraph:
+            text = " ".join(line.cells[0] for line in self._paragraph)
+            if text.startswith(("#", ">")):
+                text = "\\" + text
+            self.blocks.append(text)
+            self._paragraph = []
+        if self._items:
+            self.blocks.append("\n".join(self._items))
+            self._items = []
+        if self._rows:
+            if len(self._rows) < 2:
+                # A single row with gaps is not a table
+                self.blocks.append(" ".join(self._rows[0]))
+            else:
+                rows = [
+                    "| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |"
+                    for row in self._rows
+                ]
+                rule = "| " + " | ".join("---" for _ in self._rows[0]) + " |"
+                self.blocks.append("\n".join([rows[0], rule, *rows[1:]]))
+            self._rows = []
+
+    def add(self, line: _Line) -> None:
+        if len(line.cells) > 1:
+            if self._rows and len(self._rows[0]) != len(line.cells):
+                self.flush()
+            if self._paragraph or self._items:
+                self.flush()
+            self._rows.append(line.cells)
+            return
+        if self._rows:
+            self.flush()
+
+        if line.size >= self._body_size * HEADING_RATIO and len(line.plain) <= 200:
+            self.flush()
+            level = min(self._heading_sizes.index(line.size) + 1, 6)
+            self.blocks.append(f"{'#' * level} {line.plain}")
+            return
+
+        bullet = _BULLET.match(line.cells[0])
+        numbered = _NUMBERED.match(line.cells[0])
+        if bullet or numbered:
+            if self._paragraph:
+                self.flush()
+            if bullet:
+                self._items.append(f"- {bullet[1]}")
+            elif numbered:
+                self._items.append(f"{numbered[1]}. {numbered[2]}")
+            return
+
+        if self._items:
+            self.flush()
+        if self._paragraph:
+            last = self._paragraph[-1]
+            gap = line.top - last.bottom
+            if line.size != last.size or gap > PARAGRAPH_GAP * (last.bottom - last.top):
+                self.flush()
+        self._paragraph.append(line)
+
+
+def text_layer_markdown(pdf_path: Path) -> str:
+    """Convert a PDF to Markdown from its embedded text layer.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        Markdown text
+
+    Raises:
+        RuntimeError: If pdftext is not installed
+    """
+    try:
+        from pdftext.extraction import dictionary_output
+    except ImportError as e:
+        raise RuntimeError(
+            "pdftext is not installed. Install with: pip install marker-pdf"
+        ) from e
+
+    logger.info("Converting PDF from its text layer...")
+    pages: List[Dict[str, Any]] = dictionary_output(
+        str(pdf_path), sort=True, disable_links=True
+    )
+    body_size = _body_size(pages)
+    lines_by_page = [
+        [
+            [
+                line
+                for line in (_read_line(raw, body_size) for raw in block["lines"])
+                if line is not None
+            ]
+            for block in page["blocks"]
+        ]
+        for page in pages
+    ]
+    heading_sizes = sorted(
+        {
+            line.size
+            for blocks in lines_by_page
+            for lines in blocks
+            for line in lines
+            if line.size >= body_size * HEADING_RATIO
+        },
+        reverse=True,
+    )
+
+    writer = _Writer(heading_sizes, body_size)
+    for blocks in lines_by_page:
+        for lines in blocks:
+            for line in lines:
+                writer.add(line)
+            writer.flush()
+    return "\n\n".join(writer.blocks) + "\n"
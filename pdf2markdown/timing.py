@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""Wall-clock timing of conversion stages.
+
+Stages are timed only while a StageTimer is active in the current context,
+so the instrumentation costs nothing when no report was asked for. Time is
+exclusive: while a nested stage runs, its parent's clock is paused, and the
+stage times of a file add up to its total time.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """Accumulate exclusive monotonic time per stage name."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+        self._start = time.monotonic()
+        # Active stages with the time their clock last started
+        self._stack: List[Tuple[str, float]] = []
+
+    def elapsed(self) -> float:
+        """Return the seconds since the timer was created."""
+        return time.monotonic() - self._start
+
+    def enter(self, name: str) -> None:
+        """Start a stage, pausing the current one."""
+        now = time.monotonic()
+        if self._stack:
+            self._charge(*self._stack[-1], now)
+        self._stack.append((name, now))
+
+    def exit(self) -> None:
+        """End the current stage, resuming its parent."""
+        now = time.monotonic()
+        self._charge(*self._stack.pop(), now)
+        if self._stack:
+            self._stack[-1] = (self._stack[-1][0], now)
+
+    def _charge(self, name: str, since: float, now: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + now - since
+
+
+_current: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def timed_stages() -> Iterator[StageTimer]:
+    """Time the stages run in this context.
+
+    Yields:
+        The active timer
+    """
+    timer = StageTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Charge the time spent in the block to a stage of the active timer."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+
+    timer.enter(name)
+    try:
+        yield
+    finally:
+        timer.exit()
+
+
+def timed_iter(iterable: Iterable[T], name: str) -> Iterator[T]:
+    """Charge the time spent producing each item to a stage.
+
+    Streams are read, aligned and written in one pass, so their stages can
+    only be told apart by timing each step of each iterator. Without an
+    active timer the iterable is returned unwrapped.
+
+    Args:
+        iterable: Items to time
+        name: Stage to charge
+
+    Returns:
+        Iterator over the items
+    """
+    timer = _current.get()
+    if timer is None:
+        return iter(iterable)
+    return _timed_iter(iter(iterable), name, timer)
+
+
+def _timed_iter(iterator: Iterator[T], name: str, timer: StageTimer) -> Iterator[T]:
+    while True:
+        timer.enter(name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timer.exit()
+        yield item
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""Resource usage of conversions.
+
+The marker_single processes of a file are reaped with wait4, whose resource
+usage of the process and the descendants it waited for is charged to the
+ResourceUsage active in the current context: peak resident memory, CPU time
+and block I/O. If asked to, the converter's own Python allocations while it
+aligns and writes the Markdown are traced with tracemalloc, which slows
+aligning and writing down several times. Like stage timing, nothing is
+measured while no ResourceUsage is active.
+"""
+
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+@dataclass
+class ResourceUsage:
+    """Resources used to convert a file.
+
+    Attributes:
+        processes: marker_single processes reaped
+        max_rss: Largest peak resident memory of a marker process in bytes,
+            None if no process was reaped
+        user_seconds: User CPU time of the marker processes
+        system_seconds: System CPU time of the marker processes
+        blocks_read: Blocks the marker processes read from disk
+        blocks_written: Blocks the marker processes wrote to disk
+        python_peak: Peak of the converter's traced Python allocations while
+            aligning and writing, in bytes; None if nothing was traced
+    """
+
+    processes: int = 0
+    max_rss: Optional[int] = None
+    user_seconds: float = 0.0
+    system_seconds: float = 0.0
+    blocks_read: int = 0
+    blocks_written: int = 0
+    python_peak: Optional[int] = None
+
+    def add(self, other: "ResourceUsage") -> None:
+        """Add the usage of other work: totals add up, peaks take the maximum."""
+        self.processes += other.processes
+        self.max_rss = _max(self.max_rss, other.max_rss)
+        self.user_seconds += other.user_seconds
+        self.system_seconds += other.system_seconds
+        self.blocks_read += other.blocks_read
+        self.blocks_written += other.blocks_written
+        self.python_peak = _max(self.python_peak, other.python_peak)
+
+    @classmethod
+    def from_rusage(cls, rusage: resource.struct_rusage) -> "ResourceUsage":
+        """Return the usage of one reaped process."""
+        return cls(
+            processes=1,
+            max_rss=rusage.ru_maxrss * _MAXRSS_UNIT,
+            user_seconds=rusage.ru_utime,
+            system_seconds=rusage.ru_stime,
+            blocks_read=rusage.ru_inblock,
+            blocks_written=rusage.ru_oublock,
+        )
+
+
+def _max(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None or b is None:
+        return b if a is None else a
+    return max(a, b)
+
+
+_current: ContextVar[Optional[ResourceUsage]] = ContextVar(
+    "resource_usage", default=None
+)
+_trace: ContextVar[bool] = ContextVar("trace_memory", default=False)
+
+# Guards updates of a ResourceUsage shared by the threads of a chunked or
+# paged conversion, and the tracemalloc state
+_lock = threading.Lock()
+_tracing = 0
+# Whether tracemalloc was started here rather than by the application
+_started = False
+
+
+@contextmanager
+def measured_usage(trace: bool = False) -> Iterator[ResourceUsage]:
+    """Measure the resources used in this context.
+
+    Args:
+        trace: Whether traced_memory blocks trace the Python allocations
+
+    Yields:
+        The usage, filled in as processes are reaped
+    """
+    usage = ResourceUsage()
+    token = _current.set(usage)
+    trace_token = _trace.set(trace)
+    try:
+        yield usage
+    finally:
+        _trace.reset(trace_token)
+        _current.reset(token)
+
+
+def charge_process(rusage: resource.struct_rusage) -> None:
+    """Charge a reaped process to the usage of the current context."""
+    usage = _current.get()
+    if usage is not None:
+        with _lock:
+            usage.add(ResourceUsage.from_rusage(rusage))
+
+
+def carry_usage(function: Callable[..., T]) -> Callable[..., T]:
+    """Charge the processes a function runs in another thread here.
+
+    Threads of an executor do not inherit the context of the thread that
+    submits to it.
+
+    Args:
+        function: Function to run in another thread
+
+    Returns:
+        Function that runs it with the current usage active
+    """
+    usage = _current.get()
+    if usage is None:
+        return function
+
+    def run(*args: object) -> T:
+        token = _current.set(usage)
+        try:
+            return function(*args)
+        finally:
+            _current.reset(token)
+
+    return run
+
+
+@contextmanager
+def traced_memory() -> Iterator[None]:
+    """Record the peak of the Python allocations in the block.
+
+    Nothing is traced unless the active usage was started with trace set.
+    tracemalloc runs only while a block is active. Blocks running at once in
+    several threads share the trace, so each records the peak of all of
+    them.
+    """
+    global _tracing, _started
+    usage = _current.get()
+    if usage is None or not _trace.get():
+        yield
+        return
+
+    with _lock:
+        if _tracing == 0:
+            _started = not tracemalloc.is_tracing()
+            if _started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracing += 1
+        base, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        with _lock:
+            _, peak = tracemalloc.get_traced_memory()
+            usage.python_peak = _max(usage.python_peak, max(peak - base, 0))
+            _tracing -= 1
+            if _tracing == 0 and _started:
+                tracemalloc.stop()
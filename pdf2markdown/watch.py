@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+
+"""Watch a directory and convert PDFs as they arrive.
+
+On Linux the watcher uses inotify through ctypes; elsewhere, or when inotify
+is unavailable, it polls the directory tree. A PDF is converted once its size
+has stopped changing for a settle period, so files that are still being
+written are left alone. Conversions run in a thread pool and write into an
+output tree that mirrors the input tree.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Protocol, Set, Tuple
+
+from loguru import logger
+
+from .cache import DEFAULT_CACHE_SIZE, ConversionCache
+from .cli import (
+    add_logging_arguments,
+    configure_logging,
+    convert_single_file,
+    create_cache,
+    positive_int,
+)
+from .converter import BACKENDS, MarkerWorker, create_worker
+from .errors import ConversionError
+
+# inotify event flags, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+
+class ChangeSource(Protocol):
+    """Source of paths that were created or modified under a directory."""
+
+    def changes(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return the paths that changed."""
+        ...
+
+    def close(self) -> None:
+        """Release the resources of the source."""
+        ...
+
+
+def _iter_pdfs(root: Path) -> Iterator[Path]:
+    """Yield the PDF files under a directory."""
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(".pdf"):
+                yield Path(dirpath) / name
+
+
+class InotifySource:
+    """Change source backed by Linux inotify.
+
+    Watches are added for every directory in the tree, including directories
+    created while watching.
+    """
+
+    def __init__(self, root: Path) -> None:
+        """Watch a directory tree.
+
+        Args:
+            root: Directory to watch
+
+        Raises:
+            OSError: If inotify is not available
+        """
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._root = root
+        self._dirs: Dict[int, Path] = {}
+        self._add_tree(root)
+
+    def _add_tree(self, root: Path) -> None:
+        for dirpath, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(dirpath), _WATCH_MASK
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                logger.warning(f"Cannot watch '{dirpath}': {os.strerror(errno)}")
+                continue
+            self._dirs[wd] = Path(dirpath)
+
+    def changes(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return the paths that changed."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths: List[Path] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a full rescan
+                logger.warning("inotify queue overflowed, rescanning")
+                paths.extend(_iter_pdfs(self._root))
+            elif mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+            elif wd in self._dirs:
+                path = self._dirs[wd] / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    # Files may land in a new directory before it is watched
+                    self._add_tree(path)
+                    paths.extend(_iter_pdfs(path))
+                else:
+                    paths.append(path)
+        return paths
+
+    def close(self) -> None:
+        """Close the inotify file descriptor."""
+        os.close(self._fd)
+
+
+class PollingSource:
+    """Change source that compares snapshots of the directory tree."""
+
+    def __init__(self, root: Path, interval: float = 2.0) -> None:
+        """Snapshot a directory tree.
+
+        Args:
+            root: Directory to watch
+            interval: Minimum time between two scans in seconds
+        """
+        self._root = root
+        self._interval = interval
+        self._last_scan = time.monotonic()
+        self._seen = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for path in _iter_pdfs(self._root):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def changes(self, timeout: float) -> List[Path]:
+        """Wait up to timeout seconds and return the paths that changed."""
+        wait = self._last_scan + self._interval - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(wait, 0))
+
+        self._last_scan = time.monotonic()
+        snapshot = self._scan()
+        changed = [
+            path for path, state in snapshot.items() if self._seen.get(path) != state
+        ]
+        self._seen = snapshot
+        return changed
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+def open_change_source(root: Path, poll_interval: Optional[float]) -> ChangeSource:
+    """Open an inotify change source, or a polling one as fallback.
+
+    Args:
+        root: Directory to watch
+        poll_interval: Poll every this many seconds instead of using inotify
+
+    Returns:
+        The change source
+    """
+    if poll_interval is None:
+        try:
+            return InotifySource(root)
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}), polling instead")
+            poll_interval = 2.0
+    return PollingSource(root, poll_interval)
+
+
+def mirror_path(pdf_path: Path, input_dir: Path, output_dir: Path) -> Path:
+    """Return the Markdown path mirroring a PDF under the output directory."""
+    return output_dir / pdf_path.relative_to(input_dir).with_suffix(".md")
+
+
+def _is_stale(pdf_path: Path, markdown_path: Path) -> bool:
+    """Check whether a PDF has no output or one older than itself."""
+    try:
+        return markdown_path.stat().st_mtime_ns < pdf_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return True
+
+
+class FolderWatcher:
+    """Convert PDFs that appear or change under a directory.
+
+    All bookkeeping happens on the thread that calls run(); conversions run
+    in a thread pool whose threads take turns with one marker worker.
+    """
+
+    def __init__(
+        self,
+        input_dir: Path,
+        output_dir: Path,
+        *,
+        backend: str = "auto",
+        jobs: int = 1,
+        settle: float = 2.0,
+        poll_interval: Optional[float] = None,
+        cache: Optional[ConversionCache] = None,
+    ) -> None:
+        """Prepare a watcher.
+
+        Args:
+            input_dir: Directory to watch
+            output_dir: Root of the mirrored Markdown tree
+            backend: Converter backend, one of "auto", "inprocess" or "subprocess"
+            jobs: Number of files to convert concurrently
+            settle: Seconds a file's size must stay unchanged before converting
+            poll_interval: Poll every this many seconds instead of using inotify
+            cache: Conversion cache to consult before running marker
+        """
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.backend = backend
+        self.settle = settle
+        self.cache = cache
+        self.stop_event = threading.Event()
+        self._poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(jobs, thread_name_prefix="convert")
+        self._worker: Optional[MarkerWorker] = None
+        self._worker_lock = threading.Lock()
+        # Size of each waiting file and when that size was first seen
+        self._pending: Dict[Path, Tuple[int, float]] = {}
+        self._running: Dict[Path, Future[None]] = {}
+        self._changed_while_running: Set[Path] = set()
+
+    def stop(self) -> None:
+        """Ask run() to return."""
+        self.stop_event.set()
+
+    def run(self) -> None:
+        """Convert stale PDFs, then watch for new ones until stopped."""
+        self._worker = create_worker(self.backend)
+        if self._worker is not None:
+            self._worker.load()
+        source = open_change_source(self.input_dir, self._poll_interval)
+        for pdf_path in _iter_pdfs(self.input_dir):
+            markdown_path = mirror_path(pdf_path, self.input_dir, self.output_dir)
+            if _is_stale(pdf_path, markdown_path):
+                self._mark(pdf_path)
+
+        logger.info(f"Watching '{self.input_dir}'")
+        try:
+            while not self.stop_event.is_set():
+                for path in source.changes(timeout=min(self.settle, 0.5)):
+                    if path.suffix.lower() == ".pdf":
+                        self._mark(path)
+                self._reap()
+                self._submit_settled()
+        finally:
+            source.close()
+            self._executor.shutdown(wait=True)
+
+    def _mark(self, pdf_path: Path) -> None:
+        if pdf_path in self._running:
+            self._changed_while_running.add(pdf_path)
+        else:
+            self._pending[pdf_path] = (-1, time.monotonic())
+
+    def _reap(self) -> None:
+        for pdf_path, future in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[pdf_path]
+            if pdf_path in self._changed_while_running:
+                self._changed_while_running.discard(pdf_path)
+                self._mark(pdf_path)
+
+    def _submit_settled(self) -> None:
+        now = time.monotonic()
+        for pdf_path, (size, since) in list(self._pending.items()):
+            try:
+                current = pdf_path.stat().st_size
+            except FileNotFoundError:
+                del self._pending[pdf_path]
+                continue
+            if current != size:
+                self._pending[pdf_path] = (current, now)
+            elif now - since >= self.settle:
+                del self._pending[pdf_path]
+                self._running[pdf_path] = self._executor.submit(self._convert, pdf_path)
+
+    def _convert(self, pdf_path: Path) -> None:
+        markdown_path = mirror_path(pdf_path, self.input_dir, self.output_dir)
+        try:
+            markdown_path.parent.mkdir(parents=True, exist_ok=True)
+            if self._worker is None:
+                convert_single_file(pdf_path, markdown_path, True, None, self.cache)
+            else:
+                # marker's models are not safe to share between threads
+                with self._worker_lock:
+                    convert_single_file(
+                        pdf_path, markdown_path, True, self._worker, self.cache
+                    )
+        except ConversionError:
+            # Error already logged in convert_single_file
+            pass
+        except Exception:
+            logger.exception(f"Error converting '{pdf_path}'")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of ``pdf2markdown watch``."""
+    parser = argparse.ArgumentParser(
+        prog="pdf2markdown watch", description="Convert PDFs as they arrive"
+    )
+    parser.add_argument("input_dir", type=Path, help="Directory to watch")
+    parser.add_argument("output_dir", type=Path, help="Mirrored Markdown tree")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds a file's size must stay unchanged (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--poll",
+        type=float,
+        metavar="SECONDS",
+        help="Poll the directory every SECONDS instead of using inotify",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of files to convert concurrently (default: 1)",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--cache-dir", type=Path, help="Conversion cache directory")
+    parser.add_argument(
+        "--cache-size",
+        type=positive_int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Conversion cache size cap in MiB (default: %(default)s)",
+    )
+    add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_logging(args)
+
+    if not args.input_dir.is_dir():
+        parser.error(f"'{args.input_dir}' is not a directory.")
+
+    watcher = FolderWatcher(
+        args.input_dir.resolve(),
+        args.output_dir.resolve(),
+        backend=args.backend,
+        jobs=args.jobs,
+        settle=args.settle,
+        poll_interval=args.poll,
+        cache=create_cache(args.cache_dir, args.cache_size * 1024 * 1024),
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures for the pdf2markdown tests."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from .fake_marker import install
+
+
+@pytest.fixture
+def fake_marker(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Put a fake marker_single on PATH and return its directory.
+
+    See tests/fake_marker.py for its behaviour. Each invocation's arguments
+    are appended to calls.log in the directory.
+    """
+    bin_dir = tmp_path / "fake_marker_bin"
+    bin_dir.mkdir()
+    install(bin_dir)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_MARKER_CALLS", str(bin_dir / "calls.log"))
+    monkeypatch.delenv("FAKE_MARKER_OUTPUT", raising=False)
+    monkeypatch.delenv("FAKE_MARKER_DELAY", raising=False)
+    monkeypatch.delenv("FAKE_MARKER_ALLOCATE", raising=False)
+    monkeypatch.delenv("FAKE_MARKER_NOISE", raising=False)
+    monkeypatch.delenv("FAKE_MARKER_IMAGES", raising=False)
+    return bin_dir
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Stand-in for marker_single that writes canned markdown.
+
+It accepts marker_single's command line and writes ``<stem>/<stem>.md`` to
+the output directory, like marker does. PDFs whose name starts with "broken"
+make it fail. With --page_range it emits a table with one row per page.
+Like marker, it draws tqdm-style progress bars on stderr.
+
+Environment variables:
+    FAKE_MARKER_OUTPUT: File whose content is emitted for whole documents
+    FAKE_MARKER_CALLS: File each invocation's arguments are appended to
+    FAKE_MARKER_DELAY: Seconds to sleep before writing the output
+    FAKE_MARKER_ALLOCATE: MiB of memory to hold while sleeping
+    FAKE_MARKER_NOISE: Number of log lines to write to stderr first
+    FAKE_MARKER_IMAGES: Number of images to extract; the i-th image of every
+        document has the same content
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+
+def install(bin_dir: Path) -> Path:
+    """Write a marker_single executable running this script into bin_dir.
+
+    Args:
+        bin_dir: Directory to put on PATH
+
+    Returns:
+        Path to the marker_single executable
+    """
+    executable = bin_dir / "marker_single"
+    executable.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).resolve()}" "$@"\n'
+    )
+    executable.chmod(0o755)
+    return executable
+
+
+def main(argv: list[str]) -> int:
+    pdf = Path(argv[0])
+    out_dir = Path(argv[argv.index("--output_dir") + 1])
+
+    calls = os.environ.get("FAKE_MARKER_CALLS")
+    if calls:
+        with open(calls, "a") as f:
+            f.write(" ".join(argv) + "\n")
+
+    for i in range(int(os.environ.get("FAKE_MARKER_NOISE", "0"))):
+        print(f"log line {i}", file=sys.stderr)
+    for done in range(4):
+        bar = "#" * done + " " * (3 - done)
+        print(
+            f"\rRecognizing Text: {done * 100 // 3:3d}%|{bar}| {done}/3",
+            end="",
+            file=sys.stderr,
+        )
+    print(file=sys.stderr)
+
+    ballast = b"x" * (int(os.environ.get("FAKE_MARKER_ALLOCATE", "0")) << 20)
+    time.sleep(float(os.environ.get("FAKE_MARKER_DELAY", "0")))
+    del ballast
+
+    if pdf.stem.startswith("broken"):
+        print(f"cannot convert {pdf}", file=sys.stderr)
+        return 1
+
+    if "--page_range" in argv:
+        first, last = argv[argv.index("--page_range") + 1].split("-")
+        rows = "".join(f"|p{page}|x|\n" for page in range(int(first), int(last) + 1))
+        markdown = "|A|B|\n|---|---|\n" + rows
+    elif os.environ.get("FAKE_MARKER_OUTPUT"):
+        markdown = Path(os.environ["FAKE_MARKER_OUTPUT"]).read_text(encoding="utf-8")
+    else:
+        markdown = f"# {pdf.stem}\n\n|A|B|\n|---|---|\n|1|22|\n"
+
+    (out_dir / pdf.stem).mkdir(parents=True, exist_ok=True)
+    for i in range(int(os.environ.get("FAKE_MARKER_IMAGES", "0"))):
+        name = f"_page_0_Picture_{i}.jpeg"
+        (out_dir / pdf.stem / name).write_bytes(f"image {i}".encode())
+        markdown += f"\n![]({name})\n"
+    (out_dir / pdf.stem / f"{pdf.stem}.md").write_text(markdown, encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Tests for the asyncio conversion API."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown.aio import convert_batch_async, convert_pdf_to_markdown_async
+
+
+def test_convert_batch_async(tmp_path: Path, fake_marker: Path) -> None:
+    """Files are converted concurrently and failures stay isolated."""
+    pairs = []
+    for name in ["one", "broken", "two", "three"]:
+        pdf = tmp_path / f"{name}.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        pairs.append((pdf, tmp_path / f"{name}.md"))
+
+    errors = asyncio.run(convert_batch_async(pairs, max_concurrency=2))
+
+    assert isinstance(errors.pop(tmp_path / "broken.md"), RuntimeError)
+    assert errors == {tmp_path / f"{name}.md": None for name in ["one", "two", "three"]}
+    output = (tmp_path / "one.md").read_text(encoding="utf-8")
+    assert output == "# one\n\n| A   | B   |\n| --- | --- |\n| 1   | 22  |\n"
+
+
+def test_cancel_kills_marker(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Cancelling a conversion kills marker and removes its output directory."""
+    monkeypatch.setenv("FAKE_MARKER_DELAY", "30")
+    calls = fake_marker / "calls.log"
+    pdf = tmp_path / "slow.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    async def cancel_conversion() -> None:
+        task = asyncio.create_task(convert_pdf_to_markdown_async(pdf))
+        while not calls.exists():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.monotonic()
+    asyncio.run(cancel_conversion())
+    assert time.monotonic() - start < 10
+
+    argv = calls.read_text().split()
+    assert not Path(argv[argv.index("--output_dir") + 1]).exists()
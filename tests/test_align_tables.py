@@ -2,8 +2,9 @@
 """Tests for the align_tables module."""
 
 from pathlib import Path
+from typing import Iterator
 
-from pdf2markdown.align_tables import align_markdown_tables
+from pdf2markdown.align_tables import align_markdown_tables, iter_aligned_lines
 
 
 def test_align_tables(tmp_path: Path) -> None:
@@ -126,3 +127,62 @@ def test_align_tables_edge_cases() -> None:
 """
 
     assert align_markdown_tables(single_col).strip() == expected_single.strip()
+
+
+def test_iter_aligned_lines_file(tmp_path: Path) -> None:
+    """Test streaming alignment from a file object."""
+    source = tmp_path / "source.md"
+    source.write_text("Intro\n|A|B|\n|---|---|\n|1|22|")
+
+    with source.open() as f:
+        aligned = list(iter_aligned_lines(f))
+
+    assert aligned == [
+        "Intro\n",
+        "| A   | B   |\n",
+        "| --- | --- |\n",
+        "| 1   | 22  |",
+    ]
+
+
+def test_iter_aligned_lines_is_lazy() -> None:
+    """Test that lines are yielded before the whole input is read."""
+
+    def lines() -> Iterator[str]:
+        yield "|A|\n"
+        yield "|---|\n"
+        yield "|1|\n"
+        yield "Text after the table\n"
+        raise AssertionError("read past the line after the table")
+
+    aligned = iter_aligned_lines(lines())
+    assert [next(aligned) for _ in range(4)] == [
+        "| A   |\n",
+        "| --- |\n",
+        "| 1   |\n",
+        "Text after the table\n",
+    ]
+
+
+def test_align_tables_escaped_pipes() -> None:
+    """Escaped pipes stay inside their cell; an escaped backslash does not."""
+    content = "|Code|Meaning|\n|---|---|\n|`a \\| b`|either|\n|c:\\\\|d|\n"
+
+    assert align_markdown_tables(content) == (
+        "| Code     | Meaning |\n"
+        "| -------- | ------- |\n"
+        "| `a \\| b` | either  |\n"
+        "| c:\\\\     | d       |\n"
+    )
+
+
+def test_align_tables_ragged_rows() -> None:
+    """Short rows are padded and long rows widen the table, separator included."""
+    content = "|A|B|\n|:--|--:|\n|1|2|3|\n|x|\n"
+
+    assert align_markdown_tables(content) == (
+        "| A   | B   |     |\n"
+        "| :-- | --: | --- |\n"
+        "| 1   | 2   | 3   |\n"
+        "| x   |     |     |\n"
+    )
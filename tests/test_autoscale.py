@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Tests for adaptive batch concurrency."""
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pdf2markdown.autoscale import AutoscaleOptions, Autoscaler, SystemLoad
+from pdf2markdown.cli import convert
+from pdf2markdown.usage import ResourceUsage
+
+GIB = 1024 * 1024 * 1024
+
+
+class FakeSystem:
+    """Probe and clock under the test's control."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.load = SystemLoad(available=64 * GIB, load=0.0, cpus=8)
+
+    def probe(self) -> SystemLoad:
+        return self.load
+
+    def clock(self) -> float:
+        return self.now
+
+
+def test_autoscaler_raises_within_bounds() -> None:
+    """The target rises by one per interval while memory and CPUs are spare."""
+    system = FakeSystem()
+    options = AutoscaleOptions(min_jobs=2, reserve=GIB, job_memory=4 * GIB)
+    scaler = Autoscaler(options, 4, system.probe, system.clock)
+    started: List[float] = []
+
+    def step(seconds: float) -> int:
+        system.now += seconds
+        while len(started) < scaler.target:
+            started.append(system.now - 60)  # Long past their startup
+        return scaler.update(started)
+
+    assert scaler.target == 2
+    assert step(1) == 2  # Within the interval
+    assert step(5) == 3
+    assert step(1) == 3
+    assert step(5) == 4
+    assert step(5) == 4  # At the upper bound
+
+    with pytest.raises(ValueError, match="between 1 and 4"):
+        Autoscaler(AutoscaleOptions(min_jobs=5), 4)
+
+
+def test_autoscaler_accounts_for_memory() -> None:
+    """Starting jobs and measured peaks count against the available memory."""
+    system = FakeSystem()
+    system.load = SystemLoad(available=8 * GIB, load=1.0, cpus=8)
+    options = AutoscaleOptions(reserve=GIB, job_memory=4 * GIB)
+    scaler = Autoscaler(options, 8, system.probe, system.clock)
+
+    system.now = 10.0
+    # 8 GiB - 1 GiB reserve - 4 GiB for the job just started < 4 GiB more
+    assert scaler.update([9.0]) == 1
+    system.now = 100.0
+    assert scaler.update([9.0]) == 2
+
+    # Measured jobs take less than the default
+    scaler.record(ResourceUsage(processes=1, max_rss=2 * GIB))
+    scaler.record(None)
+    assert scaler.job_memory() == 2 * GIB
+    system.now = 110.0
+    assert scaler.update([100.0, 105.0]) == 3
+
+
+def test_autoscaler_lowers_under_pressure() -> None:
+    """Low memory or overload puts the target below the running jobs."""
+    system = FakeSystem()
+    options = AutoscaleOptions(min_jobs=2)
+    scaler = Autoscaler(options, 8, system.probe, system.clock)
+    scaler.target = 6
+
+    system.load = SystemLoad(available=GIB // 2, load=1.0, cpus=8)
+    assert scaler.update([0.0] * 6) == 5
+    assert scaler.update([0.0] * 6) == 5  # Until a job finishes
+    assert scaler.update([0.0] * 5) == 4
+
+    system.load = SystemLoad(available=None, load=13.0, cpus=8)
+    assert scaler.update([0.0] * 4) == 3
+    assert scaler.update([0.0] * 2) == 2  # Not below the lower bound
+
+
+def test_batch_autoscale(tmp_path: Path, fake_marker: Path) -> None:
+    """An autoscaled batch converts every row."""
+    names = [f"doc{i}" for i in range(5)]
+    for name in names:
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF-1.4\n")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(
+        "".join(f"{tmp_path / name}.pdf,{tmp_path / name}.md\n" for name in names)
+    )
+
+    options = AutoscaleOptions(reserve=1, job_memory=1, interval=0.1)
+    convert(file=csv_file, backend="auto", jobs=3, autoscale=options)
+
+    assert all((tmp_path / f"{name}.md").exists() for name in names)
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert len(calls) == 5
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Tests for batch conversion with a fake marker_single."""
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pytest
+
+from pdf2markdown import iter_convert
+from pdf2markdown.cli import convert
+
+
+@pytest.mark.usefixtures("fake_marker")
+def test_parallel_batch(tmp_path: Path) -> None:
+    """Rows are converted by a process pool; failures stay isolated."""
+    rows = []
+    for name in ["one", "two", "broken", "three", "four"]:
+        pdf = tmp_path / f"{name}.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        rows.append(f"{pdf}, {tmp_path / 'out' / (name + '.md')}")
+    (tmp_path / "out").mkdir()
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text("\n".join(rows))
+
+    convert(file=csv_file, backend="subprocess", jobs=2)
+
+    for name in ["one", "two", "three", "four"]:
+        output = (tmp_path / "out" / f"{name}.md").read_text(encoding="utf-8")
+        assert output.startswith(f"# {name}\n")
+        assert "| A   | B   |" in output
+    assert not (tmp_path / "out" / "broken.md").exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_iter_convert(tmp_path: Path, fake_marker: Path, jobs: int) -> None:
+    """Results come back as each PDF is done, with its Markdown or output path."""
+    for name in ["one", "two", "broken"]:
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF-1.4\n")
+    pairs = [
+        (tmp_path / "one.pdf", None),
+        (tmp_path / "two.pdf", tmp_path / "two.md"),
+        (tmp_path / "broken.pdf", None),
+    ]
+
+    results = {
+        result.pdf.stem: result
+        for result in iter_convert(pairs, backend="subprocess", jobs=jobs)
+    }
+
+    one, two, broken = results["one"], results["two"], results["broken"]
+    assert (one.status, one.output, one.engine) == ("converted", None, "marker")
+    assert one.markdown is not None and one.markdown.startswith("# one\n")
+    assert not (tmp_path / "one.md").exists()
+    assert two.output == tmp_path / "two.md" and two.markdown is None
+    assert (tmp_path / "two.md").read_text(encoding="utf-8").startswith("# two\n")
+    # Nothing is measured unless asked to
+    assert (two.seconds, two.stages, two.usage) == (0.0, {}, None)
+    assert broken.status == "failed" and broken.error and broken.markdown is None
+    assert not hasattr(one, "__dict__")
+
+    (skipped,) = iter_convert(pairs[1:2], backend="subprocess")
+    assert skipped.status == "skipped"
+    (measured,) = iter_convert(
+        pairs[1:2], backend="subprocess", force=True, measure=True
+    )
+    assert "marker" in measured.stages and measured.seconds > 0
+
+
+def test_iter_convert_raises_unexpected_errors(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Only conversion and I/O failures are recorded; bugs are not swallowed."""
+
+    def aligned(lines: Iterable[str]) -> Iterator[str]:
+        raise ValueError("bug")
+        yield from lines
+
+    monkeypatch.setattr("pdf2markdown.cli.iter_aligned_lines", aligned)
+    (tmp_path / "one.pdf").write_bytes(b"%PDF-1.4\n")
+
+    with pytest.raises(ValueError, match="bug"):
+        list(iter_convert([(tmp_path / "one.pdf", None)], backend="subprocess"))
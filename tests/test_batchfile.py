@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for batch file readers and sharding."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown.batchfile import Shard, read_batch
+
+
+def test_read_csv_quoted_paths(tmp_path: Path) -> None:
+    """Quoted paths may contain commas; invalid and empty lines are skipped."""
+    batch = tmp_path / "batch.csv"
+    batch.write_text(
+        '"/in/a, b.pdf", /out/a.md\n'
+        "\n"
+        "/in/c.pdf,/out/c.md,extra\n"
+        "/in/d.pdf , /out/d.md \n",
+        encoding="utf-8",
+    )
+
+    assert list(read_batch(batch)) == [
+        (Path("/in/a, b.pdf"), Path("/out/a.md")),
+        (Path("/in/d.pdf"), Path("/out/d.md")),
+    ]
+
+
+def test_read_tsv_and_jsonl(tmp_path: Path) -> None:
+    """TSV and JSON Lines batch files are picked by extension."""
+    tsv = tmp_path / "batch.tsv"
+    tsv.write_text("/in/a,1.pdf\t/out/a.md\n", encoding="utf-8")
+    jsonl = tmp_path / "batch.jsonl"
+    jsonl.write_text(
+        json.dumps({"pdf": "/in/b.pdf", "markdown": "/out/b.md"})
+        + "\n\nnot json\n"
+        + json.dumps({"pdf": "/in/c.pdf"})
+        + "\n",
+        encoding="utf-8",
+    )
+
+    assert list(read_batch(tsv)) == [(Path("/in/a,1.pdf"), Path("/out/a.md"))]
+    assert list(read_batch(jsonl)) == [(Path("/in/b.pdf"), Path("/out/b.md"))]
+
+
+def test_shards_partition_rows() -> None:
+    """Every row belongs to exactly one shard, and shards are balanced."""
+    rows = [(Path(f"/in/{i}.pdf"), Path(f"/out/{i}.md")) for i in range(1000)]
+    shards = [Shard(i, 4) for i in range(4)]
+    parts = [list(shard.filter(rows)) for shard in shards]
+
+    assert sorted(row for part in parts for row in part) == sorted(rows)
+    assert all(200 < len(part) < 300 for part in parts)
+    # Assignment depends only on the path, not on the order of the rows
+    assert list(shards[0].filter(reversed(rows))) == parts[0][::-1]
+
+
+def test_parse_shard() -> None:
+    """Shards are given as I/N with I counted from 0."""
+    assert Shard.parse("2/3") == Shard(2, 3)
+    for value in ["3/3", "-1/3", "1", "a/3", "0/0"]:
+        with pytest.raises(ValueError):
+            Shard.parse(value)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Tests for the conversion cache."""
+
+import os
+from pathlib import Path
+
+from pdf2markdown.cache import ConversionCache
+from pdf2markdown.cli import convert
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    """Entries are keyed by PDF content and options."""
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first")
+    cache = ConversionCache(tmp_path / "cache")
+
+    key = cache.key(pdf, {"output_format": "markdown"})
+    assert cache.get(key) is None
+    cache.put(key, "# A\n")
+    assert cache.get(key) == "# A\n"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert cache.key(pdf, {"output_format": "json"}) != key
+    pdf.write_bytes(b"%PDF-1.4 second")
+    assert cache.key(pdf, {"output_format": "markdown"}) != key
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Going over the size cap evicts the entries used longest ago."""
+    cache = ConversionCache(tmp_path / "cache", max_bytes=35)
+    for age, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, "x" * 10)
+        entry = tmp_path / "cache" / key[:2] / f"{key}.md"
+        os.utime(entry, (1000 + age, 1000 + age))
+
+    # Using the oldest entry makes "bb02" the least recently used one.
+    assert cache.get("aa01") is not None
+    cache.put("dd04", "x" * 10)
+
+    assert cache.get("bb02") is None
+    assert cache.get("aa01") is not None
+    assert cache.get("cc03") is not None
+    assert cache.get("dd04") is not None
+
+
+def test_batch_uses_cache(tmp_path: Path, fake_marker: Path) -> None:
+    """The same PDF converted to two outputs runs marker once."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    first, second = tmp_path / "first.md", tmp_path / "second.md"
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(f"{pdf}, {first}\n{pdf}, {second}\n")
+
+    convert(file=csv_file, backend="subprocess", cache_dir=tmp_path / "cache")
+
+    assert first.read_text(encoding="utf-8") == second.read_text(encoding="utf-8")
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert len(calls) == 1
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Tests for page-chunked conversion."""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, cast
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from pdf2markdown.chunking import (
+    ChunkOptions,
+    convert_pdf_chunked,
+    page_chunks,
+    stitch_markdown,
+)
+from pdf2markdown.cli import convert
+from pdf2markdown.converter import MarkerWorker
+
+
+def _write_pages(path: Path, pages: int) -> None:
+    document = canvas.Canvas(str(path))
+    for page in range(pages):
+        document.drawString(72, 720, f"Page {page}")
+        document.showPage()
+    document.save()
+
+
+def test_page_chunks() -> None:
+    """Chunks cover every page with inclusive ranges."""
+    assert page_chunks(5, 2) == [(0, 1), (2, 3), (4, 4)]
+    assert page_chunks(4, 4) == [(0, 3)]
+
+
+def test_stitch_paragraphs() -> None:
+    """Plain chunks are separated by one blank line."""
+    assert stitch_markdown(["# Title\n\nText\n\n", "\nMore\n"]) == (
+        "# Title\n\nText\n\nMore\n"
+    )
+
+
+def test_stitch_repeated_table_header() -> None:
+    """A table continued with a repeated header is merged into one table."""
+    first = "Intro\n\n|A|B|\n|---|---|\n|1|2|\n"
+    second = "|A|B|\n|---|---|\n|3|4|\n\nAfter\n"
+    assert stitch_markdown([first, second]) == (
+        "Intro\n\n|A|B|\n|---|---|\n|1|2|\n|3|4|\n\nAfter\n"
+    )
+
+
+def test_stitch_table_header_is_data_row() -> None:
+    """A continuation whose header is a data row keeps it as a row."""
+    first = "|A|B|\n|---|---|\n|1|2|\n"
+    second = "|3|4|\n|---|---|\n|5|6|\n"
+    assert stitch_markdown([first, second]) == "|A|B|\n|---|---|\n|1|2|\n|3|4|\n|5|6|\n"
+
+
+def test_stitch_different_table() -> None:
+    """A table with another column count starts a new table."""
+    first = "|A|B|\n|---|---|\n|1|2|\n"
+    second = "|C|\n|---|\n|3|\n"
+    assert stitch_markdown([first, second]) == (
+        "|A|B|\n|---|---|\n|1|2|\n\n|C|\n|---|\n|3|\n"
+    )
+
+
+def test_stitch_list() -> None:
+    """List items on both sides of a boundary stay in one list."""
+    assert stitch_markdown(["- one\n- two\n\n", "\n- three\n"]) == (
+        "- one\n- two\n- three\n"
+    )
+
+
+def test_chunked_conversion(tmp_path: Path, fake_marker: Path) -> None:
+    """Page ranges are converted separately and aligned once when joined."""
+    pytest.importorskip("pypdfium2")
+    pdf = tmp_path / "long.pdf"
+    _write_pages(pdf, 5)
+    markdown = tmp_path / "long.md"
+
+    convert(
+        pdf,
+        markdown,
+        backend="subprocess",
+        chunking=ChunkOptions(size=2, threshold=1, jobs=2),
+    )
+
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert len(calls) == 3
+    assert markdown.read_text(encoding="utf-8") == (
+        "| A   | B   |\n"
+        "| --- | --- |\n"
+        "| p0  | x   |\n"
+        "| p1  | x   |\n"
+        "| p2  | x   |\n"
+        "| p3  | x   |\n"
+        "| p4  | x   |\n"
+    )
+
+
+class _RecordingWorker:
+    """In-process worker stand-in that records the chunks it converts."""
+
+    def __init__(self) -> None:
+        self.ranges: List[str] = []
+
+    def convert(self, pdf_path: Path, options: Optional[Dict[str, Any]]) -> str:
+        self.ranges.append(str((options or {}).get("page_range")))
+        return "text\n"
+
+
+def test_chunks_run_concurrently_with_worker(tmp_path: Path, fake_marker: Path) -> None:
+    """Several chunk jobs use marker_single even when a worker exists."""
+    pytest.importorskip("pypdfium2")
+    pdf = tmp_path / "long.pdf"
+    _write_pages(pdf, 5)
+    worker = _RecordingWorker()
+
+    convert_pdf_chunked(
+        pdf, ChunkOptions(size=2, threshold=1, jobs=2), cast(MarkerWorker, worker)
+    )
+    assert worker.ranges == []
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert len(calls) == 3
+
+    convert_pdf_chunked(
+        pdf, ChunkOptions(size=2, threshold=1, jobs=1), cast(MarkerWorker, worker)
+    )
+    assert worker.ranges == ["0-1", "2-3", "4-4"]
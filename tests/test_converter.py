@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Tests for the converter backends."""
+
+import pytest
+
+from pdf2markdown.converter import MarkerWorker, create_worker
+
+
+def test_create_worker_subprocess() -> None:
+    """The subprocess backend never creates an in-process worker."""
+    assert create_worker("subprocess") is None
+
+
+def test_create_worker_falls_back(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Without marker's Python API the in-process backends fall back."""
+    monkeypatch.setattr(MarkerWorker, "available", staticmethod(lambda: False))
+    assert create_worker("inprocess") is None
+    assert create_worker("auto") is None
+
+
+def test_create_worker_inprocess(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With marker's Python API a worker is created without loading models."""
+    monkeypatch.setattr(MarkerWorker, "available", staticmethod(lambda: True))
+    worker = create_worker("auto")
+    assert isinstance(worker, MarkerWorker)
+
+
+def test_create_worker_unknown_backend() -> None:
+    """Unknown backends are rejected."""
+    with pytest.raises(ValueError):
+        create_worker("gpu")
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Tests for keeping extracted images."""
+
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown.cli import convert
+from pdf2markdown.errors import ConversionError
+from pdf2markdown.images import ImageOptions
+
+
+def test_keep_images_with_store(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Images are moved next to the Markdown and shared through the store."""
+    monkeypatch.setenv("FAKE_MARKER_IMAGES", "2")
+    store = tmp_path / "store"
+    for name in ["one", "two"]:
+        pdf = tmp_path / f"{name}.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        convert(
+            pdf,
+            tmp_path / "out" / f"{name}.md",
+            backend="subprocess",
+            images=ImageOptions(store),
+        )
+
+    markdown = (tmp_path / "out" / "one.md").read_text(encoding="utf-8")
+    assert "![](one_assets/_page_0_Picture_0.jpeg)" in markdown
+    assert "![](one_assets/_page_0_Picture_1.jpeg)" in markdown
+
+    first = tmp_path / "out" / "one_assets" / "_page_0_Picture_0.jpeg"
+    second = tmp_path / "out" / "two_assets" / "_page_0_Picture_0.jpeg"
+    assert first.read_bytes() == b"image 0"
+    assert first.stat().st_ino == second.stat().st_ino
+    assert len(list(store.rglob("*.jpeg"))) == 2
+    # marker's workspace was created next to the output and removed
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "one.md",
+        "one_assets",
+        "two.md",
+        "two_assets",
+    ]
+
+    # A new conversion with fewer images drops the stale ones
+    monkeypatch.setenv("FAKE_MARKER_IMAGES", "1")
+    convert(
+        tmp_path / "one.pdf",
+        tmp_path / "out" / "one.md",
+        force=True,
+        backend="subprocess",
+        images=ImageOptions(store),
+    )
+    assets = tmp_path / "out" / "one_assets"
+    assert [p.name for p in assets.iterdir()] == ["_page_0_Picture_0.jpeg"]
+
+
+def test_keep_images_without_store(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Without a store the images are only moved."""
+    monkeypatch.setenv("FAKE_MARKER_IMAGES", "1")
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    convert(pdf, tmp_path / "doc.md", backend="subprocess", images=ImageOptions())
+
+    image = tmp_path / "doc_assets" / "_page_0_Picture_0.jpeg"
+    assert image.stat().st_nlink == 1
+    markdown = (tmp_path / "doc.md").read_text(encoding="utf-8")
+    assert markdown.endswith("\n![](doc_assets/_page_0_Picture_0.jpeg)\n")
+
+
+def test_image_links_are_escaped(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Links to the assets of a Markdown name with a space are valid."""
+    monkeypatch.setenv("FAKE_MARKER_IMAGES", "1")
+    pdf = tmp_path / "report.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    markdown = tmp_path / "Annual Report.md"
+
+    convert(pdf, markdown, backend="subprocess", images=ImageOptions())
+
+    text = markdown.read_text(encoding="utf-8")
+    assert text.endswith("\n![](Annual%20Report_assets/_page_0_Picture_0.jpeg)\n")
+    assert (tmp_path / "Annual Report_assets" / "_page_0_Picture_0.jpeg").exists()
+
+
+def test_failed_write_leaves_no_images(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Images are only kept once the Markdown was written."""
+    monkeypatch.setenv("FAKE_MARKER_IMAGES", "1")
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    # The Markdown cannot be written over a directory
+    markdown = tmp_path / "out" / "doc.md"
+    markdown.mkdir(parents=True)
+
+    with pytest.raises(ConversionError):
+        convert(pdf, markdown, force=True, backend="subprocess", images=ImageOptions())
+
+    assert [p.name for p in markdown.parent.iterdir()] == ["doc.md"]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""Tests for the SQLite job store."""
+
+import socket
+import time
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown.batchfile import Shard, read_batch
+from pdf2markdown.cli import convert
+from pdf2markdown.jobstore import JobStore, main
+
+
+def _rows(count: int) -> list[tuple[Path, Path]]:
+    return [(Path(f"/in/{i}.pdf"), Path(f"/out/{i}.md")) for i in range(count)]
+
+
+def _batch(tmp_path: Path, names: list[str]) -> Path:
+    lines = []
+    for name in names:
+        pdf = tmp_path / f"{name}.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        lines.append(f"{pdf}, {tmp_path / 'out' / (name + '.md')}")
+    (tmp_path / "out").mkdir(exist_ok=True)
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text("\n".join(lines))
+    return csv_file
+
+
+def test_import_once_and_claim(tmp_path: Path) -> None:
+    """An unchanged batch file is imported once; each row is claimed once."""
+    batch = tmp_path / "batch.csv"
+    batch.write_text("x")
+    store = JobStore(tmp_path / "jobs.db")
+    assert store.import_batch(batch, _rows(3)) == 3
+    assert store.import_batch(batch, _rows(5)) == 0
+
+    other = JobStore(tmp_path / "jobs.db")
+    claimed = [store.claim("a"), other.claim("b"), store.claim("a"), other.claim("b")]
+    assert claimed[:3] == _rows(3)
+    assert claimed[3] is None
+    assert store.stats()["running"] == 3
+
+
+def test_retry_then_fail(tmp_path: Path) -> None:
+    """Failed rows go back to the queue until their attempts run out."""
+    store = JobStore(tmp_path / "jobs.db", max_attempts=2)
+    store.import_batch(tmp_path, _rows(2))
+
+    pdf, md = store.claim("a") or (Path(), Path())
+    store.fail("a", pdf, md, "boom")
+    # The other row is tried before the retry
+    assert store.claim("a") == _rows(2)[1]
+    assert store.claim("a") == (pdf, md)
+    store.fail("a", pdf, md, "boom again")
+    store.complete("a", *_rows(2)[1])
+
+    stats = store.stats()
+    assert (stats["failed"], stats["done"], stats["backlog"]) == (1, 1, 0)
+    assert store.failures() == [(str(pdf), "boom again")]
+    assert store.retry_failed() == 1
+    assert store.claim("a") == (pdf, md)
+
+
+def test_expired_lease_is_reclaimed(tmp_path: Path) -> None:
+    """Rows of a run that stopped renewing its lease are claimed again."""
+    store = JobStore(tmp_path / "jobs.db", lease=0.1)
+    store.import_batch(tmp_path, _rows(1))
+    assert store.claim("crashed") == _rows(1)[0]
+    assert store.claim("alive") is None
+
+    time.sleep(0.2)
+    assert store.claim("alive") == _rows(1)[0]
+    # The crashed run can no longer finish the row
+    store.complete("crashed", *_rows(1)[0])
+    assert store.stats()["done"] == 0
+
+
+def test_recover_dead_local_owner(tmp_path: Path) -> None:
+    """Rows leased to a process of this host that is gone are requeued."""
+    store = JobStore(tmp_path / "jobs.db")
+    store.import_batch(tmp_path, _rows(1))
+    host_owner = f"{socket.gethostname()}:999999999"
+    store.claim(host_owner)
+
+    assert store.recover() == 1
+    assert store.claim("next") == _rows(1)[0]
+
+
+@pytest.mark.usefixtures("fake_marker")
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_resumes_from_store(tmp_path: Path, jobs: int) -> None:
+    """A batch run with a job store skips rows finished by an earlier run."""
+    csv_file = _batch(tmp_path, ["one", "broken", "two"])
+    store = JobStore(tmp_path / "jobs.db", max_attempts=1)
+    store.import_batch(csv_file, read_batch(csv_file))
+    # An earlier run finished the first row before it died
+    store.complete("earlier:1", *(store.claim("earlier:1") or (Path(), Path())))
+
+    convert(file=csv_file, backend="subprocess", jobs=jobs, job_store=store)
+
+    stats = store.stats()
+    assert (stats["done"], stats["failed"], stats["backlog"]) == (2, 1, 0)
+    assert (tmp_path / "out" / "two.md").exists()
+    assert not (tmp_path / "out" / "one.md").exists()
+    [(pdf, error)] = store.failures()
+    assert pdf.endswith("broken.pdf") and error
+
+
+def test_status_command(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """The status subcommand prints the backlog and throughput."""
+    store = JobStore(tmp_path / "jobs.db")
+    store.import_batch(tmp_path, _rows(3))
+    store.complete("a", *(store.claim("a") or (Path(), Path())))
+
+    main([str(tmp_path / "jobs.db")])
+    out = capsys.readouterr().out
+    assert "done            1" in out
+    assert "Backlog: 2 files" in out
+
+
+@pytest.mark.usefixtures("fake_marker")
+def test_shards_share_store(tmp_path: Path) -> None:
+    """Each shard imports and converts its own rows of a shared store."""
+    names = [f"doc{i}" for i in range(8)]
+    csv_file = _batch(tmp_path, names)
+    shards = [Shard(0, 2), Shard(1, 2)]
+    owned = [
+        {name for name in names if shard.owns(tmp_path / f"{name}.pdf")}
+        for shard in shards
+    ]
+    assert all(owned)
+    store = JobStore(tmp_path / "jobs.db")
+
+    convert(file=csv_file, backend="subprocess", shard=shards[0], job_store=store)
+    converted = {path.stem for path in (tmp_path / "out").iterdir()}
+    assert converted == owned[0]
+    assert store.stats()["total"] == len(owned[0])
+
+    convert(file=csv_file, backend="subprocess", shard=shards[1], job_store=store)
+    converted = {path.stem for path in (tmp_path / "out").iterdir()}
+    assert converted == set(names)
+    stats = store.stats()
+    assert (stats["done"], stats["backlog"]) == (len(names), 0)
+
+
+def test_rejected_rows_are_failed(tmp_path: Path) -> None:
+    """Rows that fail the preflight are counted as failed in the store."""
+    csv_file = _batch(tmp_path, ["empty"])
+    (tmp_path / "empty.pdf").write_bytes(b"")
+    with csv_file.open("a") as f:
+        f.write(f"\n{tmp_path / 'missing.pdf'}, {tmp_path / 'out' / 'missing.md'}")
+    store = JobStore(tmp_path / "jobs.db")
+
+    convert(file=csv_file, backend="subprocess", order="shortest", job_store=store)
+
+    stats = store.stats()
+    assert (stats["failed"], stats["backlog"]) == (2, 0)
+    errors = dict(store.failures())
+    assert errors[str(tmp_path / "empty.pdf")] == "Preflight: PDF is empty"
+    assert errors[str(tmp_path / "missing.pdf")] == "Preflight: PDF not found"
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Tests for time and memory limits on marker_single."""
+
+import pickle
+import time
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown.cli import convert
+from pdf2markdown.converter import MarkerWorker, convert_pdf_to_markdown
+from pdf2markdown.errors import ConversionTimeout, MemoryLimitExceeded
+from pdf2markdown.limits import ResourceLimits
+
+
+def test_time_limit() -> None:
+    """The smaller of the per-file and per-page limits applies."""
+    assert ResourceLimits().time_limit(10) is None
+    assert ResourceLimits(timeout=60).time_limit(None) == 60
+    assert ResourceLimits(page_timeout=2).time_limit(None) is None
+    assert ResourceLimits(timeout=60, page_timeout=2).time_limit(10) == 20
+    assert ResourceLimits(timeout=60, page_timeout=2).time_limit(100) == 60
+
+
+def test_timeout_kills_marker(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A marker run over the time limit is killed and reported as a timeout."""
+    monkeypatch.setenv("FAKE_MARKER_DELAY", "30")
+    pdf = tmp_path / "slow.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    start = time.monotonic()
+    with pytest.raises(ConversionTimeout) as excinfo:
+        convert_pdf_to_markdown(pdf, limits=ResourceLimits(timeout=0.5))
+    assert time.monotonic() - start < 10
+    assert excinfo.value.timeout == 0.5
+
+    error = pickle.loads(pickle.dumps(excinfo.value))
+    assert isinstance(error, ConversionTimeout)
+    assert str(error) == str(excinfo.value)
+
+
+def test_memory_limit_kills_marker(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A marker run over the memory limit is killed and reported as such."""
+    monkeypatch.setenv("FAKE_MARKER_ALLOCATE", "256")
+    monkeypatch.setenv("FAKE_MARKER_DELAY", "30")
+    pdf = tmp_path / "hungry.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    limits = ResourceLimits(max_memory=128 << 20)
+    with pytest.raises(MemoryLimitExceeded) as excinfo:
+        convert_pdf_to_markdown(pdf, limits=limits)
+    assert excinfo.value.used is not None
+    assert excinfo.value.used > 128 << 20
+
+
+def test_batch_continues_after_timeout(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A file that hits a limit fails alone; the rest of the batch converts."""
+    rows = []
+    for name in ["one", "two"]:
+        pdf = tmp_path / f"{name}.pdf"
+        pdf.write_bytes(b"%PDF-1.4\n")
+        rows.append(f"{pdf},{tmp_path / f'{name}.md'}\n")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text("".join(rows))
+    # Every file runs over the time limit
+    monkeypatch.setenv("FAKE_MARKER_DELAY", "1")
+
+    convert(
+        file=csv_file,
+        backend="subprocess",
+        jobs=2,
+        limits=ResourceLimits(timeout=0.2),
+    )
+    assert not (tmp_path / "one.md").exists()
+    assert not (tmp_path / "two.md").exists()
+
+    monkeypatch.delenv("FAKE_MARKER_DELAY")
+    convert(file=csv_file, backend="subprocess", limits=ResourceLimits(timeout=30))
+    assert (tmp_path / "one.md").exists()
+    assert (tmp_path / "two.md").exists()
+
+
+def test_limits_use_marker_single(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Library conversions with limits never run in-process marker."""
+    monkeypatch.setattr(MarkerWorker, "available", staticmethod(lambda: True))
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    limits = ResourceLimits(timeout=30)
+
+    convert(pdf, tmp_path / "doc.md", backend="auto", limits=limits)
+    assert (tmp_path / "doc.md").exists()
+    assert (fake_marker / "calls.log").exists()
+
+    with pytest.raises(ValueError, match="need the subprocess backend"):
+        convert(pdf, tmp_path / "doc.md", backend="inprocess", limits=limits)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Tests for incremental batch conversion."""
+
+import os
+from pathlib import Path
+
+from pdf2markdown.cache import file_digest
+from pdf2markdown.cli import convert
+from pdf2markdown.manifest import BatchManifest
+
+
+def test_incremental_batch(tmp_path: Path, fake_marker: Path) -> None:
+    """Reruns only convert added or changed inputs and missing outputs."""
+    calls = fake_marker / "calls.log"
+    pdfs = [tmp_path / f"{name}.pdf" for name in ["a", "b", "c"]]
+    for pdf in pdfs:
+        pdf.write_bytes(b"%PDF-1.4 " + pdf.stem.encode())
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text("".join(f"{pdf}, {pdf.with_suffix('.md')}\n" for pdf in pdfs))
+
+    def run() -> list[str]:
+        calls.unlink(missing_ok=True)
+        convert(file=csv_file, backend="subprocess", incremental=True)
+        if not calls.exists():
+            return []
+        return [line.split()[0] for line in calls.read_text().splitlines()]
+
+    assert run() == [str(pdf) for pdf in pdfs]
+    manifest = BatchManifest.load(BatchManifest.path_for(csv_file))
+    assert set(manifest.entries) == {str(pdf) for pdf in pdfs}
+    assert run() == []
+
+    # Same content with a new mtime is rehashed but not reconverted
+    stat = pdfs[0].stat()
+    os.utime(pdfs[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert run() == []
+
+    pdfs[1].write_bytes(b"%PDF-1.4 changed")
+    pdfs[2].with_suffix(".md").unlink()
+    assert run() == [str(pdfs[1]), str(pdfs[2])]
+    assert run() == []
+
+
+def test_manifest_records_input_before_conversion(tmp_path: Path) -> None:
+    """A PDF replaced during its conversion is converted again next time."""
+    pdf = tmp_path / "a.pdf"
+    markdown = tmp_path / "a.md"
+    pdf.write_bytes(b"%PDF-1.4 before")
+    manifest = BatchManifest(tmp_path / "batch.csv.manifest.json")
+
+    assert list(manifest.filter([(pdf, markdown)])) == [(pdf, markdown)]
+    # Replaced with content of the same size while it was being converted
+    stat = pdf.stat()
+    pdf.write_bytes(b"%PDF-1.4 after!")
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    markdown.write_text("# before\n", encoding="utf-8")
+    manifest.record(pdf, markdown)
+
+    assert manifest.entries[str(pdf)]["output_sha256"] == file_digest(markdown)
+    assert manifest.needs_conversion(pdf, markdown)
+    manifest.record(pdf, markdown)
+    assert not manifest.needs_conversion(pdf, markdown)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Tests for page-by-page conversion through the cache."""
+
+from pathlib import Path
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from pdf2markdown.cli import convert
+from pdf2markdown.pagecache import split_pages
+
+pytest.importorskip("pypdfium2")
+
+
+def _write_pdf(path: Path, texts: list[str], title: str = "") -> None:
+    document = canvas.Canvas(str(path))
+    document.setTitle(title)
+    for text in texts:
+        document.drawString(72, 720, text)
+        document.showPage()
+    document.save()
+
+
+def _marker_calls(fake_marker: Path) -> int:
+    calls = fake_marker / "calls.log"
+    return len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+def test_split_pages_is_reproducible(tmp_path: Path) -> None:
+    """The same page yields the same bytes in different documents."""
+    _write_pdf(tmp_path / "a.pdf", ["one", "two", "three"])
+    _write_pdf(tmp_path / "b.pdf", ["one", "two, revised", "three", "four"])
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    a = [page.read_bytes() for page in split_pages(tmp_path / "a.pdf", tmp_path / "a")]
+    b = [page.read_bytes() for page in split_pages(tmp_path / "b.pdf", tmp_path / "b")]
+
+    assert len(a) == 3 and len(b) == 4
+    assert a[0] == b[0] and a[2] == b[2]
+    assert a[1] != b[1]
+    # Nothing random or of the time of splitting is left in the pages
+    assert b"/ID[<" + b"0" * 32 + b">" in a[0]
+    assert b"/CreationDate(D:00000000000000)" in a[0]
+
+
+def test_page_cache_keeps_output(tmp_path: Path, fake_marker: Path) -> None:
+    """Documents with the same pages are reused; others convert as a whole."""
+    for name, title, texts in [
+        ("v1", "First", ["one", "two", "three"]),
+        ("copy", "Saved again", ["one", "two", "three"]),
+        ("v2", "Revised", ["one", "two, revised", "three"]),
+    ]:
+        (tmp_path / name).mkdir()
+        _write_pdf(tmp_path / name / "doc.pdf", texts, title)
+    assert (tmp_path / "v1" / "doc.pdf").read_bytes() != (
+        tmp_path / "copy" / "doc.pdf"
+    ).read_bytes()
+
+    def run(name: str, cache_dir: Path, page_cache: bool = True) -> str:
+        markdown = tmp_path / name / f"{cache_dir.name}.md"
+        convert(
+            tmp_path / name / "doc.pdf",
+            markdown,
+            backend="subprocess",
+            cache_dir=cache_dir,
+            page_cache=page_cache,
+        )
+        return markdown.read_text(encoding="utf-8")
+
+    cache = tmp_path / "cache"
+    first = run("v1", cache)
+    assert _marker_calls(fake_marker) == 1
+
+    # Only the file changed: the pages are reused
+    assert run("copy", cache) == first
+    assert _marker_calls(fake_marker) == 1
+
+    # A changed page converts the whole document once, as without the cache
+    revised = run("v2", cache)
+    assert _marker_calls(fake_marker) == 2
+    assert revised == run("v2", tmp_path / "plain", page_cache=False)
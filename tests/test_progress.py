@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Tests for streaming marker's output and progress."""
+
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from pdf2markdown.converter import convert_pdf_to_markdown
+from pdf2markdown.errors import ConversionError
+from pdf2markdown.progress import MAX_LINE_LENGTH, OutputStream, parse_progress
+
+
+def test_parse_progress() -> None:
+    """tqdm bars are parsed; other lines are not."""
+    line = "Recognizing Layout:  45%|████▌     | 9/20 [00:03<00:04,  2.66it/s]"
+    assert parse_progress(line) == ("Recognizing Layout", 9, 20)
+    assert parse_progress("100%|██████████| 3/3 [00:01<00:00]") == ("", 3, 3)
+    assert parse_progress("Loaded layout model on device cpu") is None
+
+
+def test_output_stream_chunks() -> None:
+    """Lines split across reads, carriage returns and long lines are handled."""
+    updates: List[Tuple[str, int, int]] = []
+    stream = OutputStream(lambda *update: updates.append(update), tail_lines=4)
+    data = (
+        "warming up\r\nOCR: 0%| | 0/2\rOCR: 50%|# | 1/2\rOCR: 50%|# | 1/2\r"
+        "OCR: 100%|##| 2/2\nline a\nline b\nline c\nline d\n" + "x" * 5000
+    ).encode()
+    for i in range(0, len(data), 7):
+        stream.feed(data[i : i + 7])
+    stream.feed(b"")
+
+    assert updates == [("OCR", 0, 2), ("OCR", 1, 2), ("OCR", 2, 2)]
+    tail = list(stream.tail)
+    assert tail[:3] == ["line c", "line d", "x" * MAX_LINE_LENGTH]
+    assert 0 < len(tail[3]) < MAX_LINE_LENGTH
+
+
+def test_convert_reports_progress(tmp_path: Path, fake_marker: Path) -> None:
+    """Progress bars of marker_single reach the callback as they are drawn."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    updates: List[Tuple[str, int, int]] = []
+
+    convert_pdf_to_markdown(pdf, progress=lambda *update: updates.append(update))
+
+    assert updates == [("Recognizing Text", done, 3) for done in range(4)]
+
+
+def test_error_keeps_stderr_tail(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Only the last stderr lines end up in the error message."""
+    monkeypatch.setenv("FAKE_MARKER_NOISE", "10000")
+    pdf = tmp_path / "broken.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    with pytest.raises(ConversionError) as excinfo:
+        convert_pdf_to_markdown(pdf)
+
+    message = str(excinfo.value)
+    assert f"cannot convert {pdf}" in message
+    assert "log line 9999" in message
+    assert "log line 0\n" not in message
+    assert "Recognizing Text" not in message
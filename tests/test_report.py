@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Tests for stage timing and run reports."""
+
+import json
+import tracemalloc
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from pdf2markdown.align_tables import iter_aligned_lines
+from pdf2markdown.cli import convert
+from pdf2markdown.report import RunReport
+from pdf2markdown.timing import stage, timed_stages
+
+
+def test_stage_times_are_exclusive(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A nested stage's time is not charged to its parent."""
+    clock = iter([0.0, 1.0, 3.0, 6.0, 10.0])
+    monkeypatch.setattr("pdf2markdown.timing.time.monotonic", lambda: next(clock))
+
+    with timed_stages() as timer:
+        with stage("outer"):
+            with stage("inner"):
+                pass
+
+    assert timer.stages == {"outer": 2.0 + 4.0, "inner": 3.0}
+
+
+def _write_pdf(path: Path, pages: int) -> None:
+    document = canvas.Canvas(str(path))
+    for page in range(pages):
+        document.drawString(72, 720, f"Page {page + 1}")
+        document.showPage()
+    document.save()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_report(tmp_path: Path, fake_marker: Path, jobs: int) -> None:
+    """Converted, skipped and failed rows are reported with a summary."""
+    pytest.importorskip("pypdfium2")
+    _write_pdf(tmp_path / "doc.pdf", 3)
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4\n")
+    (tmp_path / "done.pdf").write_bytes(b"%PDF-1.4\n")
+    (tmp_path / "done.md").write_text("# done\n")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(
+        "".join(
+            f"{tmp_path / name}.pdf,{tmp_path / name}.md\n"
+            for name in ["doc", "broken", "done"]
+        )
+    )
+    report_path = tmp_path / "report.jsonl"
+    prometheus_path = tmp_path / "textfile" / "pdf2markdown.prom"
+
+    report = RunReport(report_path, prometheus_path)
+    convert(file=csv_file, backend="subprocess", jobs=jobs, report=report)
+    report.close()
+
+    lines = [json.loads(line) for line in report_path.read_text().splitlines()]
+    files = {Path(line["pdf"]).stem: line for line in lines[:-1]}
+    assert {name: line["status"] for name, line in files.items()} == {
+        "doc": "converted",
+        "broken": "failed",
+        "done": "skipped",
+    }
+    doc = files["doc"]
+    assert doc["pages"] == 3
+    assert doc["pages_per_second"] == pytest.approx(3 / doc["seconds"])
+    assert {"marker", "read", "align", "write"} <= set(doc["stages"])
+    assert sum(doc["stages"].values()) <= doc["seconds"]
+    assert "Marker conversion failed" in files["broken"]["error"]
+    assert doc["usage"]["processes"] == files["broken"]["usage"]["processes"] == 1
+    assert files["done"]["usage"] is None
+
+    summary = lines[-1]
+    assert summary["type"] == "summary"
+    assert (summary["converted"], summary["skipped"], summary["failed"]) == (1, 1, 1)
+    assert summary["pages"] == 3
+    assert summary["file_seconds"]["p50"] == doc["seconds"]
+    assert summary["resources"]["processes"] == 2
+    assert summary["resources"]["max_rss"]["max"] >= doc["usage"]["max_rss"]
+
+    metrics = prometheus_path.read_text()
+    assert 'pdf2markdown_files{status="failed"} 1\n' in metrics
+    assert "pdf2markdown_pages 3\n" in metrics
+    assert 'pdf2markdown_stage_seconds{stage="marker"}' in metrics
+    assert 'pdf2markdown_marker_max_rss_bytes{quantile="1"}' in metrics
+
+
+def test_resource_usage(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """marker's peak memory and CPU time and the writer's allocations are kept."""
+    monkeypatch.setenv("FAKE_MARKER_ALLOCATE", "64")
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    report = RunReport()
+
+    convert(pdf, tmp_path / "doc.md", backend="subprocess", report=report)
+
+    resources = report.summary()["resources"]
+    assert resources["processes"] == 1
+    assert resources["max_rss"]["max"] >= 64 << 20
+    assert resources["user_seconds"] + resources["system_seconds"] > 0
+    assert resources["python_peak"] > 0
+
+
+def test_memory_traced_only_for_report(
+    tmp_path: Path, fake_marker: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """tracemalloc stays off while aligning and writing without a report."""
+    tracing: List[bool] = []
+
+    def aligned(lines: Iterable[str]) -> Iterator[str]:
+        for line in iter_aligned_lines(lines):
+            tracing.append(tracemalloc.is_tracing())
+            yield line
+
+    monkeypatch.setattr("pdf2markdown.cli.iter_aligned_lines", aligned)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    convert(pdf, tmp_path / "plain.md", backend="subprocess")
+    assert tracing and not any(tracing)
+    tracing.clear()
+
+    convert(pdf, tmp_path / "reported.md", backend="subprocess", report=RunReport())
+    assert tracing and all(tracing)
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Tests for the cost-aware batch scheduler."""
+
+import json
+from pathlib import Path
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from pdf2markdown.cli import convert
+from pdf2markdown.scheduler import CostModel, History, preflight, schedule
+
+pytest.importorskip("pypdfium2")
+
+
+def _write_pdf(path: Path, pages: int) -> None:
+    document = canvas.Canvas(str(path))
+    for page in range(pages):
+        document.drawString(72, 720, f"Page {page + 1}")
+        document.showPage()
+    document.save()
+
+
+def test_preflight(tmp_path: Path) -> None:
+    """Missing, empty and unreadable PDFs are rejected; good ones are counted."""
+    _write_pdf(tmp_path / "good.pdf", 3)
+    (tmp_path / "empty.pdf").write_bytes(b"")
+    (tmp_path / "garbage.pdf").write_bytes(b"not a pdf")
+
+    good = preflight(tmp_path / "good.pdf")
+    assert (good.pages, good.error) == (3, None)
+    assert good.size == (tmp_path / "good.pdf").stat().st_size
+    assert preflight(tmp_path / "missing.pdf").error == "PDF not found"
+    assert preflight(tmp_path / "empty.pdf").error == "PDF is empty"
+    assert str(preflight(tmp_path / "garbage.pdf").error).startswith(
+        "PDF cannot be opened"
+    )
+
+
+def test_cost_model_fit() -> None:
+    """Least squares recovers the costs; degenerate histories fall back."""
+    samples = [
+        (pages, mib, 2.0 + 0.5 * pages + 1.0 * mib)
+        for pages, mib in [(1, 0.1), (10, 3.0), (50, 1.0), (200, 20.0), (5, 8.0)]
+    ]
+    model = CostModel.fit(samples)
+    assert model.fixed == pytest.approx(2.0)
+    assert model.per_page == pytest.approx(0.5)
+    assert model.per_mib == pytest.approx(1.0)
+
+    assert CostModel.fit(samples[:2]) == CostModel()
+    # Sizes proportional to pages cannot be told apart from them
+    proportional = [(pages, pages / 10, 1.0 + 2.0 * pages) for pages in (1, 4, 9)]
+    model = CostModel.fit(proportional)
+    assert model.per_page == pytest.approx(2.0)
+    assert model.per_mib == 0.0
+
+
+def test_schedule_orders_and_rejects(tmp_path: Path) -> None:
+    """Rows are ordered by estimate; done rows come first, bad rows are dropped."""
+    for name, pages in [("small", 1), ("big", 9), ("medium", 4)]:
+        _write_pdf(tmp_path / f"{name}.pdf", pages)
+    (tmp_path / "done.md").write_text("# done\n")
+    rows = [
+        (tmp_path / f"{name}.pdf", tmp_path / f"{name}.md")
+        for name in ["small", "big", "missing", "done", "medium"]
+    ]
+    rejected: list[str] = []
+
+    def names(order: str, force: bool = False) -> list[str]:
+        scheduled = schedule(
+            rows, order, CostModel(), force, lambda pdf, md, why: rejected.append(why)
+        )
+        return [pdf.stem for pdf, _ in scheduled]
+
+    assert names("longest") == ["done", "big", "medium", "small"]
+    assert names("shortest") == ["done", "small", "medium", "big"]
+    assert names("csv") == ["done", "small", "big", "medium"]
+    assert rejected == ["PDF not found"] * 3
+    assert "done" not in names("longest", force=True)
+
+
+def test_batch_longest_first(tmp_path: Path, fake_marker: Path) -> None:
+    """A batch run converts the longest PDF first and records its history."""
+    for name, pages in [("small", 1), ("big", 6), ("medium", 3)]:
+        _write_pdf(tmp_path / f"{name}.pdf", pages)
+    (tmp_path / "garbage.pdf").write_bytes(b"not a pdf")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(
+        "".join(
+            f"{tmp_path / name}.pdf,{tmp_path / name}.md\n"
+            for name in ["small", "garbage", "big", "medium"]
+        )
+    )
+
+    convert(file=csv_file, backend="subprocess", order="longest")
+
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert [Path(call.split()[0]).stem for call in calls] == ["big", "medium", "small"]
+    assert not (tmp_path / "garbage.md").exists()
+    history = json.loads(History.path_for(csv_file).read_text())
+    assert sorted(pages for pages, _, _ in history) == [1, 3, 6]
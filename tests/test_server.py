@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Tests for the conversion daemon."""
+
+import http.client
+import json
+import socket
+import stat
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pytest
+
+from pdf2markdown.server import ConversionService, Server, create_server
+
+TOKEN = "s3cret"
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: Path) -> None:
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(self.socket_path))
+
+
+def _request(
+    conn: http.client.HTTPConnection,
+    method: str,
+    path: str,
+    body: Optional[Dict[str, Any]] = None,
+    token: Optional[str] = TOKEN,
+    content_type: str = "application/json",
+) -> Tuple[int, Dict[str, Any]]:
+    data = json.dumps(body) if body is not None else None
+    headers = {"Content-Type": content_type}
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    conn.request(method, path, data, headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@contextmanager
+def _running(server: Server, service: ConversionService) -> Iterator[None]:
+    service.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+@pytest.fixture
+def tcp_server(fake_marker: Path) -> Iterator[Tuple[str, int]]:
+    """Run a daemon with two subprocess workers on a free localhost port."""
+    service = ConversionService(workers=2, backend="subprocess")
+    server = create_server(service, port=0, token=TOKEN)
+    with _running(server, service):
+        yield "127.0.0.1", server.socket.getsockname()[1]
+
+
+def test_convert_over_tcp(tmp_path: Path, tcp_server: Tuple[str, int]) -> None:
+    """Conversions return markdown, write files and show up in the stats."""
+    conn = http.client.HTTPConnection(*tcp_server)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    assert _request(conn, "GET", "/health") == (200, {"status": "ok"})
+
+    status, body = _request(conn, "POST", "/convert", {"pdf": str(pdf)})
+    assert status == 200
+    assert body["markdown"] == "# doc\n\n| A   | B   |\n| --- | --- |\n| 1   | 22  |\n"
+
+    markdown = tmp_path / "out" / "doc.md"
+    status, body = _request(
+        conn, "POST", "/convert", {"pdf": str(pdf), "markdown": str(markdown)}
+    )
+    assert (status, body) == (200, {"markdown_path": str(markdown)})
+    assert markdown.read_text(encoding="utf-8") == (
+        "# doc\n\n| A   | B   |\n| --- | --- |\n| 1   | 22  |\n"
+    )
+
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4\n")
+    status, body = _request(conn, "POST", "/convert", {"pdf": str(broken)})
+    assert status == 500
+    assert "Marker conversion failed" in body["error"]
+
+    assert _request(conn, "POST", "/convert", {"markdown": "x.md"})[0] == 400
+
+    status, stats = _request(conn, "GET", "/stats")
+    assert status == 200
+    assert stats["completed"] == 2
+    assert stats["failed"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["workers"] == 2
+
+
+def test_rejects_unsafe_requests(
+    tmp_path: Path, tcp_server: Tuple[str, int], fake_marker: Path
+) -> None:
+    """Requests need the token and a JSON body; ports need a token."""
+    conn = http.client.HTTPConnection(*tcp_server)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    request = {"pdf": str(pdf)}
+
+    assert _request(conn, "GET", "/health", token=None)[0] == 200
+    assert _request(conn, "GET", "/stats", token=None)[0] == 401
+    assert _request(conn, "POST", "/convert", request, token=None)[0] == 401
+    assert _request(conn, "POST", "/convert", request, token="wrong")[0] == 401
+    status, body = _request(
+        conn, "POST", "/convert", request, content_type="text/plain"
+    )
+    assert status == 415
+    assert "application/json" in body["error"]
+
+    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    for length, expected in [("-1", 400), ("x", 400), (str(10**9), 413)]:
+        conn.request("POST", "/convert", headers={**headers, "Content-Length": length})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == expected
+    assert not (fake_marker / "calls.log").exists()
+
+    with pytest.raises(ValueError, match="needs a token"):
+        create_server(ConversionService(), port=0)
+
+
+def test_root_restricts_paths(tmp_path: Path, fake_marker: Path) -> None:
+    """Paths outside the root directory are refused."""
+    root = tmp_path / "root"
+    root.mkdir()
+    pdf = root / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    service = ConversionService(backend="subprocess")
+    server = create_server(service, port=0, token=TOKEN, root=root)
+
+    with _running(server, service):
+        conn = http.client.HTTPConnection("127.0.0.1", server.socket.getsockname()[1])
+        outside = {"pdf": str(pdf), "markdown": str(tmp_path / "doc.md")}
+        assert _request(conn, "POST", "/convert", outside)[0] == 403
+        escape = {"pdf": str(root / ".." / "doc.pdf")}
+        assert _request(conn, "POST", "/convert", escape)[0] == 403
+        inside = {"pdf": str(pdf), "markdown": str(root / "doc.md")}
+        assert _request(conn, "POST", "/convert", inside)[0] == 200
+
+    assert not (tmp_path / "doc.md").exists()
+    assert (root / "doc.md").exists()
+
+
+def test_convert_over_unix_socket(tmp_path: Path, fake_marker: Path) -> None:
+    """The daemon serves requests on a Unix socket and removes stale sockets."""
+    socket_path = tmp_path / "pdf2markdown.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+
+    service = ConversionService(backend="subprocess")
+    server = create_server(service, socket_path=socket_path)
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4\n")
+
+    assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+
+    with _running(server, service):
+        conn = _UnixConnection(socket_path)
+        assert _request(conn, "GET", "/health") == (200, {"status": "ok"})
+        status, body = _request(conn, "POST", "/convert", {"pdf": str(pdf)})
+        assert status == 200
+        assert body["markdown"].startswith("# doc\n")
+
+
+class _CountingWorker:
+    """In-process worker stand-in that records loads and overlapping calls."""
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self.active = 0
+        self.overlapped = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        self.loads += 1
+
+    def convert(self, pdf_path: Path, options: Optional[Dict[str, Any]]) -> str:
+        with self._lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return f"# {pdf_path.stem}\n"
+
+
+def test_threads_share_one_worker(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """The models are loaded once and the threads take turns with them."""
+    worker = _CountingWorker()
+    created = []
+
+    def create_worker(backend: str) -> _CountingWorker:
+        created.append(backend)
+        return worker
+
+    monkeypatch.setattr("pdf2markdown.server.create_worker", create_worker)
+    service = ConversionService(workers=3, backend="inprocess")
+    service.start()
+    try:
+        jobs = [service.submit(tmp_path / f"doc{i}.pdf") for i in range(6)]
+        for job in jobs:
+            job.done.wait()
+    finally:
+        service.close()
+
+    assert created == ["inprocess"]
+    assert worker.loads == 1
+    assert not worker.overlapped
+    assert [job.markdown for job in jobs] == [f"# doc{i}\n" for i in range(6)]
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Tests for the archive output sinks."""
+
+import gzip
+import hashlib
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from pdf2markdown import sinks
+from pdf2markdown.cli import convert
+from pdf2markdown.sinks import open_sink
+
+
+@pytest.mark.parametrize(
+    "name", ["out.jsonl", "out.jsonl.gz", "out.jsonl.zst", "out.tar", "out.sqlite"]
+)
+def test_archive_round_trip(tmp_path: Path, name: str) -> None:
+    """Records are found by PDF path; a later record of a PDF replaces it."""
+    if name.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    for pdf in ["a", "b"]:
+        (tmp_path / f"{pdf}.pdf").write_bytes(f"%PDF-1.4 {pdf}\n".encode())
+    path = tmp_path / name
+
+    with open_sink(path) as sink:
+        sink.write(tmp_path / "a.pdf", Path("/out/a.md"), ["# a\n", "\n", "ä\n"])
+        sink.write(tmp_path / "b.pdf", Path("b.md"), ["# b\n"])
+        record = sink.get(tmp_path / "a.pdf")
+        assert record is not None and record.text == "# a\n\nä\n"
+    with open_sink(path) as sink:
+        assert tmp_path / "a.pdf" in sink and tmp_path / "c.pdf" not in sink
+        sink.write(tmp_path / "a.pdf", Path("a2.md"), ["# a2\n"])
+
+    reader = open_sink(path, writable=False)
+    record = reader.get(tmp_path / "a.pdf")
+    assert record is not None
+    assert (record.markdown, record.text) == ("a2.md", "# a2\n")
+    record = reader.get(tmp_path / "b.pdf")
+    assert record is not None
+    assert record.sha256 == hashlib.sha256(b"%PDF-1.4 b\n").hexdigest()
+    assert reader.get(tmp_path / "c.pdf") is None
+    reader.close()
+
+    if name == "out.tar":
+        with tarfile.open(path) as archive:
+            assert archive.getnames() == ["out/a.md", "b.md", "a2.md"]
+    elif name == "out.jsonl.gz":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            assert len(f.readlines()) == 3
+
+
+def test_unindexed_records_are_cut_off(tmp_path: Path) -> None:
+    """Records a killed run did not index are dropped on the next open."""
+    (tmp_path / "a.pdf").write_bytes(b"%PDF-1.4\n")
+    path = tmp_path / "out.jsonl"
+    with open_sink(path) as sink:
+        sink.write(tmp_path / "a.pdf", Path("a.md"), ["# a\n"])
+    with path.open("ab") as f:
+        f.write(b'{"pdf": "half a rec')
+    with (tmp_path / "out.jsonl.index").open("a") as f:
+        f.write('{"pdf": "lost.pdf", "offset": 1000, "length": 10}\n')
+
+    with open_sink(path) as sink:
+        assert len(sink) == 1 and "lost.pdf" not in sink
+        sink.write(tmp_path / "a.pdf", Path("a2.md"), ["# a2\n"])
+
+    assert path.read_text(encoding="utf-8").count("\n") == 2
+    assert "lost.pdf" not in (tmp_path / "out.jsonl.index").read_text()
+    with pytest.raises(RuntimeError, match="another run"):
+        with open_sink(path):
+            open_sink(path)
+    (tmp_path / "out.jsonl.index").unlink()
+    with pytest.raises(ValueError, match="has no index"):
+        open_sink(path)
+    with pytest.raises(ValueError, match="archive kind"):
+        open_sink(tmp_path / "out.zip")
+
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.tar", "out.sqlite"])
+def test_records_are_flushed_while_writing(
+    tmp_path: Path, name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A run killed before closing its archive keeps the flushed records."""
+    monkeypatch.setattr(sinks, "FLUSH_RECORDS", 2)
+    path = tmp_path / name
+    sink = open_sink(path)
+    try:
+        for i in range(3):
+            pdf = tmp_path / f"{i}.pdf"
+            pdf.write_bytes(b"%PDF-1.4\n")
+            sink.write(pdf, Path(f"{i}.md"), [f"# {i}\n"])
+            with open_sink(path, writable=False) as reader:
+                assert len(reader) == (0 if i == 0 else 2)
+
+        monkeypatch.setattr(sinks, "FLUSH_INTERVAL", 0.0)
+        sink.write(tmp_path / "0.pdf", Path("again.md"), ["# again\n"])
+        with open_sink(path, writable=False) as reader:
+            assert len(reader) == 3
+            record = reader.get(tmp_path / "0.pdf")
+            assert record is not None and record.text == "# again\n"
+    finally:
+        sink.close()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_to_archive(tmp_path: Path, fake_marker: Path, jobs: int) -> None:
+    """A batch writes one archive instead of Markdown files and resumes from it."""
+    for name in ["one", "two", "three"]:
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF-1.4\n")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(
+        "".join(
+            f"{tmp_path / name}.pdf,{tmp_path / name}.md\n"
+            for name in ["one", "two", "three"]
+        )
+    )
+    path = tmp_path / "out.tar"
+
+    with open_sink(path) as sink:
+        convert(file=csv_file, backend="subprocess", jobs=jobs, sink=sink)
+    with open_sink(path) as sink:
+        convert(file=csv_file, backend="subprocess", jobs=jobs, sink=sink)
+        record = sink.get(tmp_path / "two.pdf")
+
+    assert not list(tmp_path.glob("*.md"))
+    assert record is not None and record.text.startswith("# two\n")
+    assert record.markdown == str(tmp_path / "two.md")
+    calls = (fake_marker / "calls.log").read_text().splitlines()
+    assert len(calls) == 3
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Tests for import-time cost and logging setup."""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from loguru import logger
+
+from pdf2markdown.cli import main
+from pdf2markdown.errors import ConversionError
+
+# Seconds importing the package may take, with a wide margin for slow machines
+IMPORT_BUDGET = 0.5
+
+# Modules only some runs need, which importing the package must not import
+LAZY_MODULES = {
+    "concurrent.futures.process",
+    "http.server",
+    "importlib.metadata",
+    "marker",
+    "pdftext",
+    "pypdfium2",
+    "torch",
+}
+
+
+@pytest.fixture
+def restore_logger() -> Iterator[None]:
+    """Put loguru's default handler back after a test ran main()."""
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+def test_import_is_cheap(tmp_path: Path) -> None:
+    """Importing the package stays within budget and has no side effects."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import pdf2markdown"],
+        cwd=tmp_path,
+        env={"PYTHONPATH": str(Path(__file__).parents[1])},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # Lines are "import time: <self us> | <cumulative us> | <indented name>"
+    cumulative = {}
+    for line in result.stderr.splitlines()[1:]:
+        _, total, name = line.split("|")
+        cumulative[name.strip()] = int(total) / 1e6
+    imported = {name.partition(".")[0] for name in cumulative} | set(cumulative)
+    assert not imported & LAZY_MODULES
+    assert cumulative["pdf2markdown"] < IMPORT_BUDGET
+    assert not list(tmp_path.iterdir())
+
+
+def test_main_configures_logging(
+    tmp_path: Path,
+    fake_marker: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    restore_logger: None,
+) -> None:
+    """Errors go to the --log-file, which is only created when one is logged."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "good.pdf").write_bytes(b"%PDF-1.4\n")
+    (tmp_path / "broken.pdf").write_bytes(b"%PDF-1.4\n")
+
+    main(["--backend", "subprocess", "good.pdf", "good.md"])
+    assert not (tmp_path / "convert.log").exists()
+
+    log_file = tmp_path / "logs" / "errors.log"
+    with pytest.raises(ConversionError):
+        main(
+            [
+                "--backend",
+                "subprocess",
+                "--log-file",
+                str(log_file),
+                "broken.pdf",
+                "x.md",
+            ]
+        )
+    assert "Error converting 'broken.pdf'" in log_file.read_text(encoding="utf-8")
+
+    with pytest.raises(ConversionError):
+        main(["--backend", "subprocess", "--no-log-file", "broken.pdf", "x.md"])
+    assert not (tmp_path / "convert.log").exists()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Tests for the text-layer fast path."""
+
+import json
+from pathlib import Path
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from pdf2markdown.cli import convert
+from pdf2markdown.report import RunReport
+from pdf2markdown.textlayer import (
+    assess_text_layer,
+    choose_engine,
+    text_layer_markdown,
+)
+
+from .complex_pdf import create_complex_pdf
+from .simple_pdf import create_simple_pdf
+
+pytest.importorskip("pdftext")
+
+
+def test_simple_pdf_from_text_layer(tmp_path: Path) -> None:
+    """Headings, emphasis, paragraphs and lists come from the text layer."""
+    pdf = tmp_path / "simple.pdf"
+    create_simple_pdf(pdf)
+
+    assert text_layer_markdown(pdf) == (
+        "# A Simple PDF Document\n"
+        "\n"
+        "This is a basic paragraph in a simple PDF.\n"
+        "\n"
+        "This paragraph includes **bold text** and *italic text*.\n"
+        "\n"
+        "Here's a small list:\n"
+        "\n"
+        "- Item 1\n"
+        "- Item 2\n"
+    )
+
+
+def test_complex_pdf_table(tmp_path: Path) -> None:
+    """Column-aligned lines become a pipe table."""
+    pdf = tmp_path / "complex.pdf"
+    create_complex_pdf(pdf)
+
+    markdown = text_layer_markdown(pdf)
+    assert "# Complex PDF Document Example\n" in markdown
+    assert (
+        "| **Header 1** | **Header 2** | **Header 3** | **Header 4** |\n"
+        "| --- | --- | --- | --- |\n"
+        "| Row 1 Col 1 | Row 1 Col 2 | Row 1 Col 3 | Row 1 Col 4 |\n"
+    ) in markdown
+    assert "This is content on the **second page**" in markdown
+
+
+def test_preflight_routes_pdfs(tmp_path: Path) -> None:
+    """Born-digital PDFs pass the preflight; PDFs without text do not."""
+    text_pdf = tmp_path / "text.pdf"
+    create_simple_pdf(text_pdf)
+    blank_pdf = tmp_path / "blank.pdf"
+    document = canvas.Canvas(str(blank_pdf))
+    document.rect(72, 72, 400, 600, fill=1)
+    document.showPage()
+    document.save()
+
+    quality = assess_text_layer(text_pdf)
+    assert quality is not None and quality.score == 1.0
+    assert choose_engine(text_pdf) == "text"
+    assert choose_engine(blank_pdf) == "marker"
+    assert choose_engine(blank_pdf, "text") == "text"
+    assert choose_engine(tmp_path / "missing.pdf") == "marker"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_auto_engine_skips_marker(tmp_path: Path, fake_marker: Path, jobs: int) -> None:
+    """In auto mode marker only sees PDFs whose text layer is not good enough."""
+    create_simple_pdf(tmp_path / "text.pdf")
+    (tmp_path / "scan.pdf").write_bytes(b"%PDF-1.4\n")
+    csv_file = tmp_path / "batch.csv"
+    csv_file.write_text(
+        "".join(
+            f"{tmp_path / name}.pdf,{tmp_path / name}.md\n" for name in ["text", "scan"]
+        )
+    )
+
+    report_path = tmp_path / "report.jsonl"
+    report = RunReport(report_path)
+    convert(
+        file=csv_file, backend="subprocess", jobs=jobs, engine="auto", report=report
+    )
+    report.close()
+
+    assert (
+        (tmp_path / "text.md")
+        .read_text(encoding="utf-8")
+        .startswith("# A Simple PDF Document\n")
+    )
+    assert (tmp_path / "scan.md").exists()
+    lines = [json.loads(line) for line in report_path.read_text().splitlines()]
+    engines = {Path(line["pdf"]).stem: line["engine"] for line in lines[:-1]}
+    assert engines == {"text": "text", "scan": "marker"}
+    assert lines[-1]["engines"] == {"text": 1, "marker": 1}
+    calls = (fake_marker / "calls.log").read_text()
+    assert "scan.pdf" in calls and "text.pdf" not in calls
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Tests for watch-folder mode."""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from loguru import logger
+
+from pdf2markdown.watch import FolderWatcher
+
+
+def _wait_for(path: Path, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while not path.exists():
+        assert time.monotonic() < deadline, f"'{path}' was not created"
+        time.sleep(0.05)
+
+
+@pytest.mark.parametrize("poll_interval", [None, 0.1], ids=["inotify", "polling"])
+def test_watch_converts_new_pdfs(
+    tmp_path: Path, fake_marker: Path, poll_interval: Optional[float]
+) -> None:
+    """Existing stale PDFs and PDFs that arrive later land in the mirrored tree."""
+    inbox = tmp_path / "inbox"
+    outbox = tmp_path / "outbox"
+    (inbox / "old").mkdir(parents=True)
+    (inbox / "old" / "first.pdf").write_bytes(b"%PDF-1.4\n")
+
+    watcher = FolderWatcher(
+        inbox,
+        outbox,
+        backend="subprocess",
+        jobs=2,
+        settle=0.2,
+        poll_interval=poll_interval,
+    )
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        _wait_for(outbox / "old" / "first.md")
+
+        # A new directory, with a PDF written in two steps
+        (inbox / "new").mkdir()
+        with (inbox / "new" / "second.pdf").open("wb") as f:
+            f.write(b"%PDF-1.4\n")
+            f.flush()
+            time.sleep(0.05)
+            f.write(b"%%EOF\n")
+        (inbox / "notes.txt").write_text("not a PDF")
+        _wait_for(outbox / "new" / "second.md")
+    finally:
+        watcher.stop()
+        thread.join()
+
+    output = (outbox / "new" / "second.md").read_text(encoding="utf-8")
+    assert output.startswith("# second\n")
+    assert sorted(p.name for p in outbox.rglob("*")) == [
+        "first.md",
+        "new",
+        "old",
+        "second.md",
+    ]
+    # Each PDF was converted once
+    assert len((fake_marker / "calls.log").read_text().splitlines()) == 2
+
+
+class _CountingWorker:
+    """Stand-in for MarkerWorker that records loads and overlapping calls."""
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self.active = 0
+        self.overlapped = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        self.loads += 1
+
+    def convert(self, pdf_path: Path, options: Optional[Dict[str, Any]]) -> str:
+        with self._lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+        time.sleep(0.05)
+        with self._lock:
+            self.active -= 1
+        return f"# {pdf_path.stem}\n"
+
+
+def test_watch_threads_share_one_worker(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """With --jobs, the models are loaded once and the threads take turns."""
+    inbox = tmp_path / "inbox"
+    outbox = tmp_path / "outbox"
+    inbox.mkdir()
+    for i in range(4):
+        (inbox / f"doc{i}.pdf").write_bytes(b"%PDF-1.4\n")
+    worker = _CountingWorker()
+    created = []
+
+    def create_worker(backend: str) -> _CountingWorker:
+        created.append(backend)
+        return worker
+
+    monkeypatch.setattr("pdf2markdown.watch.create_worker", create_worker)
+    watcher = FolderWatcher(
+        inbox, outbox, backend="inprocess", jobs=3, settle=0, poll_interval=0.1
+    )
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        for i in range(4):
+            _wait_for(outbox / f"doc{i}.md")
+    finally:
+        watcher.stop()
+        thread.join()
+
+    assert created == ["inprocess"]
+    assert worker.loads == 1
+    assert not worker.overlapped
+
+
+def test_watch_logs_unexpected_errors(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Failures convert_single_file did not log are not swallowed silently."""
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "doc.pdf").write_bytes(b"%PDF-1.4\n")
+
+    def convert_single_file(*args: Any) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr("pdf2markdown.watch.convert_single_file", convert_single_file)
+    messages: List[str] = []
+    handler = logger.add(messages.append, level="ERROR")
+    watcher = FolderWatcher(
+        inbox, tmp_path / "outbox", backend="subprocess", settle=0, poll_interval=0.1
+    )
+    thread = threading.Thread(target=watcher.run)
+    thread.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not messages:
+            assert time.monotonic() < deadline, "the error was not logged"
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+        thread.join()
+        logger.remove(handler)
+
+    assert "Error converting" in messages[0]
+    assert "OSError: disk full" in messages[0]